@@ -1,4 +1,16 @@
 from .base_agent import BaseAgent
+from .transport import HTTPTransport, ProviderError, RateLimitError
+from .providers import ModelTarget, ProviderAdapter, register_provider, use_targets
+from .ratelimit import RateLimiter
+from .batching import MicroBatcher
+from .mock import MockProfile, MockTransport
+from .resilience import ResiliencePolicy
+from .embeddings import HashingEmbedder
+from .memory import ExperienceStore
+from .cache import ResponseCache, bypass_cache
+from .deadline import DeadlineExceeded, deadline_after, parse_duration
+from .streaming import stream_tokens
+from .transcript import record_calls
 from .lead_solver import LeadSolver
 from .critic import CriticAgent
 from .judgment import JudgmentAgent
@@ -8,6 +20,27 @@ from .consensus_builder import ConsensusBuilderAgent
 
 __all__ = [
     'BaseAgent',
+    'HTTPTransport',
+    'ProviderError',
+    'RateLimitError',
+    'ModelTarget',
+    'ProviderAdapter',
+    'register_provider',
+    'use_targets',
+    'RateLimiter',
+    'MicroBatcher',
+    'MockProfile',
+    'MockTransport',
+    'ResiliencePolicy',
+    'HashingEmbedder',
+    'ExperienceStore',
+    'ResponseCache',
+    'bypass_cache',
+    'DeadlineExceeded',
+    'deadline_after',
+    'parse_duration',
+    'stream_tokens',
+    'record_calls',
     'LeadSolver',
     'CriticAgent',
     'JudgmentAgent',
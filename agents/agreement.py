@@ -0,0 +1,145 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence
+import numpy as np
+from .context import response_text
+from .embeddings import bucket
+
+_WORD = re.compile(r"[a-z][a-z0-9_-]{3,}")
+
+# Frequent words that say nothing about what a response covers
+STOPWORDS = frozenset("""
+    about above after again against also because been before being below between both
+    could does doing down during each either even every from further have having here
+    into itself just like made make many more most much must need only other over same
+    should some such than that their them then there these they this those through under
+    until upon very were what when where which while will with within without would your
+    solution solutions problem approach proposed proposal consider ensure using used
+""".split())
+
+# Keywords taken from each response when measuring coverage
+KEYWORDS_PER_RESPONSE = 20
+
+# Dimensions of the content-word vectors agreement is measured on
+AGREEMENT_DIM = 1024
+
+# Texts whose profiles are kept; the same responses are scored again in refinement rounds
+PROFILE_CACHE_SIZE = 1024
+
+
+def content_words(text: str) -> List[str]:
+    """Lower-cased words of a text with stopwords and short words removed."""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class TextProfile(NamedTuple):
+    """What agreement needs to know about one text."""
+    vector: np.ndarray
+    words: FrozenSet[str]
+    keywords: FrozenSet[str]
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def text_profile(text: str) -> TextProfile:
+    """
+    A text's hashed bag-of-content-words vector (log-scaled, L2-normalized,
+    read-only), its distinct content words and its keywords.
+
+    Each distinct word is hashed once, and the result is cached per text.
+    """
+    counts = Counter(content_words(text))
+    buckets = np.fromiter([bucket(word, AGREEMENT_DIM) for word in counts], np.int64, len(counts))
+    weights = np.fromiter(counts.values(), np.float32, len(counts))
+    vector = np.log1p(np.bincount(buckets, weights, minlength=AGREEMENT_DIM)).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    vector.setflags(write=False)
+    top = frozenset(word for word, _ in counts.most_common(KEYWORDS_PER_RESPONSE))
+    return TextProfile(vector, frozenset(counts), top)
+
+
+def stacked(profiles: Sequence[TextProfile]) -> np.ndarray:
+    """The profiles' vectors as the rows of one matrix."""
+    if not profiles:
+        return np.zeros((0, AGREEMENT_DIM), dtype=np.float32)
+    return np.stack([profile.vector for profile in profiles])
+
+
+def similarity_matrix(vectors: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarities between normalized row vectors."""
+    return vectors @ vectors.T
+
+
+def harmony(vectors: np.ndarray) -> Optional[float]:
+    """Mean pairwise similarity of the rows; None with fewer than two."""
+    if len(vectors) < 2:
+        return None
+    upper = np.triu_indices(len(vectors), k=1)
+    return round(float(similarity_matrix(vectors)[upper].mean()), 4)
+
+
+def coverage(consensus: TextProfile, profiles: Sequence[TextProfile]) -> Optional[float]:
+    """Share of each text's keywords that appear in the consensus, averaged over texts."""
+    shares = [len(p.keywords & consensus.words) / len(p.keywords) for p in profiles if p.keywords]
+    if not shares:
+        return None
+    return round(float(np.mean(shares)), 4)
+
+
+def agreement_metrics(responses: Sequence[Dict], consensus: Optional[str] = None) -> Dict[str, Optional[float]]:
+    """
+    Local agreement metrics over a set of agent responses.
+
+    harmony_score: mean pairwise similarity of the responses.
+    With a consensus text, also:
+    coverage: share of each response's key terms the consensus keeps.
+    resolution_quality: mean similarity between the consensus and each response.
+    """
+    profiles = [text_profile(response_text(response)) for response in responses]
+    profiles = [profile for profile in profiles if profile.words]
+    vectors = stacked(profiles)
+    if consensus is None:
+        return {"harmony_score": harmony(vectors)}
+    summary = text_profile(consensus)
+    resolution = None
+    if profiles and summary.words:
+        resolution = round(float((vectors @ summary.vector).mean()), 4)
+    return {
+        "harmony_score": harmony(vectors),
+        "coverage": coverage(summary, profiles),
+        "resolution_quality": resolution
+    }
+
+
+def _score_pattern(name: str) -> "re.Pattern[str]":
+    label = r"[\s_-]*".join(re.escape(part) for part in name.split("_"))
+    return re.compile(rf"{label}\**\s*[:=]\s*\**\s*(\d+(?:\.\d+)?)\s*(?:/\s*(\d+))?", re.IGNORECASE)
+
+
+def parse_scores(text: str, names: Sequence[str]) -> Dict[str, Optional[float]]:
+    """
+    Scores the model reported as "Name: value" lines, scaled to 0-1.
+
+    Accepts 0-1 values, "7/10"-style fractions and 0-10 or 0-100 scales;
+    a score that is missing from the text is None rather than a guess.
+    """
+    scores: Dict[str, Optional[float]] = {}
+    for name in names:
+        match = None
+        for match in _score_pattern(name).finditer(text):
+            pass  # the last occurrence is the model's final verdict
+        if match is None:
+            scores[name] = None
+            continue
+        value = float(match.group(1))
+        scale = float(match.group(2)) if match.group(2) else (1.0 if value <= 1 else 10.0 if value <= 10 else 100.0)
+        scores[name] = round(min(max(value / scale, 0.0), 1.0), 4) if scale else None
+    return scores
+
+
+def score_instruction(names: List[str]) -> str:
+    """Instruction asking a model to end its answer with parseable scores."""
+    lines = ", ".join(f"'{name.replace('_', ' ').title()}: <0-1>'" for name in names)
+    return f"End with one line per score, each between 0 and 1: {lines}."
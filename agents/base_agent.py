@@ -1,11 +1,34 @@
 import os
+import json
+from functools import partial
 from abc import ABC, abstractmethod
+from typing import Optional
 from dotenv import load_dotenv
+from .transport import HTTPTransport
+from .cache import ResponseCache, cache_enabled
+from .streaming import token_sink
+from .transcript import transcript
+from .resilience import ResiliencePolicy
+from .context import estimate_tokens
+from .deadline import bounded
+from .providers import ModelTarget, get_provider, routed_targets
+from .singleflight import SingleFlight
+from .metrics import CACHE_REQUESTS, TOKENS
 
 class BaseAgent(ABC):
-    def __init__(self, role: str):
+    # Whether process() changes state, so its work cannot be speculative
+    side_effects = False
+
+    def __init__(self, role: str, transport: Optional[HTTPTransport] = None,
+                 target: Optional[ModelTarget] = None):
         load_dotenv()
         self.role = role
+        # Provider and model serving this role; reassignable from configuration
+        self.target = target or ModelTarget("openai", "gpt-4-turbo-preview")
+        self.transport = transport or HTTPTransport.shared()
+        self.cache: Optional[ResponseCache] = None
+        self.resilience: Optional[ResiliencePolicy] = None
+        self.inflight: SingleFlight[dict] = SingleFlight("agent")
         self._setup_api_keys()
         
     def _setup_api_keys(self):
@@ -16,6 +39,168 @@ class BaseAgent(ABC):
         self.google_key = os.getenv('GOOGLE_API_KEY')
         self.cohere_key = os.getenv('COHERE_API_KEY')
         self.emergence_key = os.getenv('EMERGENCEAI_API_KEY')
+
+    @property
+    def target(self) -> ModelTarget:
+        """Provider and model for the current call: a per-request route, else the role's own."""
+        routed = routed_targets.get()
+        if routed and self.role in routed:
+            return routed[self.role]
+        return self._target
+
+    @target.setter
+    def target(self, value: ModelTarget):
+        self._target = value
+
+    @property
+    def model(self) -> str:
+        return self.target.model
+
+    async def complete(self, system: str, prompt: str, stream: bool = False,
+                       temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        One completion from this role's provider and model; returns the reply text.
+
+        stream=True streams the reply where the provider supports it.
+        """
+        target = self.target
+        adapter = get_provider(target.provider)
+        payload = adapter.payload(target.model, system, prompt,
+                                  temperature=temperature, max_tokens=max_tokens)
+        text = await self.send(payload, stream=stream)
+        calls = transcript.get()
+        if calls is not None:
+            calls.append({"model": target.model, "system": system, "prompt": prompt, "completion": text})
+        return text
+
+    async def send(self, payload: dict, stream: bool = False) -> str:
+        """Send a payload already in the provider's own format and parse the reply text."""
+        adapter = get_provider(self.target.provider)
+        result = await self._post(
+            adapter.name,
+            adapter.url(self.target.model),
+            adapter.headers(getattr(self, adapter.key_attr, None)),
+            payload,
+            stream=stream and adapter.streams
+        )
+        return adapter.parse(result)
+
+    async def _post(self, provider: str, url: str, headers: dict, payload: dict,
+                    stream: bool = False) -> dict:
+        """
+        Send a request through the shared, pooled transport, consulting the cache first.
+
+        With stream=True (OpenAI-compatible chat endpoints only) and a token
+        sink installed, the reply is streamed and deltas are forwarded as
+        they arrive; the return value has the same shape either way.
+        Identical non-streamed calls already in flight are joined rather
+        than sent again.
+        """
+        sink = token_sink.get() if stream else None
+        use_cache = self.cache is not None and cache_enabled.get()
+        key = ResponseCache.make_key(self.role, provider, url, payload)
+        if use_cache:
+            cached = await self.cache.fetch(key)
+            CACHE_REQUESTS.inc(role=self.role, result="miss" if cached is None else "hit")
+            if cached is not None:
+                if sink is not None:
+                    sink(cached["choices"][0]["message"]["content"])
+                return cached
+
+        # Each caller waits only until its own deadline; the provider
+        # request is cancelled once no caller is left waiting for it
+        if sink is not None:
+            # A joined stream would miss the deltas sent before it joined
+            return await bounded(self._call(provider, url, headers, payload, key, sink))
+        return await bounded(self.inflight.run(key, partial(self._call, provider, url, headers, payload, key, None)))
+
+    async def _call(self, provider: str, url: str, headers: dict, payload: dict,
+                    key: str, sink) -> dict:
+        if sink is not None:
+            send = partial(self._checked, self._attempts(sink))
+        else:
+            send = partial(self._checked, self.transport.post_json)
+        if self.resilience is None:
+            result = await send(provider, url, headers, payload)
+        else:
+            # Hedging a stream would interleave two sets of deltas, so only plain calls hedge
+            result = await self.resilience.execute(
+                self, provider, url, headers, payload, send, hedge=sink is None
+            )
+        self._record_usage(payload, result)
+        if self.cache is not None and cache_enabled.get() and self._cacheable(provider, result):
+            await self.cache.store(key, result)
+        return result
+
+    @staticmethod
+    async def _checked(send, provider: str, url: str, headers: dict, payload: dict) -> dict:
+        """
+        Send, then raise the ProviderError an error payload stands for, so
+        retries and fallbacks see it like an error status.
+        """
+        result = await send(provider, url, headers, payload)
+        get_provider(provider).parse(result)
+        return result
+
+    @staticmethod
+    def _cacheable(provider: str, result) -> bool:
+        """Only replies with text are cached; error bodies and empty completions are not."""
+        if not isinstance(result, dict) or "error" in result:
+            return False
+        try:
+            text = get_provider(provider).parse(result)
+        except Exception:
+            return False
+        return isinstance(text, str) and bool(text.strip())
+
+    def _record_usage(self, payload: dict, result: dict):
+        """Count prompt/completion tokens, preferring the provider's own usage report."""
+        if not isinstance(result, dict):
+            return
+        usage = result.get("usage") or result.get("meta", {}).get("billed_units") or {}
+        prompt = usage.get("prompt_tokens", usage.get("input_tokens"))
+        completion = usage.get("completion_tokens", usage.get("output_tokens"))
+        if prompt is None:
+            prompt = estimate_tokens(json.dumps(payload, default=str))
+        if completion is None:
+            completion = estimate_tokens(json.dumps(result, default=str))
+        TOKENS.inc(prompt, role=self.role, kind="prompt")
+        TOKENS.inc(completion, role=self.role, kind="completion")
+
+    def _attempts(self, sink):
+        """
+        A streaming send for the resilience policy to call once per attempt.
+        Before an attempt that follows one which already streamed text, the
+        sink is told to withdraw that text, so retries never duplicate it.
+        """
+        streamed = False
+
+        def forward(text: str):
+            nonlocal streamed
+            streamed = True
+            sink(text)
+
+        async def send(provider: str, url: str, headers: dict, payload: dict) -> dict:
+            nonlocal streamed
+            if streamed:
+                streamed = False
+                sink(None)
+            return await self._stream_chat(provider, url, headers, payload, sink=forward)
+        return send
+
+    async def _stream_chat(self, provider: str, url: str, headers: dict, payload: dict, sink) -> dict:
+        """Stream an OpenAI-style chat completion, forwarding each content delta."""
+        parts = []
+        async for data in self.transport.stream_events(provider, url, headers, dict(payload, stream=True)):
+            event = json.loads(data)
+            if "error" in event:
+                return event
+            choices = event.get("choices") or [{}]
+            delta = choices[0].get("delta", {}).get("content")
+            if delta:
+                parts.append(delta)
+                sink(delta)
+        return {"choices": [{"message": {"content": "".join(parts)}}]}
         
     @abstractmethod
     async def process(self, context: dict) -> dict:
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence
+from .deadline import parse_duration
+from .providers import PROVIDER_ADAPTERS
+from .metrics import BATCH_SIZE
+
+
+class _Call:
+    __slots__ = ("transport", "url", "headers", "payload", "future")
+
+    def __init__(self, transport, url: str, headers: dict, payload: dict, future: asyncio.Future):
+        self.transport = transport
+        self.url = url
+        self.headers = headers
+        self.payload = payload
+        self.future = future
+
+
+class MicroBatcher:
+    """
+    Gathers non-streamed calls to a provider for up to `window` seconds or
+    `max_size` calls, then sends them together.
+
+    Endpoints that take several inputs per request (adapters whose merge()
+    accepts the payloads, e.g. Vertex predict) get one request per batch,
+    whose reply is split back among the callers. For other providers the
+    batch's request and token budget is drawn from the rate limiter in one
+    step and the calls go out concurrently over the pooled connections.
+    A longer window builds bigger batches at the cost of added latency;
+    it suits offline runs rather than interactive traffic.
+    """
+
+    def __init__(self, window: float = 0.02, max_size: int = 16, providers: Optional[Sequence[str]] = None):
+        self.window = window
+        self.max_size = max_size
+        self.providers = set(providers) if providers else None
+        self._queues: Dict[str, List[_Call]] = defaultdict(list)
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks = set()
+
+    @classmethod
+    def from_env(cls) -> Optional["MicroBatcher"]:
+        """
+        A batcher when SIRIUS_BATCH_WINDOW is set (e.g. "20ms"), otherwise None.
+        SIRIUS_BATCH_MAX_SIZE caps a batch and SIRIUS_BATCH_PROVIDERS, a
+        comma-separated list, limits batching to those providers.
+        """
+        window = os.getenv("SIRIUS_BATCH_WINDOW")
+        if not window:
+            return None
+        providers = os.getenv("SIRIUS_BATCH_PROVIDERS")
+        return cls(
+            window=parse_duration(window),
+            max_size=int(os.getenv("SIRIUS_BATCH_MAX_SIZE", "16")),
+            providers=[p.strip() for p in providers.split(",") if p.strip()] if providers else None
+        )
+
+    def batches(self, provider: str) -> bool:
+        return self.providers is None or provider in self.providers
+
+    async def submit(self, transport, provider: str, url: str, headers: dict, payload: dict) -> dict:
+        """Queue a call on the provider's open batch and wait for its own reply."""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[provider]
+        queue.append(_Call(transport, url, headers, payload, future))
+        if len(queue) >= self.max_size:
+            self._flush(provider)
+        elif provider not in self._timers:
+            self._timers[provider] = asyncio.get_running_loop().call_later(self.window, self._flush, provider)
+        # A caller that gives up cancels its future; the rest of its batch is unaffected
+        return await future
+
+    def _flush(self, provider: str):
+        timer = self._timers.pop(provider, None)
+        if timer is not None:
+            timer.cancel()
+        calls = [call for call in self._queues.pop(provider, []) if not call.future.done()]
+        if not calls:
+            return
+        task = asyncio.ensure_future(self._dispatch(provider, calls))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, provider: str, calls: List[_Call]):
+        groups: Dict[tuple, List[_Call]] = defaultdict(list)
+        for call in calls:
+            groups[(id(call.transport), call.url, json.dumps(call.headers, sort_keys=True))].append(call)
+        adapter = PROVIDER_ADAPTERS.get(provider)
+        sends = []
+        for group in groups.values():
+            merged = adapter.merge([call.payload for call in group]) if adapter and len(group) > 1 else None
+            if merged is not None:
+                sends.append(self._send_merged(provider, adapter, group, merged))
+            else:
+                sends.append(self._send_each(provider, group))
+        await asyncio.gather(*sends)
+
+    async def _send_merged(self, provider: str, adapter, calls: List[_Call], payload: dict):
+        """One request for the whole group, its reply split back per call."""
+        BATCH_SIZE.observe(len(calls), provider=provider, mode="merged")
+        first = calls[0]
+        try:
+            response = await first.transport.send_json(provider, first.url, first.headers, payload)
+            replies = adapter.split(response, [call.payload for call in calls])
+        except Exception as e:
+            for call in calls:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            return
+        for call, reply in zip(calls, replies):
+            if not call.future.done():
+                call.future.set_result(reply)
+
+    async def _send_each(self, provider: str, calls: List[_Call]):
+        """Reserve the group's budget in one step, then send its calls concurrently."""
+        BATCH_SIZE.observe(len(calls), provider=provider, mode="multiplexed")
+        transport = calls[0].transport
+        try:
+            await transport.reserve(provider, [call.payload for call in calls])
+        except Exception as e:
+            for call in calls:
+                if not call.future.done():
+                    call.future.set_exception(e)
+            return
+
+        async def send(call: _Call):
+            if call.future.done():
+                return
+            task = asyncio.ensure_future(
+                transport.send_json(provider, call.url, call.headers, call.payload, reserved=True)
+            )
+            call.future.add_done_callback(lambda f: f.cancelled() and task.cancel())
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                if not call.future.done():
+                    call.future.set_exception(e)
+                return
+            if not call.future.done():
+                call.future.set_result(result)
+
+        await asyncio.gather(*(send(call) for call in calls))
+
+    async def close(self):
+        """Send what is still queued and wait for every batch in flight."""
+        for provider in list(self._queues):
+            self._flush(provider)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from .storage import connect, state_path
+
+# Per-request switch; set to False for nondeterministic runs.
+cache_enabled: ContextVar[bool] = ContextVar("cache_enabled", default=True)
+
+
+@contextmanager
+def bypass_cache(bypass: bool = True):
+    """Disable response caching for agent calls made inside this block."""
+    token = cache_enabled.set(not bypass)
+    try:
+        yield
+    finally:
+        cache_enabled.reset(token)
+
+
+def _normalize(value):
+    """Collapse insignificant whitespace so equivalent prompts hash alike."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def fingerprint(value) -> str:
+    """
+    Stable SHA-256 of a JSON-like value, ignoring key order and insignificant
+    whitespace; unlike hash(), identical across processes and restarts.
+    """
+    material = json.dumps(_normalize(value), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of provider responses.
+
+    An in-memory LRU tier answers repeated calls within a process; an
+    optional SQLite tier keeps entries across restarts and is shared by
+    every worker process pointed at the same file. Both honour a TTL.
+    fetch() and store() reach SQLite from an executor thread, so a write
+    waiting on another worker's lock never stalls the event loop.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0,
+                 path: Optional[str] = None, max_disk_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        # Serializes use of the connection by executor threads
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from SIRIUS_CACHE_SIZE, SIRIUS_CACHE_TTL and SIRIUS_CACHE_PATH (or SIRIUS_STATE_DIR)."""
+        return cls(
+            max_entries=int(os.getenv("SIRIUS_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("SIRIUS_CACHE_TTL", "3600")),
+            path=state_path("SIRIUS_CACHE_PATH", "cache.db")
+        )
+
+    @staticmethod
+    def make_key(role: str, provider: str, url: str, payload: dict) -> str:
+        """Stable hash of the role and the normalized request (model, prompt, temperature...)."""
+        return fingerprint([role, provider, url, payload])
+
+    def _recall(self, key: str, now: float) -> Optional[dict]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at > now:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+        del self._memory[key]
+        return None
+
+    def _load(self, key: str, now: float) -> Optional[Tuple[float, dict]]:
+        with self._lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _loaded(self, key: str, entry: Optional[Tuple[float, dict]]) -> Optional[dict]:
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._remember(key, *entry)
+        self.stats["disk_hits"] += 1
+        return entry[1]
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        value = self._recall(key, now)
+        if value is not None:
+            return value
+        return self._loaded(key, self._load(key, now) if self._db is not None else None)
+
+    async def fetch(self, key: str) -> Optional[dict]:
+        """get() that reads the SQLite tier in an executor thread, off the event loop."""
+        now = time.time()
+        value = self._recall(key, now)
+        if value is not None:
+            return value
+        entry = None
+        if self._db is not None:
+            entry = await asyncio.get_running_loop().run_in_executor(None, self._load, key, now)
+        return self._loaded(key, entry)
+
+    def _write(self, key: str, value: dict, expires_at: float, now: float):
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now)
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune_disk(now)
+            self._db.commit()
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, expires_at, value)
+        if self._db is not None:
+            self._write(key, value, expires_at, now)
+
+    async def store(self, key: str, value: dict, ttl: Optional[float] = None):
+        """set() that writes the SQLite tier in an executor thread, off the event loop."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, expires_at, value)
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, key, value, expires_at, now)
+
+    def _remember(self, key: str, expires_at: float, value: dict):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _prune_disk(self, now: float):
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        self._memory.clear()
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Hit/miss counters plus current sizes."""
+        return dict(self.stats, size=len(self._memory))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
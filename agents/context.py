@@ -0,0 +1,153 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+# Prompt-side token budgets per model. Deliberately well below each model's
+# context window: the goal is lean prompts, not filling the window.
+TOKEN_BUDGETS = {
+    "gpt-4-turbo-preview": 6000,
+    "claude-3-opus-20240229": 6000,
+    "mixtral-8x7b-32768": 6000,
+    "command": 3000
+}
+DEFAULT_TOKEN_BUDGET = 4000
+
+# The free-text output of each agent; scores, metrics and placeholders are dropped.
+TEXT_FIELDS = (
+    "proposal",
+    "critique",
+    "verification",
+    "strategic_analysis",
+    "augmented_solution",
+    "consensus",
+    # critique() and refine() outputs
+    "feedback",
+    "meta_critique",
+    "logical_analysis",
+    "strategic_critique",
+    "learning_analysis",
+    "harmony_analysis",
+    "refined_proposal",
+    "refined_critique",
+    "refined_verification",
+    "refined_strategy",
+    "learning_update",
+    "refined_consensus"
+)
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...] "
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def token_budget(model: str) -> int:
+    return TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Keep the head and tail of a text, which carry most of its substance."""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= len(TRUNCATION_MARKER):
+        return text[:max_chars]
+    keep = max_chars - len(TRUNCATION_MARKER)
+    head = (keep * 7) // 10
+    return text[:head] + TRUNCATION_MARKER + text[len(text) - (keep - head):]
+
+
+def response_text(result: Optional[Dict]) -> str:
+    """The free-text output of an agent result."""
+    for field in TEXT_FIELDS:
+        value = (result or {}).get(field)
+        if isinstance(value, str) and value:
+            return value
+    return ""
+
+
+def compact_response(response: Dict) -> Dict:
+    """Reduce an agent response to its role and free-text output."""
+    compact = {"role": response.get("role")}
+    for field in TEXT_FIELDS:
+        value = response.get(field)
+        if value is not None:
+            compact[field] = value if isinstance(value, str) else _dumps(value)
+    return compact
+
+
+def _allocate(lengths: List[int], available: int) -> List[int]:
+    """Water-fill `available` characters across texts; short ones keep everything."""
+    allocation = [0] * len(lengths)
+    remaining = available
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    for position, index in enumerate(order):
+        share = remaining // (len(order) - position)
+        allocation[index] = min(lengths[index], max(share, 0))
+        remaining -= allocation[index]
+    return allocation
+
+
+def compact_context(context: Dict, budget: int) -> Dict:
+    """
+    Build the context an agent actually sees.
+
+    The problem is kept whole; prior responses are reduced to their text
+    and, if the result would exceed `budget` tokens, each is truncated to
+    a fair share of what is left. Reference solutions to similar past
+    problems only go to agents that start from the problem alone; later
+    stages review that agent's proposal instead.
+    """
+    problem = context.get("problem", {})
+    responses = [compact_response(r) for r in context.get("agent_responses", [])]
+    compact = {"problem": problem}
+    if not responses:
+        if context.get("reference_solutions"):
+            compact["reference_solutions"] = context["reference_solutions"]
+        return compact
+
+    compact["agent_responses"] = responses
+    if estimate_tokens(_dumps(compact)) <= budget:
+        return compact
+
+    # Characters left for response text once the fixed parts are accounted for
+    skeleton = {
+        "problem": problem,
+        "agent_responses": [
+            {k: ("" if k in TEXT_FIELDS else v) for k, v in r.items()} for r in responses
+        ]
+    }
+    available = budget * CHARS_PER_TOKEN - len(_dumps(skeleton))
+    texts = [(i, field) for i, r in enumerate(responses) for field in TEXT_FIELDS if field in r]
+    # json.dumps escapes can lengthen text, so budget against the encoded size
+    lengths = [len(_dumps(responses[i][field])) - 2 for i, field in texts]
+    for (i, field), length, limit in zip(texts, lengths, _allocate(lengths, max(available, 0))):
+        text = responses[i][field]
+        if limit < length:
+            # Scale the encoded allowance back to raw characters
+            responses[i][field] = truncate(text, (limit * len(text)) // max(length, 1))
+    return compact
+
+
+def build_prompt(context: Dict, model: str, budget: Optional[int] = None) -> Tuple[str, int]:
+    """Serialize the compacted context for `model`; returns (prompt, estimated tokens)."""
+    prompt = _dumps(compact_context(context, token_budget(model) if budget is None else budget))
+    return prompt, estimate_tokens(prompt)
+
+
+def build_review_prompt(item: Dict, model: str, budget: Optional[int] = None) -> Tuple[str, int]:
+    """
+    Prompt for critique() and refine() calls.
+
+    `item` holds the problem, the proposal under review and, for refine(),
+    the critiques it received; they are compacted like any other context.
+    """
+    responses = [{"role": item.get("author", "Proposal"), "proposal": item.get("proposal", "")}]
+    responses.extend(item.get("critiques", []))
+    context = {"problem": item.get("problem", {}), "agent_responses": responses}
+    return build_prompt(context, model, budget)
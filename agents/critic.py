@@ -1,61 +1,66 @@
+from .agreement import parse_scores, score_instruction
 from .base_agent import BaseAgent
-import aiohttp
-import json
+from .context import build_prompt, build_review_prompt
+from .providers import ModelTarget
+
+PERSONA = "You are a Critical Thinking Expert with PhD-level expertise."
+
+# Aspects the critic scores each proposal on
+ASPECTS = ["feasibility", "completeness", "innovation"]
 
 class CriticAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(role="Critic")
+    def __init__(self, transport=None):
+        super().__init__(
+            role="Critic",
+            transport=transport,
+            target=ModelTarget("anthropic", "claude-3-opus-20240229")
+        )
         
     async def process(self, context: dict) -> dict:
         """Analyze and critique the proposed solution."""
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.anthropic_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "claude-3-opus-20240229",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a Critical Thinking Expert with PhD-level expertise. Analyze the proposed solution and provide constructive criticism."
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(context)
-                    }
-                ],
-                "max_tokens": 1000
-            }
-            
-            async with session.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload
-            ) as response:
-                result = await response.json()
-                return {
-                    "role": self.role,
-                    "critique": result["content"][0]["text"],
-                    "aspects": {
-                        "feasibility": 0.8,
-                        "completeness": 0.7,
-                        "innovation": 0.6
-                    }
-                }
+        prompt, prompt_tokens = build_prompt(context, self.model)
+        critique = await self.complete(
+            f"{PERSONA} Analyze the proposed solution and provide constructive criticism. "
+            + score_instruction(ASPECTS),
+            prompt,
+            max_tokens=1000
+        )
+        return {
+            "role": self.role,
+            "prompt_tokens": prompt_tokens,
+            "critique": critique,
+            # As reported by the model; None for any it left out
+            "aspects": parse_scores(critique, ASPECTS)
+        }
     
     async def critique(self, proposal: dict) -> dict:
-        """Meta-critique of another agent's critique."""
+        """Critique another agent's proposal, including the reasoning behind it."""
+        prompt, prompt_tokens = build_review_prompt(proposal, self.model)
+        meta_critique = await self.complete(
+            f"{PERSONA} Critique the proposed solution and the reasoning behind it. "
+            "List its weakest points and how to fix each one.",
+            prompt,
+            max_tokens=1000
+        )
         return {
             "role": self.role,
-            "meta_critique": "Analyzing critique methodology...",
+            "prompt_tokens": prompt_tokens,
+            "meta_critique": meta_critique,
             "improvement_points": []
         }
     
     async def refine(self, feedback: dict) -> dict:
         """Refine critique based on feedback."""
+        prompt, prompt_tokens = build_review_prompt(feedback, self.model)
+        refined = await self.complete(
+            f"{PERSONA} Revise your critique of the proposed solution in light of the other reviews. "
+            "Keep only the points that still hold.",
+            prompt,
+            max_tokens=1000
+        )
         return {
             "role": self.role,
-            "refined_critique": "Incorporating feedback...",
+            "prompt_tokens": prompt_tokens,
+            "refined_critique": refined,
             "updated_aspects": {}
         }
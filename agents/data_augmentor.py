@@ -1,66 +1,105 @@
+from .agreement import agreement_metrics
 from .base_agent import BaseAgent
-import aiohttp
+from .context import build_review_prompt, compact_context, estimate_tokens, DEFAULT_TOKEN_BUDGET
+from .memory import ExperienceStore, record_text, compact_record
+from .providers import ModelTarget
+import asyncio
 import json
-from typing import List, Dict
+import os
+from functools import partial
+from typing import List, Dict, Optional
+
+# Past interactions sent to the model with each request
+RELEVANT_HISTORY = 5
+
+PERSONA = "You are a Data Augmentation Expert who learns from past problem-solving interactions."
 
 class DataAugmentorAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(role="Data Augmentor")
-        self.learning_history: List[Dict] = []
+    # process() records each interaction in experience memory
+    side_effects = True
+
+    def __init__(self, transport=None, memory: Optional[ExperienceStore] = None):
+        super().__init__(role="Data Augmentor", transport=transport)
+        # Google's Vertex AI for pattern recognition; the "model" is the endpoint id
+        self.target = ModelTarget("vertex", os.getenv('VERTEX_ENDPOINT_ID', ''))
+        self.memory = memory or ExperienceStore.from_env()
+
+    async def _review(self, task: str, item: dict):
+        prompt, prompt_tokens = build_review_prompt(item, self.model)
+        return await self.complete(f"{PERSONA} {task}", prompt), prompt_tokens
+
+    @property
+    def learning_history(self) -> List[Dict]:
+        """Stored experiences, oldest first."""
+        return self.memory.records()
         
     async def process(self, context: dict) -> dict:
         """Learn from past interactions and augment solutions."""
-        # Add current context to learning history
-        self.learning_history.append(context)
+        context = compact_context(context, DEFAULT_TOKEN_BUDGET)
+        # The most similar past interactions, looked up before this one is stored
+        # Both may wait on other workers' SQLite writes, so they run off the event loop
+        loop = asyncio.get_running_loop()
+        history = await loop.run_in_executor(
+            None, partial(self.memory.search, record_text(compact_record(context)), k=RELEVANT_HISTORY)
+        )
+        await loop.run_in_executor(None, self.memory.add, context)
         
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.google_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Use Google's Vertex AI for pattern recognition
-            endpoint = f"https://us-central1-aiplatform.googleapis.com/v1/projects/{self.project_id}/locations/us-central1/endpoints/{self.endpoint_id}:predict"
-            
-            payload = {
-                "instances": [
-                    {
-                        "context": context,
-                        "history": self.learning_history[-10:]  # Last 10 interactions
-                    }
-                ]
-            }
-            
-            async with session.post(
-                endpoint,
-                headers=headers,
-                json=payload
-            ) as response:
-                result = await response.json()
-                return {
-                    "role": self.role,
-                    "augmented_solution": result["predictions"][0],
-                    "learning_metrics": {
-                        "pattern_confidence": 0.85,
-                        "improvement_rate": 0.12,
-                        "knowledge_coverage": 0.78
-                    },
-                    "insights": []
-                }
+        instance = {
+            "context": context,
+            "history": history
+        }
+        prompt = json.dumps(instance, separators=(",", ":"))
+        prompt_tokens = estimate_tokens(prompt)
+        if self.target.provider == "vertex":
+            # The prediction endpoint takes the structured instance as is
+            augmented = await self.send({"instances": [instance]})
+        else:
+            augmented = await self.complete(
+                f"{PERSONA} Augment the current solution using the relevant history.", prompt
+            )
+        return {
+            "role": self.role,
+            "prompt_tokens": prompt_tokens,
+            "augmented_solution": augmented,
+            "learning_metrics": self._learning_metrics(context, history, augmented),
+            "insights": []
+        }
     
+    @staticmethod
+    def _learning_metrics(context: dict, history: List[Dict], augmented) -> Dict[str, Optional[float]]:
+        """
+        pattern_confidence: how much the similar past interactions agree with each other.
+        knowledge_coverage: share of the proposal's and those interactions' key terms
+        the augmented solution keeps (None when the endpoint returns no text).
+        """
+        sources = [*context.get("agent_responses", []), *history]
+        knowledge = agreement_metrics(sources, augmented) if isinstance(augmented, str) else {}
+        return {
+            "pattern_confidence": agreement_metrics(history)["harmony_score"],
+            "knowledge_coverage": knowledge.get("coverage")
+        }
+
     async def critique(self, proposal: dict) -> dict:
         """Analyze learning potential in another agent's proposal."""
+        analysis, prompt_tokens = await self._review(
+            "Compare this solution with similar past solutions and point out what it misses.", proposal
+        )
         return {
             "role": self.role,
-            "learning_analysis": "Evaluating knowledge extraction...",
+            "prompt_tokens": prompt_tokens,
+            "learning_analysis": analysis,
             "potential_patterns": []
         }
     
     async def refine(self, feedback: dict) -> dict:
         """Incorporate feedback into learning system."""
+        update, prompt_tokens = await self._review(
+            "Summarize the lessons these reviews teach about solving this kind of problem.", feedback
+        )
         return {
             "role": self.role,
-            "learning_update": "Updating knowledge base...",
+            "prompt_tokens": prompt_tokens,
+            "learning_update": update,
             "new_patterns": []
         }
         
@@ -0,0 +1,84 @@
+import asyncio
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Monotonic time by which agent calls in the current task must finish.
+deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(ms|s|m)?\s*$", re.IGNORECASE)
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0}
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's deadline passed before the work finished."""
+
+
+def parse_duration(value) -> Optional[float]:
+    """Seconds from a number or a string such as "45", "45s", "500ms" or "2m"."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        match = _DURATION.match(str(value))
+        if match is None:
+            raise ValueError(f"Invalid duration {value!r}; use seconds or e.g. '500ms', '30s', '2m'")
+        seconds = float(match.group(1)) * _UNITS[(match.group(2) or "s").lower()]
+    if seconds <= 0:
+        raise ValueError("Duration must be positive")
+    return seconds
+
+
+@contextmanager
+def deadline_after(seconds: Optional[float]):
+    """
+    Bound agent calls made inside this block to `seconds` from now.
+    An enclosing, earlier deadline still applies; None adds no bound.
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = deadline.get()
+    token = deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    at = deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+async def bounded(awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it once the current deadline passes.
+    Raises DeadlineExceeded without starting it if no time is left.
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError as e:
+        # A timeout of the awaited work itself is not the deadline's doing
+        if isinstance(e, DeadlineExceeded) or not expired():
+            raise
+        raise DeadlineExceeded("deadline exceeded") from None
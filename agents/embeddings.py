@@ -0,0 +1,66 @@
+import re
+import zlib
+from functools import lru_cache
+from itertools import chain
+from typing import Iterable, List, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=1 << 16)
+def bucket(feature: str, dim: int) -> int:
+    """Dimension a feature hashes to; crc32 rather than hash() keeps it stable across processes."""
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+class HashingEmbedder:
+    """
+    Local, offline text embedding: word unigrams/bigrams plus character
+    trigrams hashed into a fixed number of dimensions and L2-normalized.
+
+    Cosine similarity between two embeddings is a plain dot product.
+    """
+
+    def __init__(self, dim: int = 512, char_ngram: int = 3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+        self._cached_word_buckets = lru_cache(maxsize=1 << 16)(self._word_buckets)
+
+    def _word_buckets(self, word: str) -> Tuple[int, ...]:
+        """Buckets of a word's unigram and character n-grams (memoized per word)."""
+        n = self.char_ngram
+        padded = f"#{word}#"
+        features = [f"w:{word}"]
+        features.extend(f"c:{padded[i:i + n]}" for i in range(max(1, len(padded) - n + 1)))
+        return tuple(bucket(feature, self.dim) for feature in features)
+
+    def _buckets(self, text: str) -> List[int]:
+        words = _TOKEN.findall(text.lower())
+        buckets: List[int] = []
+        for word in words:
+            buckets.extend(self._cached_word_buckets(word))
+        buckets.extend(bucket(f"b:{a} {b}", self.dim) for a, b in zip(words, words[1:]))
+        return buckets
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        # Sublinear term frequency keeps long texts from being dominated by repeats
+        np.log1p(vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.bincount(self._buckets(text), minlength=self.dim).astype(np.float32)
+        return self._normalize(vector)
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed several texts with one bincount over row-offset buckets."""
+        rows = [self._buckets(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        offsets = np.repeat(np.arange(len(rows)) * self.dim, [len(row) for row in rows])
+        flat = np.array(list(chain.from_iterable(rows)), dtype=np.int64)
+        counts = np.bincount(flat + offsets, minlength=len(rows) * self.dim)
+        return self._normalize(counts.reshape(len(rows), self.dim).astype(np.float32))
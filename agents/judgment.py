@@ -1,61 +1,65 @@
+from .agreement import parse_scores, score_instruction
 from .base_agent import BaseAgent
-import aiohttp
-import json
+from .context import build_prompt, build_review_prompt
+from .providers import ModelTarget
+
+PERSONA = "You are a Logic and Verification Expert."
+
+# What each verification is scored on
+METRICS = ["factual_accuracy", "logical_consistency", "evidence_strength"]
 
 class JudgmentAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(role="Judgment")
+    def __init__(self, transport=None):
+        super().__init__(
+            role="Judgment",
+            transport=transport,
+            target=ModelTarget("groq", "mixtral-8x7b-32768")
+        )
         
     async def process(self, context: dict) -> dict:
         """Verify facts and logic in the proposed solution."""
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.groq_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "mixtral-8x7b-32768",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a Logic and Verification Expert. Verify the facts and logical consistency of the proposed solution."
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(context)
-                    }
-                ],
-                "temperature": 0.3
-            }
-            
-            async with session.post(
-                "https://api.groq.com/v1/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                result = await response.json()
-                return {
-                    "role": self.role,
-                    "verification": result["choices"][0]["message"]["content"],
-                    "metrics": {
-                        "factual_accuracy": 0.9,
-                        "logical_consistency": 0.85,
-                        "evidence_strength": 0.75
-                    }
-                }
+        prompt, prompt_tokens = build_prompt(context, self.model)
+        verification = await self.complete(
+            f"{PERSONA} Verify the facts and logical consistency of the proposed solution. "
+            + score_instruction(METRICS),
+            prompt,
+            stream=True,
+            temperature=0.3
+        )
+        return {
+            "role": self.role,
+            "prompt_tokens": prompt_tokens,
+            "verification": verification,
+            # As reported by the model; None for any it left out
+            "metrics": parse_scores(verification, METRICS)
+        }
     
     async def critique(self, proposal: dict) -> dict:
         """Evaluate the logical structure of another agent's proposal."""
+        prompt, prompt_tokens = build_review_prompt(proposal, self.model)
+        analysis = await self.complete(
+            f"{PERSONA} Check the proposed solution for factual errors, unsupported claims and logical fallacies.",
+            prompt,
+            temperature=0.3
+        )
         return {
             "role": self.role,
-            "logical_analysis": "Analyzing logical framework...",
+            "prompt_tokens": prompt_tokens,
+            "logical_analysis": analysis,
             "fallacies": []
         }
     
     async def refine(self, feedback: dict) -> dict:
         """Refine verification based on feedback."""
+        prompt, prompt_tokens = build_review_prompt(feedback, self.model)
+        refined = await self.complete(
+            f"{PERSONA} Re-verify the proposed solution, taking the other reviews into account.",
+            prompt,
+            temperature=0.3
+        )
         return {
             "role": self.role,
-            "refined_verification": "Updating verification...",
+            "prompt_tokens": prompt_tokens,
+            "refined_verification": refined,
             "updated_metrics": {}
         }
@@ -1,58 +1,70 @@
+from .agreement import parse_scores, score_instruction
 from .base_agent import BaseAgent
-import aiohttp
-import json
+from .context import build_prompt, build_review_prompt
+from .providers import ModelTarget
+
+PERSONA = "You are a Lead Problem Solver with PhD-level expertise."
 
 class LeadSolver(BaseAgent):
-    def __init__(self):
-        super().__init__(role="Lead Problem Solver")
+    def __init__(self, transport=None):
+        super().__init__(
+            role="Lead Problem Solver",
+            transport=transport,
+            target=ModelTarget("openai", "gpt-4-turbo-preview")
+        )
         
     async def process(self, context: dict) -> dict:
         """Generate initial solution based on problem context."""
-        # Example implementation using OpenAI API
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.openai_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "gpt-4-turbo-preview",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a Lead Problem Solver with PhD-level expertise. Generate an initial solution."
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(context)
-                    }
-                ],
-                "temperature": 0.7
-            }
-            
-            async with session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                result = await response.json()
-                return {
-                    "role": self.role,
-                    "proposal": result["choices"][0]["message"]["content"],
-                    "confidence": 0.8  # Example confidence score
-                }
+        prompt, prompt_tokens = build_prompt(context, self.model)
+        proposal = await self.complete(
+            f"{PERSONA} Generate an initial solution. " + score_instruction(["confidence"]),
+            prompt,
+            stream=True,
+            temperature=0.7
+        )
+        return {
+            "role": self.role,
+            "prompt_tokens": prompt_tokens,
+            "proposal": proposal,
+            # Self-reported by the model; None when it left it out
+            "confidence": parse_scores(proposal, ["confidence"])["confidence"]
+        }
     
+    def draft(self, text: str) -> dict:
+        """Provisional process() result from part of a streamed proposal."""
+        return {
+            "role": self.role,
+            "proposal": text,
+            "confidence": None
+        }
+
     async def critique(self, proposal: dict) -> dict:
         """Critique another agent's proposal."""
+        prompt, prompt_tokens = build_review_prompt(proposal, self.model)
+        feedback = await self.complete(
+            f"{PERSONA} Critique the proposed solution: point out errors, gaps and concrete improvements.",
+            prompt,
+            temperature=0.7
+        )
         return {
             "role": self.role,
-            "feedback": "Providing feedback on proposal...",
+            "prompt_tokens": prompt_tokens,
+            "feedback": feedback,
             "suggestions": []
         }
     
     async def refine(self, feedback: dict) -> dict:
         """Refine the solution based on feedback."""
+        prompt, prompt_tokens = build_review_prompt(feedback, self.model)
+        refined = await self.complete(
+            f"{PERSONA} Revise the proposed solution to address the critiques. "
+            "Reply with the complete improved solution.",
+            prompt,
+            temperature=0.7
+        )
         return {
             "role": self.role,
-            "refined_proposal": "Refined solution...",
+            "prompt_tokens": prompt_tokens,
+            "refined_proposal": refined,
             "changes_made": []
         }
@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from .context import TEXT_FIELDS, truncate
+from .embeddings import HashingEmbedder
+from .storage import connect, state_path
+
+# Characters kept per text field in a stored experience.
+RECORD_FIELD_CHARS = 500
+
+
+def compact_record(context: Dict) -> Dict:
+    """Reduce a pipeline context to a small, self-contained experience record."""
+    problem = context.get("problem", {})
+    record = {
+        "problem": truncate(str(problem.get("description", "")), RECORD_FIELD_CHARS),
+        "domain": problem.get("domain")
+    }
+    for response in context.get("agent_responses", []):
+        for field in TEXT_FIELDS:
+            value = response.get(field)
+            if isinstance(value, str) and value:
+                record[field] = truncate(value, RECORD_FIELD_CHARS)
+    return record
+
+
+def record_text(record: Dict) -> str:
+    """Text a record is indexed by."""
+    parts = [record.get("problem") or "", record.get("domain") or ""]
+    parts.extend(record.get(field) or "" for field in TEXT_FIELDS)
+    return " ".join(part for part in parts if part)
+
+
+class ExperienceStore:
+    """
+    Fixed-capacity ring buffer of past interactions with similarity search.
+
+    Embeddings live in a preallocated NumPy matrix, so memory stays flat
+    however long the process runs. With a path, each slot is mirrored to
+    SQLite (overwritten in place as the ring wraps) and reloaded on start.
+    Several processes may share one file: slots are allocated by the
+    database, and each process picks up the others' writes before reading.
+    Calls are serialized by a lock, so they may run in executor threads.
+    """
+
+    def __init__(self, capacity: int = 1000, path: Optional[str] = None,
+                 embedder: Optional[HashingEmbedder] = None):
+        self.capacity = capacity
+        self.embedder = embedder or HashingEmbedder()
+        self._vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self._records: List[Optional[Dict]] = [None] * capacity
+        self._next = 0
+        self._size = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS experiences ("
+                "slot INTEGER PRIMARY KEY, seq INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, record TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS experiences_seq ON experiences (seq)")
+            self._db.commit()
+            self._sync()
+
+    @classmethod
+    def from_env(cls) -> "ExperienceStore":
+        """Store sized by SIRIUS_MEMORY_CAPACITY, persisted to SIRIUS_MEMORY_PATH (or SIRIUS_STATE_DIR) if set."""
+        return cls(
+            capacity=int(os.getenv("SIRIUS_MEMORY_CAPACITY", "1000")),
+            path=state_path("SIRIUS_MEMORY_PATH", "memory.db")
+        )
+
+    def _sync(self):
+        # Records go back into the slots they were written to, keeping disk and memory aligned
+        rows = self._db.execute(
+            "SELECT slot, seq, record FROM experiences WHERE seq > ? AND slot < ? ORDER BY seq",
+            (self._seq, self.capacity)
+        ).fetchall()
+        for slot, _, raw in rows:
+            record = json.loads(raw)
+            if self._records[slot] is None:
+                self._size += 1
+            self._records[slot] = record
+            self._vectors[slot] = self.embedder.embed(record_text(record))
+        if rows:
+            self._next = (rows[-1][0] + 1) % self.capacity
+            self._seq = rows[-1][1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            return self._size
+
+    def _put(self, record: Dict) -> int:
+        slot = self._next
+        self._records[slot] = record
+        self._vectors[slot] = self.embedder.embed(record_text(record))
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return slot
+
+    def add(self, context: Dict) -> Dict:
+        """Store a compacted copy of `context`; the oldest entry is overwritten when full."""
+        record = compact_record(context)
+        with self._lock:
+            if self._db is None:
+                self._put(record)
+                self._seq += 1
+                return record
+            # One statement, so concurrent writers never claim the same sequence number
+            self._db.execute(
+                "INSERT OR REPLACE INTO experiences (slot, seq, created_at, record) "
+                "SELECT COALESCE(MAX(seq), 0) % ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM experiences",
+                (self.capacity, time.time(), json.dumps(record))
+            )
+            self._db.commit()
+            self._sync()
+        return record
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[Dict]:
+        """The `k` stored records most similar to `query`, best first."""
+        vector = self.embedder.embed(query)
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            if self._size == 0 or k <= 0:
+                return []
+            # Before the ring wraps, only the first _size slots are filled
+            scores = self._vectors[:self._size] @ vector
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                dict(self._records[i], similarity=round(float(scores[i]), 4))
+                for i in top if scores[i] > min_score
+            ]
+
+    def records(self) -> List[Dict]:
+        """All stored records, oldest first."""
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            if self._size < self.capacity:
+                return list(self._records[:self._size])
+            return self._records[self._next:] + self._records[:self._next]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,178 @@
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Whole requests and pipeline stages
+SOLVE_DURATION = REGISTRY.histogram(
+    "sirius_solve_duration_seconds", "End-to-end pipeline time per problem.", ["status"])
+STAGE_DURATION = REGISTRY.histogram(
+    "sirius_stage_duration_seconds", "Wall time of each pipeline stage.", ["stage", "status"])
+STAGE_DECISIONS = REGISTRY.counter(
+    "sirius_stage_decisions_total", "Stage-skipping policy decisions.", ["policy", "stage", "decision"])
+SPECULATIONS = REGISTRY.counter(
+    "sirius_speculations_total", "Stages started on a streamed prefix: kept, redone or restarted.", ["stage", "outcome"])
+ROUTES = REGISTRY.counter(
+    "sirius_routes_total", "Model tier chosen per agent, by problem complexity.", ["agent", "complexity", "tier"])
+ABANDONED = REGISTRY.counter(
+    "sirius_abandoned_total", "Solves cut short by their deadline or a client disconnect.", ["reason"])
+
+# Provider calls
+PROVIDER_QUEUE = REGISTRY.histogram(
+    "sirius_provider_queue_seconds", "Time spent waiting for provider rate limits and slots.", ["provider"])
+PROVIDER_LATENCY = REGISTRY.histogram(
+    "sirius_provider_request_seconds", "Provider HTTP round-trip time.", ["provider"])
+PROVIDER_ERRORS = REGISTRY.counter(
+    "sirius_provider_errors_total", "Provider calls that failed, by status.", ["provider", "status"])
+TOKENS = REGISTRY.counter(
+    "sirius_tokens_total", "Prompt and completion tokens per agent role.", ["role", "kind"])
+
+# Agent-call layers
+CACHE_REQUESTS = REGISTRY.counter(
+    "sirius_cache_requests_total", "Response cache lookups.", ["role", "result"])
+RETRIES = REGISTRY.counter(
+    "sirius_retries_total", "Retried provider calls.", ["provider"])
+HEDGES = REGISTRY.counter(
+    "sirius_hedged_requests_total", "Hedged requests sent, and how many won.", ["provider", "outcome"])
+FALLBACKS = REGISTRY.counter(
+    "sirius_fallbacks_total", "Calls served by a fallback provider.", ["role", "provider"])
+BATCH_SIZE = REGISTRY.histogram(
+    "sirius_batch_size", "Calls sent per micro-batch: merged into one request or multiplexed.",
+    ["provider", "mode"], buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+COALESCED = REGISTRY.counter(
+    "sirius_coalesced_total", "Calls that joined an identical one already in flight.", ["level"])
+
+# Refinement loop
+REFINEMENT_ROUNDS = REGISTRY.counter(
+    "sirius_refinement_rounds_total", "Critique/refine rounds run, by why the loop stopped.", ["outcome"])
+
+# Trajectory recording
+TRAJECTORIES = REGISTRY.counter(
+    "sirius_trajectories_total", "Pipeline runs recorded to trajectory shards.", ["outcome"])
+
+# Job queue
+JOBS = REGISTRY.counter(
+    "sirius_jobs_total", "Jobs submitted, finished, requeued or rejected.", ["outcome"])
+JOB_WAIT = REGISTRY.histogram(
+    "sirius_job_wait_seconds", "Time jobs spent queued before a worker claimed them.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0))
+WEBHOOKS = REGISTRY.counter(
+    "sirius_webhooks_total", "Job result webhook deliveries.", ["outcome"])
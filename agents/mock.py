@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+from collections import defaultdict
+from dataclasses import dataclass, fields, replace
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from .context import estimate_tokens
+from .ratelimit import RateLimiter
+from .transport import HTTPTransport
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z-]{3,}")
+# Score lines requested by agreement.score_instruction()
+_SCORE_REQUEST = re.compile(r"'([A-Z][A-Za-z ]*): <0-1>'")
+
+# Filler mixed into generated replies alongside words taken from the prompt
+VOCABULARY = (
+    "latency throughput model cache batch pipeline quantization accuracy tradeoff "
+    "deployment monitoring evaluation baseline risk mitigation cost scaling memory "
+    "inference training feature dataset validation strategy constraint metric"
+).split()
+
+
+@dataclass(frozen=True)
+class MockProfile:
+    """
+    Behaviour of one simulated provider.
+
+    Latency is lognormal around `latency` seconds with spread `jitter`;
+    `error_rate` and `rate_limit_rate` are the chances a call fails with
+    HTTP 500 or 429 (the latter with a Retry-After of `retry_after`).
+    Replies are `tokens` tokens long and, when streamed, arrive
+    `token_interval` seconds apart after the first.
+    """
+    latency: float = 1.0
+    jitter: float = 0.3
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    tokens: int = 150
+    token_interval: float = 0.0
+
+
+# Distinct payloads whose attempt counts are remembered before the slate is wiped
+MAX_TRACKED_PAYLOADS = 100000
+
+# Rough shape of each real provider: big models are slow, groq is fast.
+DEFAULT_PROFILES = {
+    "openai": MockProfile(latency=1.5, token_interval=0.01),
+    "anthropic": MockProfile(latency=2.0),
+    "groq": MockProfile(latency=0.4, token_interval=0.002),
+    "cohere": MockProfile(latency=1.0),
+    "vertex": MockProfile(latency=0.8)
+}
+
+
+def _digest(*parts: str) -> int:
+    material = "\x1f".join(parts).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest()[:8], "big")
+
+
+def provider_response(provider: str, text: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    """`text` in the reply format of `provider`, with a usage report."""
+    if provider == "anthropic":
+        return {"content": [{"type": "text", "text": text}],
+                "usage": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens}}
+    if provider == "cohere":
+        return {"generations": [{"text": text}],
+                "meta": {"billed_units": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens}}}
+    if provider == "vertex":
+        return {"predictions": [text]}
+    return {"choices": [{"message": {"content": text}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}}
+
+
+class MockTransport(HTTPTransport):
+    """
+    In-process stand-in for every provider, for running without API keys.
+
+    Calls go through the same rate limiter, metrics and error types as
+    HTTPTransport, but are answered locally after a simulated delay.
+    Everything is deterministic for a given seed: a request's latency,
+    failure and reply text depend only on the seed, the provider, the
+    payload and how many times that payload has been sent before (so a
+    retried call can succeed where the first attempt failed).
+    `time_scale` multiplies every simulated delay.
+    """
+
+    def __init__(self, profiles: Optional[Dict[str, MockProfile]] = None, seed: int = 0,
+                 time_scale: float = 1.0, rate_limiter: Optional[RateLimiter] = None):
+        super().__init__(rate_limiter=rate_limiter)
+        self.profiles = dict(DEFAULT_PROFILES, **(profiles or {}))
+        self.seed = seed
+        self.time_scale = time_scale
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._attempts: Dict[int, int] = defaultdict(int)
+
+    @classmethod
+    def from_env(cls) -> Optional["MockTransport"]:
+        """
+        A mock transport when SIRIUS_MOCK_PROVIDERS is set, otherwise None.
+
+        The variable is "1" for the default profiles or a JSON object of
+        per-provider overrides, e.g. {"openai": {"latency": 0.2, "error_rate": 0.05}}.
+        SIRIUS_MOCK_SEED and SIRIUS_MOCK_TIME_SCALE tune the rest.
+        """
+        setting = os.getenv("SIRIUS_MOCK_PROVIDERS")
+        if not setting:
+            return None
+        overrides = {} if setting.strip().lower() in ("1", "true", "yes") else json.loads(setting)
+        known = {f.name for f in fields(MockProfile)}
+        profiles = {
+            provider: replace(DEFAULT_PROFILES.get(provider, MockProfile()),
+                              **{k: v for k, v in values.items() if k in known})
+            for provider, values in overrides.items()
+        }
+        return cls(
+            profiles=profiles,
+            seed=int(os.getenv("SIRIUS_MOCK_SEED", "0")),
+            time_scale=float(os.getenv("SIRIUS_MOCK_TIME_SCALE", "1.0"))
+        )
+
+    async def session(self, provider: str):
+        return None
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        if self.batcher is not None:
+            await self.batcher.close()
+
+    def _plan(self, provider: str, payload: dict) -> Tuple[random.Random, MockProfile, str]:
+        body = json.dumps(payload, sort_keys=True, default=str)
+        key = _digest(str(self.seed), provider, body)
+        if len(self._attempts) >= MAX_TRACKED_PAYLOADS and key not in self._attempts:
+            self._attempts.clear()
+        attempt = self._attempts[key]
+        self._attempts[key] += 1
+        self.calls[provider] += 1
+        rng = random.Random(_digest(str(key), str(attempt)))
+        return rng, self.profiles.get(provider, MockProfile()), body
+
+    def _reply(self, rng: random.Random, profile: MockProfile, body: str) -> List[str]:
+        # Roughly one word per token, drawn from the prompt and a fixed vocabulary
+        pool = (_WORD.findall(body) or VOCABULARY)[-400:]
+        words = [rng.choice(pool) if rng.random() < 0.6 else rng.choice(VOCABULARY) for _ in range(profile.tokens)]
+        parts = [word + (". " if (i + 1) % 15 == 0 else " ") for i, word in enumerate(words)]
+        # Answer score requests the way a model would, so score parsing sees real values
+        parts.extend(f"\n{name}: {rng.uniform(0.4, 1.0):.2f}" for name in _SCORE_REQUEST.findall(body))
+        return parts
+
+    async def _respond(self, provider: str, rng: random.Random, profile: MockProfile):
+        """Wait out the simulated latency, then fail if this call is meant to."""
+        await asyncio.sleep(profile.latency * rng.lognormvariate(0.0, profile.jitter) * self.time_scale)
+        roll = rng.random()
+        if roll < profile.rate_limit_rate:
+            self._raise_status(provider, 429, "Too Many Requests", profile.retry_after * self.time_scale)
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            self._raise_status(provider, 500, "Internal Server Error", None)
+
+    async def send_json(self, provider: str, url: str, headers: dict, payload: dict,
+                        reserved: bool = False) -> dict:
+        instances = payload.get("instances") if provider == "vertex" else None
+        if instances is not None and len(instances) > 1:
+            return await self._send_instances(provider, payload, reserved)
+        rng, profile, body = self._plan(provider, payload)
+        async with self._admitted(provider, payload, reserved):
+            await self._respond(provider, rng, profile)
+            parts = self._reply(rng, profile, body)
+        prompt_tokens = estimate_tokens(json.dumps(payload, default=str))
+        return provider_response(provider, "".join(parts).strip(), prompt_tokens, len(parts))
+
+    async def _send_instances(self, provider: str, payload: dict, reserved: bool) -> dict:
+        """A batched prediction request: one delay, each instance answered as if sent alone."""
+        plans = [self._plan(provider, dict(payload, instances=[instance])) for instance in payload["instances"]]
+        rng, profile, _ = plans[0]
+        async with self._admitted(provider, payload, reserved):
+            await self._respond(provider, rng, profile)
+            predictions = ["".join(self._reply(rng, profile, body)).strip() for rng, profile, body in plans]
+        return {"predictions": predictions}
+
+    async def stream_events(self, provider: str, url: str, headers: dict, payload: dict) -> AsyncIterator[str]:
+        rng, profile, body = self._plan(provider, payload)
+        async with self._admitted(provider, payload):
+            await self._respond(provider, rng, profile)
+            for i, part in enumerate(self._reply(rng, profile, body)):
+                if i and profile.token_interval:
+                    await asyncio.sleep(profile.token_interval * self.time_scale)
+                yield json.dumps({"choices": [{"delta": {"content": part}}]})
+
@@ -0,0 +1,310 @@
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class ModelTarget:
+    """The provider and model an agent role is served by."""
+    provider: str
+    model: str
+
+    @classmethod
+    def parse(cls, value) -> "ModelTarget":
+        """From "provider/model" or {"provider": ..., "model": ...}."""
+        if isinstance(value, dict):
+            return cls(value["provider"], value["model"])
+        provider, _, model = str(value).partition("/")
+        if not model:
+            raise ValueError(f"Expected 'provider/model', got {value!r}")
+        return cls(provider, model)
+
+    def __str__(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+# Role -> target overriding the agent's own for calls made in the current task
+routed_targets: ContextVar[Optional[Dict[str, "ModelTarget"]]] = ContextVar("routed_targets", default=None)
+
+
+@contextmanager
+def use_targets(targets: Optional[Dict[str, "ModelTarget"]]):
+    """Serve the given roles by other models for agent calls made inside this block."""
+    if not targets:
+        yield
+        return
+    token = routed_targets.set(dict(routed_targets.get() or {}, **targets))
+    try:
+        yield
+    finally:
+        routed_targets.reset(token)
+
+
+class ProviderError(Exception):
+    """A provider answered with an error status."""
+
+    def __init__(self, provider: str, status: int, message: str = "",
+                 retry_after: Optional[float] = None):
+        super().__init__(f"{provider} returned HTTP {status}: {message}".rstrip(": "))
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RateLimitError(ProviderError):
+    """The provider throttled us (HTTP 429)."""
+
+
+# HTTP status standing for an error type named in a reply body; 502 for
+# anything else, since a reply that cannot be read is the upstream's fault
+ERROR_STATUS = {
+    "invalid_request_error": 400,
+    "authentication_error": 401,
+    "permission_error": 403,
+    "not_found_error": 404,
+    "rate_limit_error": 429,
+    "rate_limit_exceeded": 429,
+    "insufficient_quota": 429,
+    "api_error": 500,
+    "server_error": 500,
+    "overloaded_error": 529
+}
+
+
+class ProviderAdapter:
+    """
+    Translates a chat-style request into one provider's HTTP API and back.
+
+    Subclasses set `name` and `key_attr` (the agent attribute holding the
+    API key) and implement url(), payload() and parse().
+    """
+    name = ""
+    key_attr = ""
+    # Whether replies can be streamed as OpenAI-style server-sent events
+    streams = False
+
+    def url(self, model: str) -> str:
+        raise NotImplementedError
+
+    def headers(self, api_key: Optional[str]) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def payload(self, model: str, system: str, prompt: str,
+                temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> dict:
+        raise NotImplementedError
+
+    def parse(self, response: dict) -> str:
+        raise NotImplementedError
+
+    def error(self, response) -> ProviderError:
+        """
+        The error to raise for a reply parse() cannot read: the provider's
+        error payload ({"error": ...}, Anthropic's {"type": "error"}, or a
+        bare {"message": ...}) with its status where it names one.
+        """
+        body = response if isinstance(response, dict) else {}
+        error = body.get("error")
+        if not isinstance(error, dict):
+            error = {"message": error} if error else body
+        message = str(error.get("message") or json.dumps(response, default=str)[:500])
+        code = error.get("code")
+        if isinstance(code, int) and 400 <= code < 600:
+            status = code
+        else:
+            status = ERROR_STATUS.get(error.get("type"), ERROR_STATUS.get(code, 502))
+        kind = RateLimitError if status == 429 else ProviderError
+        return kind(self.name, status, message)
+
+    def merge(self, payloads: List[dict]) -> Optional[dict]:
+        """
+        One request carrying all of `payloads`, for endpoints that take
+        several inputs per call; None when they cannot be combined.
+        """
+        return None
+
+    def split(self, response: dict, payloads: List[dict]) -> List[dict]:
+        """Per-payload replies from the reply to merge(payloads)."""
+        raise NotImplementedError
+
+
+class OpenAIAdapter(ProviderAdapter):
+    name = "openai"
+    key_attr = "openai_key"
+    streams = True
+    base_url = "https://api.openai.com/v1"
+
+    def url(self, model: str) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def payload(self, model, system, prompt, temperature=None, max_tokens=None):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if temperature is not None:
+            payload["temperature"] = temperature
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        return payload
+
+    def parse(self, response):
+        try:
+            return response["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise self.error(response)
+
+
+class GroqAdapter(OpenAIAdapter):
+    """Groq serves an OpenAI-compatible API."""
+    name = "groq"
+    key_attr = "groq_key"
+    base_url = "https://api.groq.com/openai/v1"
+
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+    key_attr = "anthropic_key"
+    version = "2023-06-01"
+
+    def url(self, model):
+        return "https://api.anthropic.com/v1/messages"
+
+    def headers(self, api_key):
+        return {
+            "x-api-key": api_key or "",
+            "anthropic-version": self.version,
+            "Content-Type": "application/json"
+        }
+
+    def payload(self, model, system, prompt, temperature=None, max_tokens=None):
+        payload = {
+            "model": model,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}],
+            # Required by the Messages API
+            "max_tokens": max_tokens or 1000
+        }
+        if temperature is not None:
+            payload["temperature"] = temperature
+        return payload
+
+    def parse(self, response):
+        try:
+            return response["content"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            raise self.error(response)
+
+
+class CohereAdapter(ProviderAdapter):
+    name = "cohere"
+    key_attr = "cohere_key"
+
+    def url(self, model):
+        return "https://api.cohere.ai/v1/generate"
+
+    def payload(self, model, system, prompt, temperature=None, max_tokens=None):
+        payload = {"model": model, "prompt": f"{system} {prompt}"}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if temperature is not None:
+            payload["temperature"] = temperature
+        return payload
+
+    def parse(self, response):
+        try:
+            return response["generations"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            raise self.error(response)
+
+
+class VertexAdapter(ProviderAdapter):
+    """
+    A Vertex AI prediction endpoint; the "model" is the endpoint id.
+
+    The project and region come from VERTEX_PROJECT_ID and VERTEX_LOCATION.
+    """
+    name = "vertex"
+    key_attr = "google_key"
+
+    def __init__(self, project_id: Optional[str] = None, location: Optional[str] = None):
+        self.project_id = project_id
+        self.location = location
+
+    def url(self, model):
+        # Read at call time so values loaded from .env after import still apply
+        project = self.project_id or os.getenv("VERTEX_PROJECT_ID")
+        location = self.location or os.getenv("VERTEX_LOCATION", "us-central1")
+        return (
+            f"https://{location}-aiplatform.googleapis.com/v1/projects/{project}"
+            f"/locations/{location}/endpoints/{model}:predict"
+        )
+
+    def payload(self, model, system, prompt, temperature=None, max_tokens=None):
+        return {"instances": [{"task": system, "input": prompt}]}
+
+    def parse(self, response):
+        try:
+            return response["predictions"][0]
+        except (KeyError, IndexError, TypeError):
+            raise self.error(response)
+
+    def merge(self, payloads):
+        # Instances share one request when everything else about the calls matches
+        settings = [{k: v for k, v in payload.items() if k != "instances"} for payload in payloads]
+        if any("instances" not in payload for payload in payloads) or any(s != settings[0] for s in settings):
+            return None
+        return dict(settings[0], instances=[i for payload in payloads for i in payload["instances"]])
+
+    def split(self, response, payloads):
+        predictions = response["predictions"]
+        sizes = [len(payload["instances"]) for payload in payloads]
+        if len(predictions) != sum(sizes):
+            raise ValueError(f"Expected {sum(sizes)} predictions, got {len(predictions)}")
+        replies, start = [], 0
+        for size in sizes:
+            replies.append(dict(response, predictions=predictions[start:start + size]))
+            start += size
+        return replies
+
+
+PROVIDER_ADAPTERS: Dict[str, ProviderAdapter] = {}
+
+
+def register_provider(adapter: ProviderAdapter) -> ProviderAdapter:
+    """Make a provider available to role mappings under `adapter.name`."""
+    PROVIDER_ADAPTERS[adapter.name] = adapter
+    return adapter
+
+
+def get_provider(name: str) -> ProviderAdapter:
+    try:
+        return PROVIDER_ADAPTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown provider {name!r}; known: {', '.join(sorted(PROVIDER_ADAPTERS))}")
+
+
+for _adapter in (OpenAIAdapter(), GroqAdapter(), AnthropicAdapter(), CohereAdapter(), VertexAdapter()):
+    register_provider(_adapter)
+
+
+def role_models_from_env() -> Dict[str, ModelTarget]:
+    """
+    Per-agent overrides from SIRIUS_ROLE_MODELS, a JSON object keyed by
+    agent name, e.g. {"critic": "groq/mixtral-8x7b-32768"}.
+    """
+    raw = os.getenv("SIRIUS_ROLE_MODELS")
+    if not raw:
+        return {}
+    targets = {name: ModelTarget.parse(value) for name, value in json.loads(raw).items()}
+    for target in targets.values():
+        get_provider(target.provider)
+    return targets
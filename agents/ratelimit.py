@@ -0,0 +1,281 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from .storage import connect, state_path, worker_count
+
+# Conservative defaults per provider; override with SIRIUS_RATE_LIMITS.
+DEFAULT_LIMITS = {
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 150000, "max_concurrency": 16},
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 40000, "max_concurrency": 8},
+    "groq": {"requests_per_minute": 30, "tokens_per_minute": 20000, "max_concurrency": 8},
+    "cohere": {"requests_per_minute": 100, "tokens_per_minute": 100000, "max_concurrency": 8},
+    "vertex": {"requests_per_minute": 300, "tokens_per_minute": 300000, "max_concurrency": 16}
+}
+DEFAULT_MAX_QUEUE = 64
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute`; waiters are served in FIFO order."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        # A single oversized request may take the whole bucket but never more
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+    def pause(self, seconds: float):
+        """Withhold tokens for `seconds`, e.g. for a provider's Retry-After."""
+        self._refill()
+        self.available = min(self.available, -seconds * self.rate)
+
+
+class SharedTokenBucket:
+    """
+    A TokenBucket whose level lives in SQLite, so every worker process
+    drawing on the same provider quota takes from one bucket.
+
+    Each take is a short write transaction run off the event loop; a
+    process-local lock keeps this process's waiters in FIFO order.
+    """
+
+    def __init__(self, path: str, key: str, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.key = key
+        self._lock = asyncio.Lock()
+        # One connection per bucket; takes and pauses use it from executor threads, one at a time
+        self._db_lock = threading.Lock()
+        self._closed = False
+        self._db = connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, available REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "INSERT OR IGNORE INTO buckets (key, available, updated) VALUES (?, ?, ?)",
+            (key, self.capacity, time.time())
+        )
+        self._db.commit()
+
+    def _take(self, amount: float) -> float:
+        """Take `amount` if available; otherwise return the seconds until it will be."""
+        with self._db_lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            available, updated = self._db.execute(
+                "SELECT available, updated FROM buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            now = time.time()
+            available = min(self.capacity, available + max(0.0, now - updated) * self.rate)
+            wait = 0.0
+            if available >= amount:
+                available -= amount
+            else:
+                wait = (amount - available) / self.rate
+            self._db.execute(
+                "UPDATE buckets SET available = ?, updated = ? WHERE key = ?", (available, now, self.key)
+            )
+        return wait
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                wait = await loop.run_in_executor(None, self._take, amount)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+
+    def _pause(self, seconds: float):
+        # Refill up to now before clamping, as TokenBucket.pause does, so the next take
+        # does not credit the pause with tokens that accrued before it
+        now = time.time()
+        with self._db_lock:
+            if self._closed:
+                return
+            with self._db:
+                self._db.execute(
+                    "UPDATE buckets SET available = MIN(?, available + MAX(0.0, ? - updated) * ?, ?), "
+                    "updated = ? WHERE key = ?",
+                    (self.capacity, now, self.rate, -seconds * self.rate, now, self.key)
+                )
+
+    def pause(self, seconds: float):
+        """Withhold tokens from every worker for `seconds`; inside an event loop the write runs off it."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._pause(seconds)
+            return
+        loop.run_in_executor(None, self._pause, seconds)
+
+    def close(self):
+        with self._db_lock:
+            self._closed = True
+            self._db.close()
+
+
+class ProviderLimiter:
+    """Request-rate, token-rate and concurrency limits for one provider."""
+
+    def __init__(self, provider: str, requests_per_minute: float, tokens_per_minute: float,
+                 max_concurrency: int, max_queue: int = DEFAULT_MAX_QUEUE,
+                 path: Optional[str] = None):
+        self.provider = provider
+        if path:
+            self.requests = SharedTokenBucket(path, f"{provider}:requests", requests_per_minute)
+            self.tokens = SharedTokenBucket(path, f"{provider}:tokens", tokens_per_minute)
+        else:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.paused_until = 0.0
+        self.throttled = 0
+
+    def pause(self, seconds: float):
+        """Hold back new requests, e.g. for a provider's Retry-After."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.throttled += 1
+        # Shared buckets pass the pause on to the other workers
+        self.requests.pause(seconds)
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    @property
+    def overloaded(self) -> bool:
+        return self.waiting >= self.max_queue
+
+    async def reserve(self, requests: int = 1, tokens: int = 0):
+        """Draw request and token budget, after waiting out any Retry-After pause."""
+        while self.retry_after > 0:
+            await asyncio.sleep(self.retry_after)
+        await self.requests.acquire(requests)
+        if tokens:
+            await self.tokens.acquire(tokens)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0, reserved: bool = False) -> AsyncIterator[None]:
+        """
+        Wait for capacity, then hold a concurrency slot for the request.
+        With reserved=True its budget was already drawn by reserve().
+        """
+        self.waiting += 1
+        try:
+            if not reserved:
+                await self.reserve(1, tokens)
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "waiting": self.waiting,
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "retry_after": round(self.retry_after, 3),
+            "throttled": self.throttled
+        }
+
+
+class RateLimiter:
+    """
+    Registry of per-provider limiters shared by every agent.
+
+    With a path, request and token budgets are drawn from SQLite buckets
+    shared by all `workers` processes using the file, and each process
+    gets its share of every provider's concurrency limit.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None, max_queue: int = DEFAULT_MAX_QUEUE,
+                 path: Optional[str] = None, workers: int = 1):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.max_queue = max_queue
+        self.path = path
+        self.workers = workers
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Limits from SIRIUS_RATE_LIMITS (JSON, keyed by provider) and SIRIUS_MAX_QUEUE,
+        shared through SIRIUS_RATE_LIMIT_PATH (or SIRIUS_STATE_DIR) between
+        SIRIUS_WORKERS processes.
+        """
+        raw = os.getenv("SIRIUS_RATE_LIMITS")
+        limits = {}
+        if raw:
+            for provider, overrides in json.loads(raw).items():
+                limits[provider] = dict(DEFAULT_LIMITS.get(provider, {}), **overrides)
+        return cls(
+            limits,
+            max_queue=int(os.getenv("SIRIUS_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+            path=state_path("SIRIUS_RATE_LIMIT_PATH", "ratelimit.db"),
+            workers=worker_count()
+        )
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            config = dict(self.limits.get(provider, DEFAULT_LIMITS["openai"]))
+            if self.path:
+                config["max_concurrency"] = max(1, math.ceil(config["max_concurrency"] / self.workers))
+            limiter = ProviderLimiter(provider, max_queue=self.max_queue, path=self.path, **config)
+            self._limiters[provider] = limiter
+        return limiter
+
+    def queue_depth(self) -> int:
+        return sum(limiter.waiting for limiter in self._limiters.values())
+
+    def overloaded(self) -> bool:
+        """True when any provider's queue is full and new work should be shed."""
+        return any(limiter.overloaded for limiter in self._limiters.values())
+
+    def retry_after(self) -> float:
+        return max((limiter.retry_after for limiter in self._limiters.values()), default=0.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {name: limiter.snapshot() for name, limiter in self._limiters.items()}
+
+    def close(self):
+        """Close shared buckets; limiters created afterwards are process-local."""
+        for limiter in self._limiters.values():
+            for bucket in (limiter.requests, limiter.tokens):
+                if isinstance(bucket, SharedTokenBucket):
+                    bucket.close()
+        self._limiters.clear()
+        self.path = None
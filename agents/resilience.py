@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+import aiohttp
+from .deadline import DeadlineExceeded, expired, remaining
+from .providers import get_provider
+from .transport import ProviderError
+from .metrics import FALLBACKS, HEDGES, RETRIES
+
+# OpenAI-compatible providers a role can fall back to, and the model used on each.
+FALLBACK_TARGETS = {
+    "openai": "gpt-4-turbo-preview",
+    "groq": "mixtral-8x7b-32768"
+}
+
+# Role -> providers tried in order once the primary has exhausted its retries.
+DEFAULT_FALLBACKS = {
+    "Lead Problem Solver": ["groq"],
+    "Critic": ["openai"],
+    "Judgment": ["openai"],
+    "Strategist": ["openai"],
+    "Data Augmentor": ["openai"],
+    "Consensus Builder": ["groq"]
+}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Errors worth retrying: throttling, provider 5xx, timeouts and connection failures."""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, ProviderError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError))
+
+
+def fallback_payload(payload: dict, model: str) -> dict:
+    """Re-express any agent request as an OpenAI-style chat completion."""
+    if "messages" in payload:
+        messages = payload["messages"]
+        if payload.get("system"):
+            messages = [{"role": "system", "content": payload["system"]}, *messages]
+    elif "prompt" in payload:
+        messages = [{"role": "user", "content": payload["prompt"]}]
+    else:
+        messages = [{"role": "user", "content": json.dumps(payload.get("instances", payload), default=str)}]
+    converted = {"model": model, "messages": messages}
+    for field in ("temperature", "max_tokens"):
+        if field in payload:
+            converted[field] = payload[field]
+    return converted
+
+
+def as_provider_response(provider: str, text: str) -> dict:
+    """Wrap fallback text in the response shape the primary provider's caller expects."""
+    if provider == "anthropic":
+        return {"content": [{"type": "text", "text": text}]}
+    if provider == "cohere":
+        return {"generations": [{"text": text}]}
+    if provider == "vertex":
+        return {"predictions": [text]}
+    return {"choices": [{"message": {"content": text}}]}
+
+
+class LatencyTracker:
+    """Rolling window of call latencies per key, for hedging thresholds."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, key: str, seconds: float):
+        self._samples[key].append(seconds)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResiliencePolicy:
+    """
+    Retries with exponential backoff, optional hedged requests and
+    per-role provider fallbacks for agent calls.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 hedge_percentile: Optional[float] = None, hedge_min_samples: int = 20,
+                 fallbacks: Optional[Dict[str, List[str]]] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.fallbacks = DEFAULT_FALLBACKS if fallbacks is None else fallbacks
+        self.latency = LatencyTracker()
+        self.stats: Dict[str, int] = {"retries": 0, "hedges": 0, "hedge_wins": 0, "fallbacks": 0, "failures": 0}
+
+    @classmethod
+    def from_env(cls) -> "ResiliencePolicy":
+        """Settings from SIRIUS_RETRY_ATTEMPTS, SIRIUS_HEDGE_PERCENTILE and SIRIUS_FALLBACKS (JSON)."""
+        hedge = os.getenv("SIRIUS_HEDGE_PERCENTILE")
+        fallbacks = os.getenv("SIRIUS_FALLBACKS")
+        return cls(
+            max_attempts=int(os.getenv("SIRIUS_RETRY_ATTEMPTS", "3")),
+            hedge_percentile=float(hedge) if hedge else None,
+            fallbacks=json.loads(fallbacks) if fallbacks else None
+        )
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return retry_after
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _timed(self, key: str, call: Callable[[], Awaitable[dict]]) -> dict:
+        started = time.monotonic()
+        result = await call()
+        self.latency.record(key, time.monotonic() - started)
+        return result
+
+    async def _hedged(self, key: str, provider: str, call: Callable[[], Awaitable[dict]]) -> dict:
+        """Send a second copy of a request that outlives the latency percentile."""
+        threshold = None
+        if self.hedge_percentile is not None:
+            threshold = self.latency.percentile(key, self.hedge_percentile, self.hedge_min_samples)
+        if threshold is None:
+            return await self._timed(key, call)
+
+        primary = asyncio.ensure_future(self._timed(key, call))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=threshold)
+            if done:
+                return primary.result()
+
+            self.stats["hedges"] += 1
+            HEDGES.inc(provider=provider, outcome="sent")
+            hedge = asyncio.ensure_future(self._timed(key, call))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                            HEDGES.inc(provider=provider, outcome="won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Also reached on cancellation, so no request is left orphaned
+            for task in pending:
+                task.cancel()
+
+    async def call(self, key: str, provider: str, call: Callable[[], Awaitable[dict]],
+                   hedge: bool = True) -> dict:
+        """Run `call` with retries on transient errors (and hedging when enabled)."""
+        attempt = 0
+        while True:
+            try:
+                if hedge:
+                    return await self._hedged(key, provider, call)
+                return await self._timed(key, call)
+            except Exception as e:
+                attempt += 1
+                if not is_transient(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt - 1, e)
+                left = remaining()
+                if left is not None and delay >= left:
+                    # The retry could not finish in time; fail now rather than sleep
+                    raise
+                self.stats["retries"] += 1
+                RETRIES.inc(provider=provider)
+                await asyncio.sleep(delay)
+
+    async def execute(self, agent, provider: str, url: str, headers: dict, payload: dict,
+                      send: Callable[[str, str, dict, dict], Awaitable[dict]],
+                      hedge: bool = True) -> dict:
+        """
+        Call the agent's primary provider, then each configured fallback in turn.
+
+        `send(provider, url, headers, payload)` performs a single request.
+        Fallback replies are reshaped to match the primary provider's format.
+        """
+        try:
+            return await self.call(
+                f"{agent.role}:{provider}",
+                provider,
+                lambda: send(provider, url, headers, payload),
+                hedge=hedge
+            )
+        except Exception as primary_error:
+            if not is_transient(primary_error):
+                self.stats["failures"] += 1
+                raise
+            for target_name in self.fallbacks.get(agent.role, []):
+                model = FALLBACK_TARGETS.get(target_name)
+                if model is None or target_name == provider:
+                    continue
+                if expired():
+                    break
+                adapter = get_provider(target_name)
+                fallback_url = adapter.url(model)
+                fallback_headers = adapter.headers(getattr(agent, adapter.key_attr, None))
+                fallback = fallback_payload(payload, model)
+                try:
+                    result = await self.call(
+                        f"{agent.role}:{target_name}",
+                        target_name,
+                        lambda: send(target_name, fallback_url, fallback_headers, fallback),
+                        hedge=hedge
+                    )
+                except Exception:
+                    continue
+                if "error" in result:
+                    continue
+                self.stats["fallbacks"] += 1
+                FALLBACKS.inc(role=agent.role, provider=target_name)
+                return as_provider_response(provider, adapter.parse(result))
+            self.stats["failures"] += 1
+            raise primary_error
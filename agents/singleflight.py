@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, TypeVar
+from .metrics import COALESCED
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Runs at most one call per key at a time; concurrent callers with the
+    same key await that call and share its result or exception.
+
+    The call runs as its own task, so one caller going away (a dropped
+    client, a timeout) does not cancel it for the others; it is cancelled
+    only when every caller waiting on it has gone.
+    """
+
+    def __init__(self, level: str):
+        self.level = level
+        self._flights: Dict[str, _Flight[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            COALESCED.inc(level=self.level)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _land(self, key: str, flight: _Flight[T]):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Retrieved here so an exception nobody awaited is not logged as lost
+            flight.task.exception()
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+from typing import Optional
+
+# Seconds a write waits for another worker's transaction before failing
+BUSY_TIMEOUT = 5.0
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database that several worker processes can share.
+
+    WAL mode lets readers proceed while one worker writes, and the busy
+    timeout makes concurrent writers queue instead of failing outright.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+
+def state_path(variable: str, filename: str) -> Optional[str]:
+    """
+    Database path from `variable`, else `filename` inside SIRIUS_STATE_DIR.
+
+    Setting only SIRIUS_STATE_DIR puts the cache, experience memory,
+    solution index and rate limits in one directory every worker shares.
+    """
+    path = os.getenv(variable)
+    if path:
+        return path
+    directory = os.getenv("SIRIUS_STATE_DIR")
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def worker_count() -> int:
+    """Serving processes sharing the state: SIRIUS_WORKERS, or gunicorn's WEB_CONCURRENCY."""
+    return max(1, int(os.getenv("SIRIUS_WORKERS") or os.getenv("WEB_CONCURRENCY") or "1"))
@@ -1,55 +1,67 @@
 from .base_agent import BaseAgent
-import aiohttp
-import json
+from .context import build_prompt, build_review_prompt
+from .providers import ModelTarget
+
+PERSONA = "As a Strategic Planning Expert,"
 
 class StrategistAgent(BaseAgent):
-    def __init__(self):
-        super().__init__(role="Strategist")
+    def __init__(self, transport=None):
+        super().__init__(
+            role="Strategist",
+            transport=transport,
+            target=ModelTarget("cohere", "command")
+        )
         
     async def process(self, context: dict) -> dict:
         """Analyze long-term implications and strategic considerations."""
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {self.cohere_key}",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "model": "command",
-                "prompt": f"As a Strategic Planning Expert, analyze the long-term implications of this solution: {json.dumps(context)}",
-                "max_tokens": 1000,
-                "temperature": 0.4
-            }
-            
-            async with session.post(
-                "https://api.cohere.ai/v1/generate",
-                headers=headers,
-                json=payload
-            ) as response:
-                result = await response.json()
-                return {
-                    "role": self.role,
-                    "strategic_analysis": result["generations"][0]["text"],
-                    "implications": {
-                        "short_term": [],
-                        "medium_term": [],
-                        "long_term": []
-                    },
-                    "risks": [],
-                    "opportunities": []
-                }
+        prompt, prompt_tokens = build_prompt(context, self.model)
+        analysis = await self.complete(
+            f"{PERSONA} analyze the long-term implications of this solution:",
+            prompt,
+            temperature=0.4,
+            max_tokens=1000
+        )
+        return {
+            "role": self.role,
+            "prompt_tokens": prompt_tokens,
+            "strategic_analysis": analysis,
+            "implications": {
+                "short_term": [],
+                "medium_term": [],
+                "long_term": []
+            },
+            "risks": [],
+            "opportunities": []
+        }
     
     async def critique(self, proposal: dict) -> dict:
         """Evaluate strategic aspects of another agent's proposal."""
+        prompt, prompt_tokens = build_review_prompt(proposal, self.model)
+        critique = await self.complete(
+            f"{PERSONA} critique the strategic soundness of this solution and recommend changes:",
+            prompt,
+            temperature=0.4,
+            max_tokens=1000
+        )
         return {
             "role": self.role,
-            "strategic_critique": "Analyzing strategic implications...",
+            "prompt_tokens": prompt_tokens,
+            "strategic_critique": critique,
             "recommendations": []
         }
     
     async def refine(self, feedback: dict) -> dict:
         """Refine strategic analysis based on feedback."""
+        prompt, prompt_tokens = build_review_prompt(feedback, self.model)
+        refined = await self.complete(
+            f"{PERSONA} revise the strategic analysis of this solution in light of these reviews:",
+            prompt,
+            temperature=0.4,
+            max_tokens=1000
+        )
         return {
             "role": self.role,
-            "refined_strategy": "Updating strategic analysis...",
+            "prompt_tokens": prompt_tokens,
+            "refined_strategy": refined,
             "updated_implications": {}
         }
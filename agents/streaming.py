@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+TokenSink = Callable[[Optional[str]], None]
+
+# Receives text deltas from the agent call running in the current task, and
+# None when the text streamed so far is withdrawn: a failed attempt is being
+# retried, or has fallen back to another provider, and the reply starts over.
+token_sink: ContextVar[Optional[TokenSink]] = ContextVar("token_sink", default=None)
+
+
+@contextmanager
+def stream_tokens(sink: Optional[TokenSink]):
+    """Route token deltas of agent calls made inside this block to `sink`."""
+    token = token_sink.set(sink)
+    try:
+        yield
+    finally:
+        token_sink.reset(token)
@@ -0,0 +1,19 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+Transcript = List[Dict[str, str]]
+
+# Receives {"model", "system", "prompt", "completion"} for each completion made
+# by the agent call running in the current task, exactly as it was sent
+transcript: ContextVar[Optional[Transcript]] = ContextVar("transcript", default=None)
+
+
+@contextmanager
+def record_calls(calls: Optional[Transcript]):
+    """Append the messages of agent completions made inside this block to `calls`."""
+    token = transcript.set(calls)
+    try:
+        yield
+    finally:
+        transcript.reset(token)
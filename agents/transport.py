@@ -0,0 +1,190 @@
+import aiohttp
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from .batching import MicroBatcher
+from .context import estimate_tokens
+from .ratelimit import RateLimiter
+from .metrics import PROVIDER_ERRORS, PROVIDER_LATENCY, PROVIDER_QUEUE
+# Defined with the adapters, which raise them for error payloads; re-exported here
+from .providers import ProviderError, RateLimitError
+
+# Providers the agents talk to; each gets its own connection pool.
+PROVIDERS = ("openai", "anthropic", "groq", "cohere", "vertex")
+
+
+def _retry_after(headers) -> Optional[float]:
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def request_tokens(payload: dict) -> int:
+    """Tokens a request is charged against the provider's tokens-per-minute limit."""
+    return estimate_tokens(json.dumps(payload, default=str)) + int(payload.get("max_tokens", 0))
+
+
+class HTTPTransport:
+    """Shared, pooled HTTP client used by every agent.
+
+    Sessions are created lazily (inside the running event loop) and kept
+    open until close() so that TCP/TLS connections are reused across calls.
+    """
+
+    _shared: Optional["HTTPTransport"] = None
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        ttl_dns_cache: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 120.0,
+        provider_limits: Optional[Dict[str, int]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        batcher: Optional[MicroBatcher] = None
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.provider_limits = provider_limits or {}
+        self.rate_limiter = rate_limiter or RateLimiter.from_env()
+        # Micro-batching of plain calls, off unless configured (SIRIUS_BATCH_WINDOW)
+        self.batcher = batcher if batcher is not None else MicroBatcher.from_env()
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+
+    @classmethod
+    def shared(cls) -> "HTTPTransport":
+        """Process-wide default transport for agents built without one."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _build_session(self, provider: str) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.provider_limits.get(provider, self.limit),
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def session(self, provider: str) -> aiohttp.ClientSession:
+        """Return the pooled session for a provider, opening it on first use."""
+        session = self._sessions.get(provider)
+        if session is None or session.closed:
+            session = self._build_session(provider)
+            self._sessions[provider] = session
+        return session
+
+    async def start(self):
+        """Eagerly open a pool for every known provider."""
+        for provider in PROVIDERS:
+            await self.session(provider)
+
+    @asynccontextmanager
+    async def _admitted(self, provider: str, payload: dict, reserved: bool = False) -> AsyncIterator[None]:
+        """Hold a rate-limiter slot for one call and record its queueing, latency and errors."""
+        queued = time.monotonic()
+        async with self.rate_limiter.limiter(provider).slot(request_tokens(payload), reserved=reserved):
+            started = time.monotonic()
+            PROVIDER_QUEUE.observe(started - queued, provider=provider)
+            try:
+                yield
+            except ProviderError as e:
+                PROVIDER_ERRORS.inc(provider=provider, status=str(e.status))
+                raise
+            except Exception as e:
+                PROVIDER_ERRORS.inc(provider=provider, status=type(e).__name__)
+                raise
+            finally:
+                PROVIDER_LATENCY.observe(time.monotonic() - started, provider=provider)
+
+    @asynccontextmanager
+    async def _request(self, provider: str, url: str, headers: dict, payload: dict,
+                       reserved: bool = False) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Rate-limited, instrumented POST over the provider's pool."""
+        session = await self.session(provider)
+        async with self._admitted(provider, payload, reserved):
+            async with session.post(url, headers=headers, json=payload) as response:
+                await self._check_status(provider, response)
+                yield response
+
+    async def post_json(self, provider: str, url: str, headers: dict, payload: dict) -> dict:
+        """
+        POST a JSON payload over the provider's pool and decode the reply.
+        With micro-batching on, the call joins the provider's current batch.
+        """
+        if self.batcher is not None and self.batcher.batches(provider):
+            return await self.batcher.submit(self, provider, url, headers, payload)
+        return await self.send_json(provider, url, headers, payload)
+
+    async def send_json(self, provider: str, url: str, headers: dict, payload: dict,
+                        reserved: bool = False) -> dict:
+        """POST one request right away; reserved=True when reserve() already paid for it."""
+        async with self._request(provider, url, headers, payload, reserved) as response:
+            return await response.json()
+
+    async def reserve(self, provider: str, payloads: List[dict]):
+        """Draw the request and token budget of several calls from the rate limiter at once."""
+        await self.rate_limiter.limiter(provider).reserve(
+            len(payloads), sum(request_tokens(payload) for payload in payloads)
+        )
+
+    async def stream_events(self, provider: str, url: str, headers: dict, payload: dict) -> AsyncIterator[str]:
+        """POST a request and yield the data field of each server-sent event."""
+        async with self._request(provider, url, headers, payload) as response:
+            async for raw in response.content:
+                line = raw.decode("utf-8").strip()
+                if line.startswith("data:"):
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    yield data
+
+    async def _check_status(self, provider: str, response: aiohttp.ClientResponse):
+        """
+        Raise on any non-2xx reply, with the body as the message, so an error
+        is never taken for an empty answer. Throttling and server errors are
+        retried by callers; on 429/503 the whole provider also backs off for
+        its Retry-After.
+        """
+        if 200 <= response.status < 300:
+            return
+        body = (await response.text(errors="replace")).strip()
+        self._raise_status(provider, response.status, body[:500] or response.reason or "",
+                           _retry_after(response.headers))
+
+    def _raise_status(self, provider: str, status: int, message: str, retry_after: Optional[float]):
+        if retry_after is not None:
+            self.rate_limiter.limiter(provider).pause(retry_after)
+        error = RateLimitError if status == 429 else ProviderError
+        raise error(provider, status, message, retry_after=retry_after)
+
+    async def close(self):
+        """Send any queued batches, then close every open pool."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        if HTTPTransport._shared is self:
+            HTTPTransport._shared = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
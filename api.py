@@ -1,31 +1,94 @@
 from aiohttp import web
+import argparse
 import json
 from typing import Dict, List, Optional
 import asyncio
+import math
+import os
+import signal
+import socket
+import tempfile
+import time
 from datetime import datetime
-from agents import (
-    LeadSolver,
-    CriticAgent,
-    JudgmentAgent,
-    StrategistAgent,
-    DataAugmentorAgent,
-    ConsensusBuilderAgent
-)
-
-# Initialize agents
-agents = {
-    "lead_solver": LeadSolver(),
-    "critic": CriticAgent(),
-    "judgment": JudgmentAgent(),
-    "strategist": StrategistAgent(),
-    "data_augmentor": DataAugmentorAgent(),
-    "consensus_builder": ConsensusBuilderAgent()
-}
+from agents import ProviderError, deadline_after, parse_duration
+from agents.metrics import ABANDONED, REGISTRY
+from engine import Orchestrator, JobQueue, QueueFull, parse_priority, solve_batch, batch_item_id, batch_record
+
+ORCHESTRATOR = web.AppKey("orchestrator", Orchestrator)
+JOB_QUEUE = web.AppKey("job_queue", JobQueue)
+
+MAX_BATCH_SIZE = 100
+MAX_BATCH_CONCURRENCY = 8
+# Seconds before replacing a worker that died, so a crash loop cannot spin
+RESTART_DELAY = 1.0
+# How often in-flight requests check whether their client is still connected
+DISCONNECT_POLL = 0.5
+
+def use_cache(request) -> bool:
+    """Clients opt out of cached responses with ?cache=false or Cache-Control: no-cache."""
+    if request.query.get("cache", "").lower() in ("0", "false", "no"):
+        return False
+    return "no-cache" not in request.headers.get("Cache-Control", "").lower()
+
+def request_deadline(request, body: Dict) -> Optional[float]:
+    """
+    Seconds the client allows: the X-Request-Timeout header or a "deadline"
+    field in the body (seconds, or e.g. "500ms", "30s"), whichever is shorter.
+    Raises ValueError for a malformed value.
+    """
+    limits = [
+        parse_duration(value)
+        for value in (request.headers.get("X-Request-Timeout"), body.pop("deadline", None))
+        if value is not None
+    ]
+    return min(limits) if limits else None
+
+def watch_disconnect(request) -> asyncio.Task:
+    """
+    Cancel the current handler once its client disconnects, which cancels
+    the solve it awaits and every provider request still in flight for it.
+    The caller cancels the returned watcher when the handler finishes.
+    """
+    handler = asyncio.current_task()
+
+    async def watch():
+        while request.transport is not None and not request.transport.is_closing():
+            await asyncio.sleep(DISCONNECT_POLL)
+        ABANDONED.inc(reason="disconnect")
+        handler.cancel()
+
+    return asyncio.ensure_future(watch())
+
+def overloaded_response(orchestrator: Orchestrator) -> Optional[web.Response]:
+    """503 with Retry-After when provider queues are full, instead of piling up work."""
+    limiter = orchestrator.rate_limiter
+    if not limiter.overloaded():
+        return None
+    return web.json_response(
+        {"error": "Server is overloaded, retry later", "queue_depth": limiter.queue_depth()},
+        status=503,
+        headers={"Retry-After": str(max(1, math.ceil(limiter.retry_after())))}
+    )
+
+def error_response(error: Exception) -> web.Response:
+    """Provider throttling surfaces as 503 with Retry-After; anything else as 500."""
+    cause = getattr(error, "error", error)
+    if isinstance(cause, ProviderError) and cause.status in (429, 503):
+        return web.json_response(
+            {"error": str(error)},
+            status=503,
+            headers={"Retry-After": str(max(1, math.ceil(cause.retry_after or 1)))}
+        )
+    return web.json_response(
+        {"error": str(error)},
+        status=500
+    )
 
 async def solve_problem(request):
     """
     Solve a problem using the multi-agent system.
     """
+    orchestrator = request.app[ORCHESTRATOR]
     try:
         # Parse request body
         body = await request.json()
@@ -37,52 +100,26 @@ async def solve_problem(request):
                 status=400
             )
             
-        # Create context
-        context = {
-            "problem": body,
-            "timestamp": datetime.utcnow().isoformat(),
-            "agent_responses": []
-        }
-        
-        # Step 1: Generate initial solution
-        initial_solution = await agents["lead_solver"].process(context)
-        context["agent_responses"].append(initial_solution)
-        
-        # Step 2: Get critique
-        critique = await agents["critic"].process(context)
-        context["agent_responses"].append(critique)
-        
-        # Step 3: Verify facts and logic
-        verification = await agents["judgment"].process(context)
-        context["agent_responses"].append(verification)
-        
-        # Step 4: Analyze strategic implications
-        strategic_analysis = await agents["strategist"].process(context)
-        context["agent_responses"].append(strategic_analysis)
-        
-        # Step 5: Augment with learned patterns
-        augmented_solution = await agents["data_augmentor"].process(context)
-        context["agent_responses"].append(augmented_solution)
-        
-        # Step 6: Build consensus
-        consensus = await agents["consensus_builder"].process(context)
-        
-        response = {
-            "problem_id": str(hash(body["description"])),
-            "initial_solution": initial_solution,
-            "critiques": [critique],
-            "verification": verification,
-            "strategic_analysis": strategic_analysis,
-            "augmented_solution": augmented_solution,
-            "final_consensus": consensus,
-            "metadata": {
-                "timestamp": context["timestamp"],
-                "processing_time": "calculated_time",
-                "confidence_score": consensus["agreement_metrics"]["harmony_score"]
-            }
-        }
-        
-        return web.json_response(response)
+        try:
+            deadline = request_deadline(request, body)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        shed = overloaded_response(orchestrator)
+        if shed is not None:
+            return shed
+
+        # Run the agent DAG; independent stages execute concurrently
+        watcher = watch_disconnect(request)
+        try:
+            run = await orchestrator.solve(body, use_cache=use_cache(request), deadline=deadline)
+        finally:
+            watcher.cancel()
+        if run.error is not None and not run.deadline_exceeded:
+            return error_response(run.error)
+
+        # Past the deadline, the stages that finished are returned as a partial result
+        return web.json_response(run.to_response())
         
     except Exception as e:
         return web.json_response(
@@ -90,10 +127,181 @@ async def solve_problem(request):
             status=500
         )
 
+async def solve_problem_stream(request):
+    """
+    Solve a problem, streaming each agent's result as soon as it completes.
+
+    Responds with newline-delimited JSON, or Server-Sent Events when the
+    client accepts text/event-stream. Pass ?tokens=true to also receive
+    token deltas from providers that support streaming; a token_reset event
+    means a retried call starts its stage's text over.
+    """
+    orchestrator = request.app[ORCHESTRATOR]
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+    if "description" not in body:
+        return web.json_response(
+            {"error": "Problem description is required"},
+            status=400
+        )
+    try:
+        deadline = request_deadline(request, body)
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    shed = overloaded_response(orchestrator)
+    if shed is not None:
+        return shed
+
+    sse = "text/event-stream" in request.headers.get("Accept", "")
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream" if sse else "application/x-ndjson",
+        "Cache-Control": "no-cache"
+    })
+    await response.prepare(request)
+
+    tokens = request.query.get("tokens", "").lower() in ("1", "true", "yes")
+    events = orchestrator.stream(body, use_cache=use_cache(request), tokens=tokens, deadline=deadline)
+    watcher = watch_disconnect(request)
+    try:
+        async for event in events:
+            data = json.dumps(event)
+            if sse:
+                await response.write(f"event: {event['event']}\ndata: {data}\n\n".encode("utf-8"))
+            else:
+                await response.write((data + "\n").encode("utf-8"))
+    finally:
+        # Stops outstanding agent calls if the client went away
+        watcher.cancel()
+        await events.aclose()
+    await response.write_eof()
+    return response
+
+async def solve_problem_batch(request):
+    """
+    Solve several problems in one request with bounded concurrency.
+
+    Body: {"problems": [...], "concurrency": n}. Results come back in input
+    order, each with its id and either a response or an error.
+    """
+    orchestrator = request.app[ORCHESTRATOR]
+    try:
+        body = await request.json()
+        problems = body.get("problems")
+        if not isinstance(problems, list) or not problems:
+            return web.json_response(
+                {"error": "A non-empty list of problems is required"},
+                status=400
+            )
+        if len(problems) > MAX_BATCH_SIZE:
+            return web.json_response(
+                {"error": f"At most {MAX_BATCH_SIZE} problems per batch"},
+                status=400
+            )
+        if any("description" not in problem for problem in problems):
+            return web.json_response(
+                {"error": "Problem description is required"},
+                status=400
+            )
+
+        try:
+            # A batch-wide deadline; problems may also carry their own
+            deadline = request_deadline(request, body)
+            for problem in problems:
+                parse_duration(problem.get("deadline"))
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        shed = overloaded_response(orchestrator)
+        if shed is not None:
+            return shed
+
+        concurrency = min(int(body.get("concurrency", 4)), MAX_BATCH_CONCURRENCY)
+        # Keyed by position so duplicate problems each get their own result
+        watcher = watch_disconnect(request)
+        try:
+            with deadline_after(deadline):
+                runs = await solve_batch(
+                    orchestrator,
+                    [(str(index), problem) for index, problem in enumerate(problems)],
+                    concurrency=concurrency,
+                    use_cache=use_cache(request)
+                )
+        finally:
+            watcher.cancel()
+        results = []
+        for index, problem in enumerate(problems):
+            record = batch_record(batch_item_id(problem), runs[str(index)])
+            record.pop("partial", None)
+            results.append(record)
+        return web.json_response({"results": results})
+
+    except Exception as e:
+        return web.json_response(
+            {"error": str(e)},
+            status=500
+        )
+
+async def submit_job(request):
+    """
+    Queue a problem and return at once with the job's id.
+
+    Body: the /solve problem plus optional "priority" (an integer, or
+    "high"/"normal"/"low") and "webhook", a URL the finished job is POSTed
+    to. Poll GET /jobs/{id} for the status and, once done, the result.
+    """
+    jobs = request.app[JOB_QUEUE]
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return web.json_response({"error": "Invalid JSON body"}, status=400)
+    if "description" not in body:
+        return web.json_response(
+            {"error": "Problem description is required"},
+            status=400
+        )
+    webhook = body.pop("webhook", None)
+    if webhook is not None:
+        try:
+            if not isinstance(webhook, str):
+                raise ValueError("webhook must be an http(s) URL")
+            await jobs.check_webhook(webhook)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+    try:
+        priority = parse_priority(body.pop("priority", None))
+        # Kept in the problem; the budget starts when a worker picks the job up
+        parse_duration(body.get("deadline"))
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+    try:
+        job = await jobs.submit(body, priority=priority, webhook=webhook, use_cache=use_cache(request))
+    except QueueFull as e:
+        return web.json_response(
+            {"error": str(e)},
+            status=503,
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    location = f"/jobs/{job['id']}"
+    return web.json_response(dict(job, status_url=location), status=202, headers={"Location": location})
+
+async def get_job(request):
+    """
+    Status of a job, with its response (or error and partial stages) once finished.
+    """
+    job = await request.app[JOB_QUEUE].get(request.match_info["job_id"])
+    if job is None:
+        return web.json_response({"error": "Unknown job"}, status=404)
+    return web.json_response(job)
+
 async def list_agents(request):
     """
     List all available agents and their roles.
     """
+    agents = request.app[ORCHESTRATOR].agents
     return web.json_response({
         name: str(agent) for name, agent in agents.items()
     })
@@ -105,17 +313,144 @@ async def health_check(request):
     return web.json_response({
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "agents_available": len(agents),
+        "worker": os.getpid(),
+        "agents_available": len(request.app[ORCHESTRATOR].agents),
+        "models": {
+            name: str(getattr(agent, "target", ""))
+            for name, agent in request.app[ORCHESTRATOR].agents.items()
+        },
+        "cache": request.app[ORCHESTRATOR].cache.snapshot(),
+        "providers": request.app[ORCHESTRATOR].rate_limiter.snapshot(),
+        "jobs": await request.app[JOB_QUEUE].snapshot(),
+        "policies": {policy.name: policy.snapshot() for policy in request.app[ORCHESTRATOR].policies},
+        "routing": await request.app[ORCHESTRATOR].router.snapshot() if request.app[ORCHESTRATOR].router else None,
+        "speculation": (
+            request.app[ORCHESTRATOR].speculation.snapshot() if request.app[ORCHESTRATOR].speculation else None
+        ),
         "version": "1.0.0"
     })
 
-def init_app():
+async def metrics(request):
+    """
+    Prometheus-format latency, token, cache, retry and error metrics.
+    """
+    return web.Response(
+        text=REGISTRY.render(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
+async def start_orchestrator(app):
+    await app[ORCHESTRATOR].start()
+    app[JOB_QUEUE].start()
+
+async def close_orchestrator(app):
+    # Running jobs go back to the queue before the agents they use shut down
+    await app[JOB_QUEUE].close()
+    await app[ORCHESTRATOR].close()
+
+def init_app(orchestrator: Optional[Orchestrator] = None, jobs: Optional[JobQueue] = None):
     app = web.Application()
+    app[ORCHESTRATOR] = orchestrator or Orchestrator()
+    app[JOB_QUEUE] = jobs or JobQueue.from_env(app[ORCHESTRATOR])
+    app.on_startup.append(start_orchestrator)
+    app.on_cleanup.append(close_orchestrator)
     app.router.add_post("/solve", solve_problem)
+    app.router.add_post("/solve/stream", solve_problem_stream)
+    app.router.add_post("/solve/batch", solve_problem_batch)
+    app.router.add_post("/jobs", submit_job)
+    app.router.add_get("/jobs/{job_id}", get_job)
     app.router.add_get("/agents", list_agents)
     app.router.add_get("/health", health_check)
+    app.router.add_get("/metrics", metrics)
     return app
 
+async def create_app():
+    """
+    App factory for process managers, e.g.
+    gunicorn api:create_app --worker-class aiohttp.GunicornWebWorker --workers 4
+    Workers share state through SIRIUS_STATE_DIR, which must be set.
+    """
+    return init_app()
+
+def _run_worker(sock: socket.socket):
+    # Every worker builds its own orchestrator: SQLite connections and
+    # event loops must not cross a fork
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    web.run_app(init_app(), sock=sock, print=None)
+
+def serve(host: str = "0.0.0.0", port: int = 8001, workers: int = 1):
+    """
+    Serve the API, pre-forking `workers` processes that accept on one socket.
+
+    With several workers the response cache, experience memory, solution
+    index, job queue and provider rate limits live in SQLite files under
+    SIRIUS_STATE_DIR (a fresh temporary directory if unset), so the
+    workers share one provider quota and one memory instead of each
+    working alone. Workers that die are replaced; SIGINT or SIGTERM stops all.
+    """
+    if workers <= 1:
+        web.run_app(init_app(), host=host, port=port)
+        return
+
+    os.environ["SIRIUS_WORKERS"] = str(workers)
+    if not os.getenv("SIRIUS_STATE_DIR"):
+        os.environ["SIRIUS_STATE_DIR"] = tempfile.mkdtemp(prefix="sirius-state-")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+    print(f"Serving on http://{host}:{port} with {workers} workers "
+          f"(shared state in {os.environ['SIRIUS_STATE_DIR']})")
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _run_worker(sock)
+                code = 0
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(RESTART_DELAY)
+            if not stopping:
+                spawn()
+    sock.close()
+
 if __name__ == "__main__":
-    app = init_app()
-    web.run_app(app, host="0.0.0.0", port=8001)
+    parser = argparse.ArgumentParser(description="Serve the multi-agent API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SIRIUS_WORKERS", "1")),
+                        help="Worker processes sharing the port (default: SIRIUS_WORKERS or 1)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
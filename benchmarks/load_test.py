@@ -0,0 +1,175 @@
+"""
+Load test for the HTTP API against the in-process mock providers.
+
+Serves api.py on a local port with a MockTransport behind it and drives
+POST /solve at each requested concurrency level, reporting throughput,
+p50/p99 latency, memory growth and event-loop lag. No API keys needed:
+
+    python -m benchmarks.load_test --concurrency 1,8,32 --requests 200 --time-scale 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+from typing import Dict, List, Optional
+import aiohttp
+from aiohttp import web
+import api
+from agents import MockProfile, MockTransport, RateLimiter, ResponseCache
+from agents.mock import DEFAULT_PROFILES
+from agents.transport import PROVIDERS
+from engine import Orchestrator, RefinementLoop, SolutionIndex
+
+# Limits high enough that only the system under test, not provider quotas, is measured
+UNLIMITED = {"requests_per_minute": 10 ** 9, "tokens_per_minute": 10 ** 12, "max_concurrency": 10 ** 4}
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps `interval` seconds."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def __enter__(self):
+        self.samples = []
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+def build_orchestrator(args) -> Orchestrator:
+    profiles = {
+        provider: MockProfile(**dict(vars(profile), error_rate=args.error_rate,
+                                     rate_limit_rate=args.rate_limit_rate))
+        for provider, profile in DEFAULT_PROFILES.items()
+    }
+    rate_limiter = RateLimiter.from_env() if args.provider_limits else RateLimiter(
+        {provider: UNLIMITED for provider in PROVIDERS}, max_queue=10 ** 6)
+    return Orchestrator(
+        transport=MockTransport(profiles=profiles, seed=args.seed, time_scale=args.time_scale,
+                                rate_limiter=rate_limiter),
+        # Every problem is distinct, so caching and reuse would only measure lookups
+        cache=ResponseCache(max_entries=0),
+        index=SolutionIndex(),
+        refinement=RefinementLoop(max_rounds=args.refine_rounds)
+    )
+
+
+async def run_level(session: aiohttp.ClientSession, url: str, concurrency: int,
+                    requests: int, offset: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    numbers = iter(range(offset, offset + requests))
+
+    async def worker():
+        for number in numbers:
+            problem = {"description": f"Benchmark problem {number}: reduce p99 latency of service {number % 97}"}
+            started = time.perf_counter()
+            async with session.post(url, json=problem) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status)] = statuses.get(str(response.status), 0) + 1
+
+    rss_before = rss_bytes()
+    with LoopLagMonitor() as lag:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "statuses": statuses,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "rss_growth_mb": round((rss_bytes() - rss_before) / 2 ** 20, 2),
+        "loop_lag_p99_ms": round((percentile(lag.samples, 0.99) or 0.0) * 1000, 2),
+        "loop_lag_max_ms": round(max(lag.samples, default=0.0) * 1000, 2)
+    }
+
+
+async def benchmark(args) -> List[Dict]:
+    app = api.init_app(build_orchestrator(args))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}/solve"
+    results = []
+    try:
+        connector = aiohttp.TCPConnector(limit=max(args.concurrency))
+        async with aiohttp.ClientSession(connector=connector) as session:
+            offset = 0
+            for concurrency in args.concurrency:
+                result = await run_level(session, url, concurrency, args.requests, offset)
+                offset += args.requests
+                results.append(result)
+                print(
+                    f"c={result['concurrency']:<4} {result['throughput_rps']:>8} req/s  "
+                    f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  "
+                    f"rss +{result['rss_growth_mb']:>6} MB  "
+                    f"loop lag p99 {result['loop_lag_p99_ms']:>6} ms  max {result['loop_lag_max_ms']:>6} ms  "
+                    f"{result['statuses']}"
+                )
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test POST /solve against mock providers")
+    parser.add_argument("--concurrency", default="1,8,32",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="Comma-separated concurrency levels (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per level (default: 100)")
+    parser.add_argument("--time-scale", type=float, default=0.01,
+                        help="Multiplier on simulated provider latency (default: 0.01)")
+    parser.add_argument("--seed", type=int, default=0, help="Mock provider seed (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of provider calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of provider calls failing with 429")
+    parser.add_argument("--refine-rounds", type=int, default=0, help="Refinement rounds per solve (default: 0)")
+    parser.add_argument("--provider-limits", action="store_true",
+                        help="Enforce the configured provider rate limits instead of lifting them")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = asyncio.run(benchmark(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "json"}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
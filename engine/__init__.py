@@ -0,0 +1,39 @@
+from .pipeline import Stage, Pipeline, PipelineError, DEFAULT_STAGES
+from .orchestrator import Orchestrator, SolveRun, build_agents, problem_id
+from .retrieval import SolutionIndex
+from .refinement import RefinementLoop
+from .trajectory import TrajectoryRecorder, build_datasets
+from .batch import solve_batch, run_jsonl, batch_item_id, batch_record
+from .jobs import JobQueue, QueueFull, parse_priority
+from .policies import StagePolicy, ConfidentSolution, DirectAnswer, register_policy
+from .routing import ModelRouter, classify
+from .speculation import Speculation
+
+__all__ = [
+    'Stage',
+    'Pipeline',
+    'PipelineError',
+    'DEFAULT_STAGES',
+    'Orchestrator',
+    'SolveRun',
+    'build_agents',
+    'problem_id',
+    'SolutionIndex',
+    'RefinementLoop',
+    'TrajectoryRecorder',
+    'build_datasets',
+    'solve_batch',
+    'run_jsonl',
+    'batch_item_id',
+    'batch_record',
+    'JobQueue',
+    'QueueFull',
+    'parse_priority',
+    'StagePolicy',
+    'ConfidentSolution',
+    'DirectAnswer',
+    'register_policy',
+    'ModelRouter',
+    'classify',
+    'Speculation'
+]
@@ -0,0 +1,126 @@
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from .orchestrator import Orchestrator, SolveRun
+
+BatchCallback = Callable[[str, SolveRun], Optional[Awaitable[None]]]
+
+
+def batch_item_id(problem: Dict) -> str:
+    """Use the problem's own id, or a stable hash of its content."""
+    if problem.get("id") is not None:
+        return str(problem["id"])
+    material = json.dumps(problem, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def batch_record(item_id: str, run: SolveRun) -> Dict:
+    """One output record: the /solve response, or the error and any partial stages."""
+    if run.error is not None:
+        return {"id": item_id, "error": str(run.error), "partial": run.results}
+    return {"id": item_id, "response": run.to_response()}
+
+
+async def solve_batch(orchestrator: Orchestrator, problems: Iterable[Tuple[str, Dict]],
+                      concurrency: int = 4, use_cache: bool = True,
+                      on_complete: Optional[BatchCallback] = None) -> Dict[str, SolveRun]:
+    """
+    Solve many problems with at most `concurrency` pipelines in flight.
+
+    Problems are pulled lazily from the iterable, so very large inputs are
+    never fully materialized as pending coroutines. A problem that cannot
+    be run at all (e.g. an invalid deadline) gets a failed run carrying the
+    error instead of stopping the rest of the batch.
+
+    Returns the runs by item id. With `on_complete`, each run is handed to
+    it as it finishes and not kept, so memory stays flat however many
+    problems stream through; the returned dict is then empty.
+    """
+    runs: Dict[str, SolveRun] = {}
+    iterator = iter(problems)
+
+    async def worker():
+        for item_id, problem in iterator:
+            try:
+                run = await orchestrator.solve(problem, use_cache=use_cache)
+            except Exception as e:
+                run = SolveRun(problem, datetime.utcnow().isoformat(), orchestrator.pipeline, {}, error=e)
+            if on_complete is None:
+                runs[item_id] = run
+                continue
+            maybe_awaitable = on_complete(item_id, run)
+            if asyncio.iscoroutine(maybe_awaitable):
+                await maybe_awaitable
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return runs
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """IDs already solved successfully in an existing output file."""
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash; that problem is simply redone
+                continue
+            if "response" in record:
+                done.add(str(record["id"]))
+    return done
+
+
+def read_problems(input_path: str, skip: Set[str]) -> Iterable[Tuple[str, Dict]]:
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            problem = json.loads(line)
+            item_id = batch_item_id(problem)
+            if item_id not in skip:
+                yield item_id, problem
+
+
+async def run_jsonl(orchestrator: Orchestrator, input_path: str, output_path: str,
+                    concurrency: int = 4, use_cache: bool = True) -> Dict[str, int]:
+    """
+    Solve every problem in a JSONL file, appending one result line per problem.
+
+    Results are flushed as they complete. Re-running with the same output
+    file skips problems that already have a successful result, so an
+    interrupted run resumes where it stopped.
+    """
+    skip = completed_ids(output_path)
+    counts = {"skipped": len(skip), "solved": 0, "failed": 0}
+
+    # Make sure a torn trailing line from a previous crash stays on its own line
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        if needs_newline:
+            out.write("\n")
+
+        def write(item_id: str, run: SolveRun):
+            counts["failed" if run.error is not None else "solved"] += 1
+            out.write(json.dumps(batch_record(item_id, run)) + "\n")
+            out.flush()
+
+        await solve_batch(
+            orchestrator,
+            read_problems(input_path, skip),
+            concurrency=concurrency,
+            use_cache=use_cache,
+            on_complete=write
+        )
+    return counts
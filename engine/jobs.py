@@ -0,0 +1,407 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+from agents.metrics import JOBS, JOB_WAIT, WEBHOOKS
+from agents.storage import connect, state_path
+from .batch import batch_record
+from .orchestrator import Orchestrator
+
+logger = logging.getLogger(__name__)
+
+# Named priorities accepted alongside plain integers; higher runs first
+PRIORITIES = {"high": 10, "normal": 0, "low": -10}
+
+FINISHED = ("succeeded", "failed")
+
+# Finished jobs between sweeps of expired ones
+PRUNE_EVERY = 100
+
+
+class QueueFull(Exception):
+    """Raised by submit() when `max_pending` jobs are already waiting."""
+
+    def __init__(self, pending: int, retry_after: float):
+        super().__init__(f"Job queue is full ({pending} pending)")
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+def parse_priority(value) -> int:
+    """An integer priority, or one of the PRIORITIES names."""
+    if value is None:
+        return 0
+    if isinstance(value, str) and value.lower() in PRIORITIES:
+        return PRIORITIES[value.lower()]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"priority must be an integer or one of: {', '.join(PRIORITIES)}")
+
+
+class JobQueue:
+    """
+    Durable priority queue of solve jobs with a bounded pool of workers.
+
+    Jobs are rows in SQLite, so with a path (SIRIUS_JOB_PATH or
+    SIRIUS_STATE_DIR) queued work survives restarts and every serving
+    process pulls from the same queue. Jobs are claimed highest priority,
+    oldest first, under a lease renewed while the pipeline runs; jobs
+    whose owner died are requeued once the lease lapses, and given up
+    after `max_attempts` claims. One claimer task per process takes a job
+    whenever a worker is idle and hands it over, and every database call
+    runs on the queue's own thread, off the event loop. Results stay
+    readable for `retention` seconds and are POSTed to the job's webhook,
+    if any, on a best-effort basis with retries.
+    """
+
+    def __init__(self, orchestrator: Orchestrator, path: Optional[str] = None, workers: int = 4,
+                 max_pending: int = 10000, lease: float = 600.0, max_attempts: int = 3,
+                 poll_interval: float = 1.0, retention: float = 86400.0,
+                 webhook_retries: int = 3, webhook_timeout: float = 10.0,
+                 webhook_hosts: Optional[Sequence[str]] = None):
+        self.orchestrator = orchestrator
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.webhook_retries = webhook_retries
+        self.webhook_timeout = webhook_timeout
+        self.webhook_hosts = {host.lower() for host in webhook_hosts} if webhook_hosts else None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        path = path or state_path("SIRIUS_JOB_PATH", "jobs.db")
+        if path is None:
+            logger.warning("Job queue is in memory and loses queued jobs on restart; "
+                           "set SIRIUS_JOB_PATH or SIRIUS_STATE_DIR to keep them")
+        self._db: Optional[sqlite3.Connection] = connect(path or ":memory:")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "problem TEXT NOT NULL, use_cache INTEGER NOT NULL, webhook TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_until REAL, "
+            "result TEXT, webhook_status TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at)")
+        self._db.commit()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs")
+        self._wake: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Semaphore] = None
+        self._claimed: Optional[asyncio.Queue] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._deliveries: Set[asyncio.Task] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._finished = 0
+
+    @classmethod
+    def from_env(cls, orchestrator: Orchestrator) -> "JobQueue":
+        """
+        Queue stored at SIRIUS_JOB_PATH (or SIRIUS_STATE_DIR), in memory otherwise,
+        sized by SIRIUS_JOB_WORKERS, SIRIUS_JOB_MAX_PENDING and SIRIUS_JOB_LEASE.
+        SIRIUS_WEBHOOK_HOSTS, a comma-separated list, limits webhooks to those hosts.
+        """
+        hosts = os.getenv("SIRIUS_WEBHOOK_HOSTS")
+        return cls(
+            orchestrator,
+            path=state_path("SIRIUS_JOB_PATH", "jobs.db"),
+            workers=int(os.getenv("SIRIUS_JOB_WORKERS", "4")),
+            max_pending=int(os.getenv("SIRIUS_JOB_MAX_PENDING", "10000")),
+            lease=float(os.getenv("SIRIUS_JOB_LEASE", "600")),
+            webhook_hosts=[h.strip() for h in hosts.split(",") if h.strip()] if hosts else None
+        )
+
+    async def check_webhook(self, url: str):
+        """
+        Raise ValueError unless `url` is an http(s) URL the server may POST to:
+        a host on the allowlist when one is set, otherwise one that resolves
+        only to public addresses, so clients cannot reach internal services.
+        """
+        try:
+            parsed = urlsplit(url)
+            port = parsed.port
+        except ValueError:
+            raise ValueError("webhook must be an http(s) URL")
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError("webhook must be an http(s) URL")
+        host = parsed.hostname.lower()
+        if self.webhook_hosts is not None:
+            if host not in self.webhook_hosts:
+                raise ValueError(f"webhook host {host!r} is not allowed")
+            return
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port or (443 if parsed.scheme == "https" else 80), type=socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            raise ValueError(f"webhook host {host!r} does not resolve")
+        for info in infos:
+            address = ipaddress.ip_address(info[4][0].split("%")[0])
+            if not address.is_global:
+                raise ValueError(f"webhook host {host!r} resolves to a non-public address")
+
+    async def _call(self, fn, *args):
+        # One thread owns the connection, so the queue's transactions never interleave
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _pending(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    async def pending(self) -> int:
+        return await self._call(self._pending)
+
+    def _submit(self, problem: Dict, priority: int, webhook: Optional[str], use_cache: bool) -> Dict:
+        pending = self._pending()
+        if pending >= self.max_pending:
+            raise QueueFull(pending, self.poll_interval * max(1, pending // max(1, self.workers)))
+        job_id = uuid.uuid4().hex
+        self._db.execute(
+            "INSERT INTO jobs (id, status, priority, problem, use_cache, webhook, created_at) "
+            "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, priority, json.dumps(problem), int(use_cache), webhook, time.time())
+        )
+        self._db.commit()
+        return self._get(job_id)
+
+    async def submit(self, problem: Dict, priority: int = 0, webhook: Optional[str] = None,
+                     use_cache: bool = True) -> Dict:
+        """Queue a problem and return its job record; raises QueueFull when saturated."""
+        try:
+            job = await self._call(self._submit, problem, priority, webhook, use_cache)
+        except QueueFull:
+            JOBS.inc(outcome="rejected")
+            raise
+        JOBS.inc(outcome="queued")
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    def _get(self, job_id: str) -> Optional[Dict]:
+        row = self._db.execute(
+            "SELECT id, status, priority, created_at, started_at, finished_at, attempts, "
+            "result, webhook, webhook_status FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "id": row[0],
+            "status": row[1],
+            "priority": row[2],
+            "created_at": row[3],
+            "started_at": row[4],
+            "finished_at": row[5],
+            "attempts": row[6]
+        }
+        if row[1] == "queued":
+            job["queue_position"] = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' "
+                "AND (priority > ? OR (priority = ? AND created_at < ?))",
+                (row[2], row[2], row[3])
+            ).fetchone()[0]
+        if row[7] is not None:
+            record = json.loads(row[7])
+            record.pop("id", None)
+            job.update(record)
+        if row[8] is not None:
+            job["webhook"] = {"url": row[8], "status": row[9]}
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """The job's status, and its result once finished; None if unknown."""
+        return await self._call(self._get, job_id)
+
+    def _snapshot(self) -> Dict[str, int]:
+        rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    async def snapshot(self) -> Dict[str, int]:
+        """Number of jobs in each status."""
+        return await self._call(self._snapshot)
+
+    def _claim(self) -> Tuple[Optional[tuple], int, int]:
+        """The next job, if any, with the number of jobs requeued and abandoned on the way."""
+        now = time.time()
+        abandoned = 0
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            expired = self._db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL "
+                "WHERE status = 'running' AND lease_until < ?", (now,)
+            ).rowcount
+            while True:
+                row = self._db.execute(
+                    "SELECT id, problem, use_cache, created_at, attempts FROM jobs "
+                    "WHERE status = 'queued' ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None, expired, abandoned
+                if row[4] < self.max_attempts:
+                    break
+                # Every earlier claim died with its worker; stop retrying
+                record = {"error": f"Abandoned after {row[4]} attempts", "partial": {}}
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, result = ? WHERE id = ?",
+                    (now, json.dumps(record), row[0])
+                )
+                abandoned += 1
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, "
+                "started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (self.owner, now + self.lease, now, row[0])
+            )
+        return row, expired, abandoned
+
+    def _renew(self, job_id: str):
+        self._db.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ?",
+            (time.time() + self.lease, job_id, self.owner)
+        )
+        self._db.commit()
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await self._call(self._renew, job_id)
+
+    def _finish(self, job_id: str, status: str, record: Dict) -> Optional[str]:
+        """Store the job's outcome and return its webhook, if any."""
+        now = time.time()
+        self._db.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, owner = NULL, lease_until = NULL "
+            "WHERE id = ? AND owner = ?",
+            (status, now, json.dumps(record, default=str), job_id, self.owner)
+        )
+        self._finished += 1
+        if self._finished % PRUNE_EVERY == 0:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (*FINISHED, now - self.retention)
+            )
+        self._db.commit()
+        row = self._db.execute("SELECT webhook FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    async def _run(self, job: tuple):
+        job_id, problem, use_cache = job[0], json.loads(job[1]), bool(job[2])
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+        try:
+            run = await self.orchestrator.solve(problem, use_cache=use_cache)
+            record = batch_record(job_id, run)
+            status = "failed" if run.error is not None else "succeeded"
+        except Exception as e:
+            record, status = {"error": str(e), "partial": {}}, "failed"
+        finally:
+            heartbeat.cancel()
+        webhook = await self._call(self._finish, job_id, status, record)
+        JOBS.inc(outcome=status)
+        if webhook:
+            task = asyncio.ensure_future(self._deliver(job_id, webhook))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    def _set_webhook_status(self, job_id: str, outcome: str):
+        self._db.execute("UPDATE jobs SET webhook_status = ? WHERE id = ?", (outcome, job_id))
+        self._db.commit()
+
+    async def _deliver(self, job_id: str, url: str):
+        """POST the finished job to its webhook, retrying with backoff."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.webhook_timeout))
+        payload = await self.get(job_id)
+        outcome = "failed"
+        try:
+            # Checked again: the host may resolve differently now than at submission
+            await self.check_webhook(url)
+        except ValueError:
+            outcome = "refused"
+        else:
+            for attempt in range(self.webhook_retries):
+                try:
+                    # Redirects are not followed; they could point anywhere
+                    async with self._session.post(url, json=payload, allow_redirects=False) as response:
+                        if response.status < 300:
+                            outcome = "delivered"
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+                if attempt + 1 < self.webhook_retries:
+                    await asyncio.sleep(2 ** attempt)
+        WEBHOOKS.inc(outcome=outcome)
+        if self._db is not None:
+            await self._call(self._set_webhook_status, job_id, outcome)
+
+    async def _claimer(self):
+        """Claim a job whenever a worker is idle and hand it over."""
+        while True:
+            await self._idle.acquire()
+            while True:
+                self._wake.clear()
+                job, requeued, abandoned = await self._call(self._claim)
+                # Metrics are updated on the event loop, not the database thread
+                if requeued:
+                    JOBS.inc(requeued, outcome="requeued")
+                if abandoned:
+                    JOBS.inc(abandoned, outcome="failed")
+                if job is not None:
+                    JOB_WAIT.observe(time.time() - job[3])
+                    break
+                # Jobs queued by other processes only show up on the next poll
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._claimed.put_nowait(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._claimed.get()
+            try:
+                await self._run(job)
+            finally:
+                self._idle.release()
+
+    def start(self):
+        if self._tasks:
+            return
+        workers = max(1, self.workers)
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Semaphore(workers)
+        self._claimed = asyncio.Queue()
+        self._tasks = {asyncio.ensure_future(self._worker()) for _ in range(workers)}
+        self._tasks.add(asyncio.ensure_future(self._claimer()))
+
+    async def close(self):
+        """Stop the workers and hand their unfinished jobs back to the queue."""
+        tasks = self._tasks | self._deliveries
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = set()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._db is not None:
+            # Jobs claimed but not yet started are requeued along with running ones
+            requeued = await self._call(self._release)
+            if requeued:
+                JOBS.inc(requeued, outcome="requeued")
+            await self._call(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
+
+    def _release(self) -> int:
+        requeued = self._db.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_until = NULL, "
+            "attempts = attempts - 1 WHERE status = 'running' AND owner = ?", (self.owner,)
+        ).rowcount
+        self._db.commit()
+        return requeued
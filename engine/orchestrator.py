@@ -0,0 +1,435 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from agents import (
+    LeadSolver,
+    CriticAgent,
+    JudgmentAgent,
+    StrategistAgent,
+    DataAugmentorAgent,
+    ConsensusBuilderAgent,
+    HTTPTransport,
+    MockTransport,
+    ResponseCache,
+    ResiliencePolicy,
+    ModelTarget,
+    DeadlineExceeded,
+    bypass_cache,
+    deadline_after,
+    use_targets,
+    parse_duration
+)
+from agents.cache import fingerprint
+from agents.deadline import bounded
+from agents.singleflight import SingleFlight
+from agents.metrics import ABANDONED, SOLVE_DURATION
+from agents.providers import role_models_from_env
+from .pipeline import Pipeline, PipelineError, ResultCallback, TokenCallback
+from .policies import StagePolicy, is_skipped, policies_from_env
+from .refinement import RefinementLoop
+from .retrieval import SolutionIndex, reference_solutions, same_problem
+from .routing import ModelRouter
+from .speculation import Speculation
+from .trajectory import TrajectoryRecorder
+
+AGENT_CLASSES = {
+    "lead_solver": LeadSolver,
+    "critic": CriticAgent,
+    "judgment": JudgmentAgent,
+    "strategist": StrategistAgent,
+    "data_augmentor": DataAugmentorAgent,
+    "consensus_builder": ConsensusBuilderAgent
+}
+
+# Stage name -> key used for it in the /solve response
+RESPONSE_FIELDS = {
+    "initial_solution": "initial_solution",
+    "critique": "critiques",
+    "verification": "verification",
+    "strategic_analysis": "strategic_analysis",
+    "augmented_solution": "augmented_solution",
+    "consensus": "final_consensus"
+}
+
+
+def problem_id(problem: Dict) -> str:
+    """Stable id of a problem's content, the same in every worker and across restarts."""
+    return fingerprint(problem)[:16]
+
+
+def build_agents(transport: HTTPTransport) -> Dict[str, object]:
+    """Instantiate one of each agent, all sharing the given transport."""
+    return {name: cls(transport) for name, cls in AGENT_CLASSES.items()}
+
+
+class SolveRun:
+    """Outcome of one pipeline execution, successful or partial."""
+
+    def __init__(self, problem: Dict, timestamp: str, pipeline: Pipeline,
+                 results: Dict[str, dict], error: Optional[Exception] = None,
+                 duration: float = 0.0, timings: Optional[Dict[str, Dict[str, float]]] = None,
+                 reused_from: Optional[Dict] = None, refinement: Optional[Dict] = None,
+                 context: Optional[Dict] = None, route: Optional[Dict] = None,
+                 calls: Optional[Dict[str, List[dict]]] = None):
+        self.problem = problem
+        self.timestamp = timestamp
+        self.pipeline = pipeline
+        self.results = results
+        self.error = error
+        self.duration = duration
+        self.timings = timings or {}
+        self.reused_from = reused_from
+        self.refinement = refinement
+        self.context = context
+        self.route = route
+        # Stage name -> the completions its agent made, as sent
+        self.calls = calls or {}
+
+    @property
+    def final_stage(self) -> str:
+        return self.pipeline.stages[-1].name
+
+    @property
+    def problem_id(self) -> str:
+        return problem_id(self.problem)
+
+    @property
+    def final(self) -> Optional[dict]:
+        return self.results.get(self.final_stage)
+
+    @property
+    def skipped(self) -> Dict[str, str]:
+        """Stages a policy skipped, with the policy that skipped them."""
+        return {name: result["policy"] for name, result in self.results.items() if is_skipped(result)}
+
+    @property
+    def deadline_exceeded(self) -> bool:
+        """True when the run was cut short by its deadline; results are then partial."""
+        return isinstance(getattr(self.error, "error", self.error), DeadlineExceeded)
+
+    def reasoning_process(self) -> List[dict]:
+        """Non-final stage results in pipeline order."""
+        return [
+            self.results[stage.name] for stage in self.pipeline.stages
+            if stage.name in self.results and stage.name != self.final_stage
+            and not is_skipped(self.results[stage.name])
+        ]
+
+    def to_response(self) -> Dict:
+        """Assemble the /solve response body."""
+        response = {"problem_id": self.problem_id}
+        for stage in self.pipeline.stages:
+            field = RESPONSE_FIELDS.get(stage.name, stage.name)
+            result = self.results.get(stage.name)
+            response[field] = [result] if field == "critiques" else result
+        final = self.final or {}
+        response["metadata"] = {
+            "timestamp": self.timestamp,
+            "processing_time": round(self.duration, 4),
+            "stage_timings": self.timings,
+            "confidence_score": final.get("agreement_metrics", {}).get("harmony_score")
+        }
+        if self.skipped:
+            response["metadata"]["skipped_stages"] = self.skipped
+        if self.error is not None:
+            response["metadata"]["partial"] = True
+            response["metadata"]["error"] = str(self.error)
+        if self.route is not None:
+            response["metadata"]["routing"] = {
+                "complexity": self.route["complexity"],
+                "tiers": self.route["tiers"]
+            }
+        if self.reused_from is not None:
+            response["metadata"]["reused_from"] = self.reused_from
+        if self.refinement is not None:
+            response["metadata"]["refinement"] = {
+                "rounds": len(self.refinement["rounds"]),
+                "stopped": self.refinement["stopped"],
+                "similarity": [r["similarity"] for r in self.refinement["rounds"]],
+                "prompt_tokens": self.refinement["prompt_tokens"]
+            }
+            if "error" in self.refinement:
+                response["metadata"]["refinement"]["error"] = self.refinement["error"]
+        return response
+
+
+class Orchestrator:
+    """
+    Single engine behind both the CLI and the HTTP API.
+
+    Owns the agent instances, the shared transport and the pipeline, so
+    every entry point executes and assembles results the same way.
+    """
+
+    def __init__(self, pipeline: Optional[Pipeline] = None,
+                 transport: Optional[HTTPTransport] = None,
+                 agents: Optional[Dict[str, object]] = None,
+                 cache: Optional[ResponseCache] = None,
+                 resilience: Optional[ResiliencePolicy] = None,
+                 index: Optional[SolutionIndex] = None,
+                 reuse: Optional[bool] = None,
+                 seed_threshold: Optional[float] = None,
+                 refinement: Optional[RefinementLoop] = None,
+                 recorder: Optional[TrajectoryRecorder] = None,
+                 models: Optional[Dict[str, ModelTarget]] = None,
+                 deadline: Optional[float] = None,
+                 policies: Optional[List[StagePolicy]] = None,
+                 router: Optional[ModelRouter] = None,
+                 speculation: Optional[Speculation] = None):
+        # SIRIUS_MOCK_PROVIDERS swaps every provider for a local simulation
+        self.transport = transport or MockTransport.from_env() or HTTPTransport()
+        self.agents = agents or build_agents(self.transport)
+        self.pipeline = pipeline or Pipeline()
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self.resilience = resilience if resilience is not None else ResiliencePolicy.from_env()
+        for agent in self.agents.values():
+            agent.cache = self.cache
+            agent.resilience = self.resilience
+        # Roles can be pointed at another provider/model without code changes
+        models = models if models is not None else role_models_from_env()
+        for name, target in models.items():
+            if name in self.agents:
+                self.agents[name].target = target
+        # Per-problem choice between each role's fast and strong model, when configured
+        self.router = router if router is not None else ModelRouter.from_env(self.agents)
+        if self.router is not None:
+            self.router.check(self.agents)
+        # Similar solved problems seed the LeadSolver with their answers. Only
+        # with reuse on (SIRIUS_REUSE) is a problem already solved, up to case
+        # and whitespace, answered from the index outright: embedding
+        # similarity cannot tell "MySQL to PostgreSQL" from the reverse
+        self.index = index if index is not None else SolutionIndex.from_env()
+        self.reuse = reuse if reuse is not None else os.getenv("SIRIUS_REUSE", "").lower() in ("1", "true", "yes")
+        self.seed_threshold = seed_threshold if seed_threshold is not None else float(
+            os.getenv("SIRIUS_SEED_THRESHOLD", "0.75"))
+        self.refinement = refinement if refinement is not None else RefinementLoop.from_env()
+        # Runs are written to trajectory shards off the request path, when configured
+        self.recorder = recorder if recorder is not None else TrajectoryRecorder.from_env()
+        self.inflight: SingleFlight[SolveRun] = SingleFlight("solve")
+        # Per-request stage skipping, e.g. no strategy review for confident answers
+        self.policies = policies if policies is not None else policies_from_env()
+        self.pipeline.check_policies(self.policies)
+        # Reviews may start on the streamed proposal before it is finished
+        self.speculation = speculation if speculation is not None else Speculation.from_env()
+        self.pipeline.check_speculation(self.speculation)
+        # Seconds a solve may take unless the caller sets its own deadline
+        self.deadline = deadline if deadline is not None else parse_duration(os.getenv("SIRIUS_DEADLINE") or None)
+
+    @property
+    def rate_limiter(self):
+        """Per-provider limiter shared by all agents through the transport."""
+        return self.transport.rate_limiter
+
+    async def start(self):
+        """Open shared resources ahead of the first request."""
+        await self.transport.start()
+        if self.recorder is not None:
+            self.recorder.start()
+
+    async def close(self):
+        """Release shared resources."""
+        await self.transport.close()
+        self.rate_limiter.close()
+        if self.recorder is not None:
+            await self.recorder.close()
+        self.cache.close()
+        self.index.close()
+        if self.router is not None:
+            self.router.close()
+        for agent in self.agents.values():
+            memory = getattr(agent, "memory", None)
+            if memory is not None:
+                memory.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def new_context(self, problem: Dict) -> Dict:
+        # Only deterministic fields go to the agents so identical problems
+        # produce identical prompts (and cache keys)
+        return {
+            "problem": problem
+        }
+
+    def _refines(self) -> bool:
+        """Refinement only applies when the pipeline ends with the synthesizer's answer."""
+        loop = self.refinement
+        return (
+            loop.enabled
+            and self.pipeline.stages[-1].agent == loop.synthesizer
+            and all(name in self.agents for name in (loop.reviser, loop.synthesizer))
+        )
+
+    @staticmethod
+    def _round_reporter(on_result: Optional[ResultCallback]):
+        if on_result is None:
+            return None
+        return lambda record: on_result("refinement", {
+            "round": record["round"],
+            "similarity": record["similarity"],
+            "consensus": record["consensus"]
+        })
+
+    async def solve(self, problem: Dict, on_result: Optional[ResultCallback] = None,
+                    use_cache: bool = True, on_token: Optional[TokenCallback] = None,
+                    deadline: Optional[float] = None) -> SolveRun:
+        """
+        Run the pipeline for one problem.
+
+        Stage failures do not raise; they are recorded on the returned
+        SolveRun together with whatever stages completed. Pass
+        use_cache=False to force fresh provider calls and skip solution reuse.
+        A successful run is then refined by the critique/refine loop, whose
+        rounds are reported to `on_result` as "refinement" results, unless
+        a skipping policy left out any of its stages.
+
+        `deadline` bounds the run in seconds, as does a "deadline" field in
+        the problem (the earlier wins; SIRIUS_DEADLINE applies if neither is
+        set). When it passes, outstanding agent calls are cancelled and the
+        run comes back with the stages that finished and a DeadlineExceeded
+        error; refinement simply stops with the best answer so far.
+
+        Without callbacks, concurrent calls for the same problem share one
+        pipeline run and receive the same SolveRun. A caller that joins a
+        run gives up on it at its own deadline, but the run itself is bound
+        by the deadline of the caller that started it.
+        """
+        if "deadline" in problem:
+            problem = dict(problem)
+            limits = [limit for limit in (deadline, parse_duration(problem.pop("deadline"))) if limit is not None]
+            deadline = min(limits) if limits else None
+        with deadline_after(deadline if deadline is not None else self.deadline):
+            if on_result is not None or on_token is not None:
+                return await self._solve(problem, on_result, use_cache, on_token)
+            key = f"{fingerprint(problem)}:{int(use_cache)}"
+            if key not in self.inflight:
+                return await self.inflight.run(key, lambda: self._solve(problem, None, use_cache, None))
+            started = time.monotonic()
+            try:
+                return await bounded(self.inflight.run(key, lambda: self._solve(problem, None, use_cache, None)))
+            except DeadlineExceeded as e:
+                ABANDONED.inc(reason="deadline")
+                first = self.pipeline.stages[0].name
+                return SolveRun(problem, datetime.utcnow().isoformat(), self.pipeline, {},
+                                error=PipelineError(first, e, {}), duration=time.monotonic() - started)
+
+    async def _solve(self, problem: Dict, on_result: Optional[ResultCallback],
+                     use_cache: bool, on_token: Optional[TokenCallback]) -> SolveRun:
+        context = self.new_context(problem)
+        timestamp = datetime.utcnow().isoformat()
+        timings: Dict[str, Dict[str, float]] = {}
+        calls: Dict[str, List[dict]] = {}
+        started = time.monotonic()
+
+        loop = asyncio.get_running_loop()
+        # The index may have to read other workers' entries from SQLite first
+        matches = await loop.run_in_executor(None, self.index.query, problem, 3) if use_cache else []
+        reusable = [match for match in matches if same_problem(match[1]["problem"], problem)] if self.reuse else []
+        if reusable:
+            score, entry = reusable[0]
+            for stage in self.pipeline.stages:
+                if stage.name in entry["results"] and on_result is not None:
+                    maybe_awaitable = on_result(stage.name, entry["results"][stage.name])
+                    if asyncio.iscoroutine(maybe_awaitable):
+                        await maybe_awaitable
+            duration = time.monotonic() - started
+            SOLVE_DURATION.observe(duration, status="reused")
+            return SolveRun(problem, timestamp, self.pipeline, dict(entry["results"]),
+                            duration=duration,
+                            reused_from={"id": entry["id"], "similarity": round(score, 4)})
+        seeds = [match for match in matches if match[0] >= self.seed_threshold]
+        if seeds:
+            context["reference_solutions"] = reference_solutions(seeds, self.pipeline.stages[-1].name)
+
+        route = await self.router.route(problem) if self.router is not None else None
+        targets = {
+            self.agents[name].role: target for name, target in route["targets"].items()
+        } if route is not None else None
+        with bypass_cache(not use_cache), use_targets(targets):
+            try:
+                results = await self.pipeline.run(
+                    self.agents, context, on_result=on_result, on_token=on_token, timings=timings,
+                    policies=self.policies, speculation=self.speculation, calls=calls
+                )
+                error = None
+            except PipelineError as e:
+                results, error = e.results, e
+            refinement = None
+            # A policy that skipped stages judged the answer good enough; refining it would undo the saving
+            skipped = any(is_skipped(result) for result in results.values())
+            if error is None and not skipped and self._refines():
+                refinement = await self.refinement.run(
+                    self.agents, problem, results[self.pipeline.stages[-1].name],
+                    on_round=self._round_reporter(on_result)
+                )
+                results[self.pipeline.stages[-1].name] = refinement["final"]
+        duration = time.monotonic() - started
+        SOLVE_DURATION.observe(duration, status="ok" if error is None else "error")
+        if isinstance(getattr(error, "error", None), DeadlineExceeded):
+            ABANDONED.inc(reason="deadline")
+        if error is None:
+            # Only the final answer is kept: it seeds later problems and is what reuse returns
+            final = self.pipeline.stages[-1].name
+            await loop.run_in_executor(None, self.index.add, problem, {final: results[final]})
+        run = SolveRun(problem, timestamp, self.pipeline, results, error=error,
+                       duration=duration, timings=timings, refinement=refinement, context=context,
+                       route=route, calls=calls)
+        if self.router is not None:
+            await self.router.observe(run, route)
+        if self.recorder is not None:
+            self.recorder.record(run)
+        return run
+
+    async def stream(self, problem: Dict, use_cache: bool = True,
+                     tokens: bool = False, deadline: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Solve a problem, yielding events as they happen.
+
+        Yields {"event": "stage", ...} as each stage completes, optionally
+        {"event": "token", ...} deltas from streaming providers (with a
+        {"event": "token_reset", ...} when a retried call starts its reply
+        over), and finally {"event": "complete", "response": ...} or
+        {"event": "error", ...}.
+        Closing the generator early cancels the remaining work.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def on_result(stage: str, result: Dict):
+            queue.put_nowait({"event": "stage", "stage": stage, "result": result})
+
+        def on_token(stage: str, text: Optional[str]):
+            if text is None:
+                # A retry starts the stage's reply over; clients drop what they have of it
+                queue.put_nowait({"event": "token_reset", "stage": stage})
+            else:
+                queue.put_nowait({"event": "token", "stage": stage, "text": text})
+
+        task = asyncio.ensure_future(self.solve(
+            problem,
+            on_result=on_result,
+            use_cache=use_cache,
+            on_token=on_token if tokens else None,
+            deadline=deadline
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(done))
+        try:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    break
+                yield event
+            run = task.result()
+            if run.error is not None:
+                yield {"event": "error", "stage": run.error.stage, "error": str(run.error)}
+            else:
+                yield {"event": "complete", "response": run.to_response()}
+        finally:
+            if not task.done():
+                task.cancel()
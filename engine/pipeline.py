@@ -0,0 +1,324 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from agents import DeadlineExceeded, record_calls, stream_tokens
+from agents.context import response_text
+from agents.metrics import STAGE_DURATION
+from .policies import StagePolicy, is_skipped, skipped_result
+from .speculation import Draft, Speculation
+
+ResultCallback = Callable[[str, dict], Optional[Awaitable[None]]]
+# (stage name, text delta), or (stage name, None) when the stage's text so far is withdrawn
+TokenCallback = Callable[[str, Optional[str]], None]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the pipeline: which agent runs and which outputs it needs."""
+    name: str
+    agent: str
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+# Critic, Judgment, Strategist and Data Augmentor only need the initial
+# proposal, so they run concurrently; the consensus waits for all of them.
+DEFAULT_STAGES: Tuple[Stage, ...] = (
+    Stage("initial_solution", "lead_solver"),
+    Stage("critique", "critic", ("initial_solution",)),
+    Stage("verification", "judgment", ("initial_solution",)),
+    Stage("strategic_analysis", "strategist", ("initial_solution",)),
+    Stage("augmented_solution", "data_augmentor", ("initial_solution",)),
+    Stage(
+        "consensus",
+        "consensus_builder",
+        ("initial_solution", "critique", "verification", "strategic_analysis", "augmented_solution")
+    ),
+)
+
+
+class PipelineError(Exception):
+    """Raised when a stage fails; carries the results of stages that finished."""
+
+    def __init__(self, stage: str, error: BaseException, results: Dict[str, dict]):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+        self.results = results
+
+
+class Pipeline:
+    """Runs a DAG of agent stages, starting each stage as soon as its inputs exist."""
+
+    def __init__(self, stages: Sequence[Stage] = DEFAULT_STAGES, default_timeout: Optional[float] = None):
+        self.stages: List[Stage] = self._topological_order(stages)
+        self.default_timeout = default_timeout
+
+    @classmethod
+    def from_config(cls, config: Sequence[dict], default_timeout: Optional[float] = None) -> "Pipeline":
+        """Build a pipeline from plain dicts, e.g. loaded from JSON."""
+        stages = [
+            Stage(
+                name=item["name"],
+                agent=item.get("agent", item["name"]),
+                depends_on=tuple(item.get("depends_on", ())),
+                timeout=item.get("timeout")
+            )
+            for item in config
+        ]
+        return cls(stages, default_timeout=default_timeout)
+
+    @staticmethod
+    def _topological_order(stages: Sequence[Stage]) -> List[Stage]:
+        by_name = {}
+        for stage in stages:
+            if stage.name in by_name:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            by_name[stage.name] = stage
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in by_name:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+        ordered: List[Stage] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(stage: Stage):
+            if state.get(stage.name) == 2:
+                return
+            if state.get(stage.name) == 1:
+                raise ValueError(f"Cycle detected at stage '{stage.name}'")
+            state[stage.name] = 1
+            for dep in stage.depends_on:
+                visit(by_name[dep])
+            state[stage.name] = 2
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    def stage_context(self, stage: Stage, context: dict, results: Dict[str, dict]) -> dict:
+        """Context handed to a stage: the shared fields plus its (unskipped) dependencies' outputs."""
+        stage_context = dict(context)
+        stage_context["agent_responses"] = [
+            results[dep] for dep in stage.depends_on if not is_skipped(results[dep])
+        ]
+        return stage_context
+
+    def check_policies(self, policies: Sequence[StagePolicy]):
+        """Reject policies that would skip the final stage or wait on a stage they skip."""
+        names = {stage.name for stage in self.stages}
+        for policy in policies:
+            if self.stages[-1].name in policy.skips:
+                raise ValueError(f"Policy '{policy.name}' cannot skip the final stage")
+            for name in policy.after:
+                if name not in names:
+                    raise ValueError(f"Policy '{policy.name}' reads unknown stage '{name}'")
+                if name in policy.skips or self._depends_on_any(name, set(policy.skips)):
+                    raise ValueError(f"Policy '{policy.name}' reads '{name}', a stage it skips or one depending on it")
+
+    def check_speculation(self, speculation: Optional[Speculation]):
+        """Reject speculation on stages the pipeline does not have."""
+        names = {stage.name for stage in self.stages}
+        for name in speculation.stages if speculation is not None else ():
+            if name not in names:
+                raise ValueError(f"Speculation on unknown stage '{name}'")
+
+    def speculative_stages(self, agents: Dict[str, object], speculation: Optional[Speculation],
+                           policies: Sequence[StagePolicy] = ()) -> Dict[str, str]:
+        """Stages that may start on a streamed prefix, mapped to the stage they read."""
+        if speculation is None:
+            return {}
+        governed = {name for policy in policies for name in policy.skips}
+        upstream = {
+            stage.name for stage in self.stages
+            if stage.name in speculation.stages and hasattr(agents[stage.agent], "draft")
+        }
+        # Agents whose process() changes state cannot have their work thrown away
+        return {
+            stage.name: stage.depends_on[0] for stage in self.stages
+            if len(stage.depends_on) == 1 and stage.depends_on[0] in upstream
+            and stage.name not in governed and not getattr(agents[stage.agent], "side_effects", False)
+        }
+
+    def _depends_on_any(self, name: str, targets: set) -> bool:
+        stage = next(s for s in self.stages if s.name == name)
+        return any(dep in targets or self._depends_on_any(dep, targets) for dep in stage.depends_on)
+
+    async def run(self, agents: Dict[str, object], context: dict,
+                  on_result: Optional[ResultCallback] = None,
+                  on_token: Optional[TokenCallback] = None,
+                  timings: Optional[Dict[str, Dict[str, float]]] = None,
+                  policies: Sequence[StagePolicy] = (),
+                  speculation: Optional[Speculation] = None,
+                  calls: Optional[Dict[str, List[dict]]] = None) -> Dict[str, dict]:
+        """
+        Execute every stage, overlapping those with no dependency between them.
+
+        Args:
+            agents: Agent instances keyed by the names used in Stage.agent
+            context: Shared context (problem, timestamp, ...) given to every stage
+            on_result: Optional callback invoked with (stage name, result) as each stage finishes
+            on_token: Optional callback invoked with (stage name, text delta) by agents that stream
+            timings: Optional dict filled with each stage's start offset and duration in seconds
+            policies: Stage-skipping policies consulted before each stage they govern
+            speculation: Optional settings for starting stages on a streamed prefix of their input
+            calls: Optional dict filled with the completions (model, system, prompt, completion)
+                each stage's agent made for the result the stage kept
+
+        Returns:
+            Dict mapping stage name to that stage's result; a skipped stage
+            maps to {"skipped": True, "policy": name} and is left out of
+            later stages' inputs
+        """
+        results: Dict[str, dict] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        timings = timings if timings is not None else {}
+        calls = calls if calls is not None else {}
+        run_started = time.monotonic()
+        followers = self.speculative_stages(agents, speculation, policies)
+        drafts: Dict[str, Draft] = {name: speculation.draft(name) for name in set(followers.values())}
+        # Stage name -> (prefix, start time, task) of its speculative run
+        speculative: Dict[str, Tuple[str, float, asyncio.Task]] = {}
+        by_name = {stage.name: stage for stage in self.stages}
+
+        async def call(stage: Stage, inputs: Dict[str, dict], sink) -> dict:
+            timeout = stage.timeout if stage.timeout is not None else self.default_timeout
+            made: List[dict] = []
+            try:
+                # Each stage runs in its own task, so the sink only sees this stage's tokens
+                with stream_tokens(sink), record_calls(made):
+                    result = await asyncio.wait_for(
+                        agents[stage.agent].process(self.stage_context(stage, context, inputs)),
+                        timeout
+                    )
+                # The last run of a stage to finish is the one whose result is kept
+                calls[stage.name] = made
+                return result
+            except asyncio.TimeoutError as e:
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise asyncio.TimeoutError(f"timed out after {timeout}s")
+
+        def speculate(upstream: Stage, prefix: str):
+            provisional = dict(results, **{upstream.name: agents[upstream.agent].draft(prefix)})
+            for name, source in followers.items():
+                if source != upstream.name:
+                    continue
+                previous = speculative.get(name)
+                if previous is not None:
+                    previous[2].cancel()
+                    speculation.record(name, "restart")
+                # Tokens of a result that may be thrown away are not forwarded
+                task = asyncio.ensure_future(call(by_name[name], provisional, None))
+                # A discarded run's failure is of no interest to anyone
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                speculative[name] = (prefix, time.monotonic(), task)
+
+        def stage_sink(stage: Stage):
+            draft = drafts.get(stage.name)
+            if draft is None:
+                return (lambda text: on_token(stage.name, text)) if on_token is not None else None
+
+            def sink(text: Optional[str]):
+                if on_token is not None:
+                    on_token(stage.name, text)
+                if text is None:
+                    draft.reset()
+                    return
+                prefix = draft.feed(text)
+                if prefix is not None:
+                    speculate(stage, prefix)
+            return sink
+
+        async def reconcile(stage: Stage) -> Tuple[Optional[dict], Optional[float]]:
+            """The speculative result and its start time if it stands, else (None, None)."""
+            prefix, started, task = speculative.pop(stage.name)
+            if speculation.accepts(prefix, response_text(results[stage.depends_on[0]])):
+                try:
+                    result = await task
+                    speculation.record(stage.name, "win")
+                    return result, started
+                except DeadlineExceeded:
+                    raise
+                except Exception:
+                    pass
+            else:
+                task.cancel()
+            speculation.record(stage.name, "loss")
+            return None, None
+
+        async def skipped_by(stage: Stage) -> Optional[str]:
+            for policy in policies:
+                if stage.name not in policy.skips:
+                    continue
+                for name in policy.after:
+                    await tasks[name]
+                if policy.decide(stage.name, results, context.get("problem", {})):
+                    return policy.name
+            return None
+
+        async def run_stage(stage: Stage) -> dict:
+            for dep in stage.depends_on:
+                await tasks[dep]
+            policy = await skipped_by(stage)
+            if policy is not None:
+                result = results[stage.name] = skipped_result(policy)
+                if on_result is not None:
+                    maybe_awaitable = on_result(stage.name, result)
+                    if asyncio.iscoroutine(maybe_awaitable):
+                        await maybe_awaitable
+                return result
+            started = time.monotonic()
+            status = "error"
+            try:
+                result = None
+                if stage.name in speculative:
+                    result, speculated = await reconcile(stage)
+                    started = speculated or started
+                if result is None:
+                    result = await call(stage, results, stage_sink(stage))
+                status = "ok"
+            except DeadlineExceeded:
+                status = "deadline"
+                raise
+            except asyncio.TimeoutError:
+                status = "timeout"
+                raise
+            finally:
+                duration = time.monotonic() - started
+                timings[stage.name] = {
+                    "started": round(started - run_started, 4),
+                    "duration": round(duration, 4)
+                }
+                STAGE_DURATION.observe(duration, stage=stage.name, status=status)
+            results[stage.name] = result
+            if stage.name in drafts:
+                speculation.observe(stage.name, response_text(result))
+            if on_result is not None:
+                maybe_awaitable = on_result(stage.name, result)
+                if asyncio.iscoroutine(maybe_awaitable):
+                    await maybe_awaitable
+            return result
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+
+        try:
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+                # Tasks are in topological order, so the root cause is reported first
+                for name, task in tasks.items():
+                    if task in done and not task.cancelled() and task.exception() is not None:
+                        raise PipelineError(name, task.exception(), dict(results))
+        finally:
+            leftover = [task for _, _, task in speculative.values()] + list(tasks.values())
+            for task in leftover:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*leftover, return_exceptions=True)
+
+        return results
@@ -0,0 +1,131 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+from agents.metrics import STAGE_DECISIONS
+
+
+def is_skipped(result: Optional[Dict]) -> bool:
+    """True for the placeholder a skipped stage leaves in the results."""
+    return bool(result) and result.get("skipped") is True
+
+
+def skipped_result(policy: str) -> Dict:
+    return {"skipped": True, "policy": policy}
+
+
+def verification_score(result: Optional[Dict]) -> Optional[float]:
+    """Mean of the scores a verification reported; None if it reported none."""
+    scores = [value for value in ((result or {}).get("metrics") or {}).values() if value is not None]
+    if not scores:
+        return None
+    return sum(scores) / len(scores)
+
+
+class StagePolicy:
+    """
+    Decides, per request, whether some pipeline stages can be skipped.
+
+    Subclasses set `name`, list the stages they may skip in `skips` and
+    the stages whose results they look at in `after`, and implement
+    should_skip(). The pipeline asks when a governed stage is ready to
+    start, waiting for the `after` stages first, so a policy that reads a
+    stage running alongside the ones it skips delays them until it is
+    known. Every decision is counted, giving each policy's hit rate.
+    """
+    name = ""
+    skips: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {"evaluated": 0, "skipped": 0}
+
+    def should_skip(self, stage: str, results: Dict[str, dict], problem: Dict) -> bool:
+        raise NotImplementedError
+
+    def decide(self, stage: str, results: Dict[str, dict], problem: Dict) -> bool:
+        skip = self.should_skip(stage, results, problem)
+        self.stats["evaluated"] += 1
+        if skip:
+            self.stats["skipped"] += 1
+        STAGE_DECISIONS.inc(policy=self.name, stage=stage, decision="skip" if skip else "run")
+        return skip
+
+    def snapshot(self) -> Dict[str, float]:
+        evaluated = self.stats["evaluated"]
+        return dict(self.stats, hit_rate=round(self.stats["skipped"] / evaluated, 4) if evaluated else None)
+
+
+class ConfidentSolution(StagePolicy):
+    """
+    Skip strategy and augmentation when the LeadSolver is confident and the
+    Judgment verification scores the proposal well: the answer is already
+    sound, so consensus only needs the critique and the verification.
+    """
+    name = "confident_solution"
+    after = ("initial_solution", "verification")
+
+    def __init__(self, confidence: float = 0.85, verification: float = 0.8,
+                 skips: Sequence[str] = ("strategic_analysis", "augmented_solution")):
+        super().__init__()
+        self.confidence = confidence
+        self.verification = verification
+        self.skips = tuple(skips)
+
+    def should_skip(self, stage, results, problem):
+        confidence = (results.get("initial_solution") or {}).get("confidence")
+        score = verification_score(results.get("verification"))
+        return (
+            confidence is not None and confidence >= self.confidence
+            and score is not None and score >= self.verification
+        )
+
+
+class DirectAnswer(StagePolicy):
+    """
+    Go straight from the LeadSolver to consensus when it is very confident,
+    e.g. for easy questions where review adds cost but not quality.
+    """
+    name = "direct_answer"
+    after = ("initial_solution",)
+
+    def __init__(self, confidence: float = 0.95,
+                 skips: Sequence[str] = ("critique", "verification", "strategic_analysis", "augmented_solution")):
+        super().__init__()
+        self.confidence = confidence
+        self.skips = tuple(skips)
+
+    def should_skip(self, stage, results, problem):
+        confidence = (results.get("initial_solution") or {}).get("confidence")
+        return confidence is not None and confidence >= self.confidence
+
+
+POLICY_CLASSES: Dict[str, Type[StagePolicy]] = {}
+
+
+def register_policy(cls: Type[StagePolicy]) -> Type[StagePolicy]:
+    """Make a policy class configurable by name through SIRIUS_POLICIES."""
+    POLICY_CLASSES[cls.name] = cls
+    return cls
+
+
+for _cls in (ConfidentSolution, DirectAnswer):
+    register_policy(_cls)
+
+
+def policies_from_env() -> List[StagePolicy]:
+    """
+    Policies listed in SIRIUS_POLICIES, a JSON list of names or of objects
+    with a "policy" name and constructor settings, e.g.
+    [{"policy": "confident_solution", "confidence": 0.8, "verification": 0.75}].
+    """
+    raw = os.getenv("SIRIUS_POLICIES")
+    if not raw:
+        return []
+    policies = []
+    for item in json.loads(raw):
+        settings = {"policy": item} if isinstance(item, str) else dict(item)
+        name = settings.pop("policy")
+        if name not in POLICY_CLASSES:
+            raise ValueError(f"Unknown policy {name!r}; known: {', '.join(sorted(POLICY_CLASSES))}")
+        policies.append(POLICY_CLASSES[name](**settings))
+    return policies
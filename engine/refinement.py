@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from agents import DeadlineExceeded, HashingEmbedder, record_calls
+from agents.deadline import expired
+from agents.metrics import REFINEMENT_ROUNDS
+
+# Agents that critique the current answer each round, in parallel.
+DEFAULT_REVIEWERS = ("critic", "judgment", "strategist")
+
+RoundCallback = Callable[[Dict], Union[None, Awaitable[None]]]
+
+
+def answer_text(result: Optional[Dict]) -> str:
+    """The free-text answer carried by a final-stage result."""
+    if not result:
+        return ""
+    return str(result.get("consensus") or result.get("proposal") or "")
+
+
+class RefinementLoop:
+    """
+    Bounded critique -> refine rounds over a pipeline's final answer.
+
+    Each round the reviewers critique the current answer concurrently, the
+    reviser rewrites it against their critiques and the synthesizer merges
+    the revision and critiques into a new consensus. Rounds stop as soon as
+    successive answers converge (embedding cosine similarity at or above
+    `convergence`), when a round overruns `round_timeout`, or before a round
+    that would overrun the prompt `token_budget`. A failed or timed-out
+    round leaves the previous answer in place. When the pipeline's agents
+    already agree (harmony_score at or above `skip_harmony`), no rounds run.
+    """
+
+    def __init__(self, max_rounds: int = 2, convergence: float = 0.9,
+                 round_timeout: Optional[float] = None, token_budget: Optional[int] = None,
+                 reviewers: Sequence[str] = DEFAULT_REVIEWERS, reviser: str = "lead_solver",
+                 synthesizer: str = "consensus_builder", embedder: Optional[HashingEmbedder] = None,
+                 skip_harmony: Optional[float] = None):
+        self.max_rounds = max_rounds
+        self.convergence = convergence
+        self.round_timeout = round_timeout
+        self.token_budget = token_budget
+        self.reviewers = tuple(reviewers)
+        self.reviser = reviser
+        self.synthesizer = synthesizer
+        self.embedder = embedder or HashingEmbedder()
+        self.skip_harmony = skip_harmony
+
+    @classmethod
+    def from_env(cls) -> "RefinementLoop":
+        """
+        Settings from SIRIUS_REFINE_ROUNDS (default 0: refinement is opt-in,
+        as every round costs another full set of review calls),
+        SIRIUS_REFINE_CONVERGENCE, SIRIUS_REFINE_ROUND_TIMEOUT (seconds) and
+        SIRIUS_REFINE_TOKEN_BUDGET (prompt tokens across all rounds) and
+        SIRIUS_REFINE_SKIP_HARMONY (skip refinement when agents already agree).
+        """
+        timeout = os.getenv("SIRIUS_REFINE_ROUND_TIMEOUT")
+        budget = os.getenv("SIRIUS_REFINE_TOKEN_BUDGET")
+        skip = os.getenv("SIRIUS_REFINE_SKIP_HARMONY")
+        return cls(
+            max_rounds=int(os.getenv("SIRIUS_REFINE_ROUNDS", "0")),
+            convergence=float(os.getenv("SIRIUS_REFINE_CONVERGENCE", "0.9")),
+            round_timeout=float(timeout) if timeout else None,
+            token_budget=int(budget) if budget else None,
+            skip_harmony=float(skip) if skip else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rounds > 0
+
+    def similarity(self, a: str, b: str) -> float:
+        return float(self.embedder.embed(a) @ self.embedder.embed(b))
+
+    def _reviewers(self, agents: Dict[str, object]) -> List[str]:
+        return [name for name in self.reviewers if name in agents]
+
+    @staticmethod
+    async def _recorded(calls: List[Dict], agent: str, step: str, call: Awaitable[Dict]) -> Dict:
+        """Await an agent call, adding the completions it made to `calls`."""
+        made: List[Dict] = []
+        with record_calls(made):
+            result = await call
+        calls.extend(dict(completion, agent=agent, step=step) for completion in made)
+        return result
+
+    async def _round(self, agents: Dict[str, object], problem: Dict,
+                     answer: str, calls: List[Dict]) -> Tuple[List[Dict], Dict, Dict]:
+        item = {"problem": problem, "author": "Current Answer", "proposal": answer}
+        critiques = list(await asyncio.gather(*(
+            self._recorded(calls, name, "critique", agents[name].critique(item))
+            for name in self._reviewers(agents)
+        )))
+        reviser = agents[self.reviser]
+        revision = await self._recorded(
+            calls, self.reviser, "revision", reviser.refine(dict(item, critiques=critiques))
+        )
+        context = {
+            "problem": problem,
+            "agent_responses": [
+                {"role": reviser.role, "proposal": revision.get("refined_proposal", "")},
+                *critiques
+            ]
+        }
+        consensus = await self._recorded(
+            calls, self.synthesizer, "consensus", agents[self.synthesizer].process(context)
+        )
+        return critiques, revision, consensus
+
+    async def run(self, agents: Dict[str, object], problem: Dict, final: Dict,
+                  on_round: Optional[RoundCallback] = None) -> Dict:
+        """
+        Refine `final`, the synthesizer's pipeline result.
+
+        Returns {"initial", "final", "rounds", "stopped", "prompt_tokens"};
+        "final" is the last accepted consensus result and "stopped" says why the loop
+        ended: agreed, converged, max_rounds, token_budget, timeout, deadline (the
+        request's) or error (with the message under "error").
+        """
+        initial, answer = final, answer_text(final)
+        rounds: List[Dict] = []
+        spent = 0
+        stopped = "max_rounds"
+        error = None
+        harmony = (final.get("agreement_metrics") or {}).get("harmony_score")
+        max_rounds = self.max_rounds
+        if self.skip_harmony is not None and harmony is not None and harmony >= self.skip_harmony:
+            stopped, max_rounds = "agreed", 0
+        for number in range(1, max_rounds + 1):
+            # The previous round's cost is the best estimate of the next one's
+            if self.token_budget is not None and rounds and spent + rounds[-1]["prompt_tokens"] > self.token_budget:
+                stopped = "token_budget"
+                break
+            if expired():
+                stopped = "deadline"
+                break
+            started = time.monotonic()
+            calls: List[Dict] = []
+            try:
+                critiques, revision, consensus = await asyncio.wait_for(
+                    self._round(agents, problem, answer, calls), self.round_timeout
+                )
+            except DeadlineExceeded:
+                stopped = "deadline"
+                break
+            except asyncio.TimeoutError:
+                stopped = "timeout"
+                break
+            except Exception as e:
+                stopped, error = "error", str(e)
+                break
+            text = answer_text(consensus)
+            tokens = sum(r.get("prompt_tokens", 0) for r in (*critiques, revision, consensus))
+            spent += tokens
+            record = {
+                "round": number,
+                "input": answer,
+                "reviewers": self._reviewers(agents),
+                "reviser": self.reviser,
+                "synthesizer": self.synthesizer,
+                "critiques": critiques,
+                "revision": revision,
+                "consensus": consensus,
+                "calls": calls,
+                "similarity": round(self.similarity(answer, text), 4),
+                "prompt_tokens": tokens,
+                "duration": round(time.monotonic() - started, 4)
+            }
+            rounds.append(record)
+            final, answer = consensus, text
+            if on_round is not None:
+                maybe_awaitable = on_round(record)
+                if asyncio.iscoroutine(maybe_awaitable):
+                    await maybe_awaitable
+            if record["similarity"] >= self.convergence:
+                stopped = "converged"
+                break
+        REFINEMENT_ROUNDS.inc(len(rounds), outcome=stopped)
+        outcome = {"initial": initial, "final": final, "rounds": rounds, "stopped": stopped, "prompt_tokens": spent}
+        if error is not None:
+            outcome["error"] = error
+        return outcome
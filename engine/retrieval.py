@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from agents import HashingEmbedder
+from agents.context import truncate
+from agents.storage import connect, state_path
+
+# Brute force is exact and fast up to tens of thousands of rows; beyond
+# this, candidates come from the LSH index and are re-ranked exactly.
+APPROXIMATE_THRESHOLD = 20000
+
+# Inserts between trims of the table down to the index capacity
+PRUNE_EVERY = 100
+
+# Problem fields kept with an entry: what problem_text() and same_problem() read
+PROBLEM_FIELDS = ("description", "domain", "constraints")
+
+
+def problem_text(problem: Dict) -> str:
+    """Text a problem is indexed and queried by."""
+    parts = [str(problem.get("description", "")), str(problem.get("domain") or "")]
+    constraints = problem.get("constraints")
+    if constraints:
+        parts.append(json.dumps(constraints, sort_keys=True))
+    return " ".join(part for part in parts if part)
+
+
+def same_problem(a: Dict, b: Dict) -> bool:
+    """Whether two problems are the same up to case and whitespace."""
+    return " ".join(problem_text(a).lower().split()) == " ".join(problem_text(b).lower().split())
+
+
+class LSHIndex:
+    """Random-hyperplane LSH over unit vectors for approximate cosine search."""
+
+    def __init__(self, dim: int, planes: int = 16, tables: int = 4, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, planes, dim)).astype(np.float32)
+        self._weights = (1 << np.arange(planes)).astype(np.int64)
+        self._buckets: List[Dict[int, List[int]]] = [defaultdict(list) for _ in range(tables)]
+
+    def _keys(self, vectors: np.ndarray) -> np.ndarray:
+        # (tables, n) bucket ids from the sign pattern against each table's planes
+        signs = np.einsum("tpd,nd->tnp", self._planes, vectors) > 0
+        return signs.astype(np.int64) @ self._weights
+
+    def add(self, vectors: np.ndarray, start: int):
+        for table, keys in enumerate(self._keys(vectors)):
+            for offset, key in enumerate(keys):
+                self._buckets[table][int(key)].append(start + offset)
+
+    def candidates(self, vector: np.ndarray) -> np.ndarray:
+        found = set()
+        for table, key in enumerate(self._keys(vector[None, :])[:, 0]):
+            found.update(self._buckets[table].get(int(key), ()))
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+
+class SolutionIndex:
+    """
+    Nearest-neighbour index over solved problems and their final answers.
+
+    Vectors are kept in a NumPy matrix for brute-force search, holding at
+    most `capacity` entries; once full, the oldest entry is overwritten
+    first. With a path every entry is also stored in SQLite (trimmed to the
+    same capacity) and the newest are reloaded on start. Worker processes
+    sharing the file load each other's new entries before a query.
+
+    Calls are serialized by a lock, so query() and add() may run in
+    executor threads.
+    """
+
+    def __init__(self, path: Optional[str] = None, embedder: Optional[HashingEmbedder] = None,
+                 capacity: int = 10000, approximate_threshold: int = APPROXIMATE_THRESHOLD):
+        self.embedder = embedder or HashingEmbedder()
+        self.capacity = capacity
+        self.approximate_threshold = approximate_threshold
+        self._vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._entries: List[Optional[Dict]] = []
+        self._next = 0
+        self._size = 0
+        self._lsh: Optional[LSHIndex] = None
+        self._last_id = 0
+        self._added = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+                "problem TEXT NOT NULL, results TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+            self._sync()
+
+    @classmethod
+    def from_env(cls) -> "SolutionIndex":
+        """
+        Index of up to SIRIUS_INDEX_CAPACITY entries, persisted to
+        SIRIUS_INDEX_PATH (or SIRIUS_STATE_DIR) if set, in memory otherwise.
+        """
+        return cls(path=state_path("SIRIUS_INDEX_PATH", "index.db"),
+                   capacity=int(os.getenv("SIRIUS_INDEX_CAPACITY", "10000")))
+
+    def _sync(self):
+        """Load entries added since the last sync, by this or any other process."""
+        rows = self._db.execute(
+            "SELECT id, problem, results, vector FROM solutions "
+            "WHERE id > MAX(?, (SELECT COALESCE(MAX(id), 0) FROM solutions) - ?) ORDER BY id",
+            (self._last_id, self.capacity)
+        ).fetchall()
+        if not rows:
+            return
+        self._last_id = rows[-1][0]
+        for row in rows[-self.capacity:]:
+            self._put(np.frombuffer(row[3], dtype=np.float32),
+                      {"id": row[0], "problem": json.loads(row[1]), "results": json.loads(row[2])})
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            return self._size
+
+    def _put(self, vector: np.ndarray, entry: Dict):
+        slot = self._next
+        if slot == len(self._vectors):
+            # Grow geometrically up to the capacity, so appends stay amortized O(1)
+            grown = np.zeros((min(self.capacity, max(64, 2 * len(self._vectors))), self.embedder.dim),
+                             dtype=np.float32)
+            grown[:len(self._vectors)] = self._vectors
+            self._vectors = grown
+            self._entries.extend([None] * (len(grown) - len(self._entries)))
+        self._vectors[slot] = vector
+        self._entries[slot] = entry
+        self._next = (slot + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        if self._lsh is None and self._size > self.approximate_threshold:
+            self._lsh = LSHIndex(self.embedder.dim)
+            self._lsh.add(self._vectors[:self._size], 0)
+        elif self._lsh is not None:
+            if self._next == 0:
+                # Each wrap rebuilds the buckets, dropping the slots' overwritten vectors
+                self._lsh = LSHIndex(self.embedder.dim)
+                self._lsh.add(self._vectors[:self._size], 0)
+            else:
+                self._lsh.add(vector[None, :], slot)
+
+    def add(self, problem: Dict, results: Dict[str, dict]) -> int:
+        """
+        Index a solved problem with the stage results to keep (normally only
+        the final answer); returns the entry id.
+        """
+        problem = {k: problem[k] for k in PROBLEM_FIELDS if problem.get(k)}
+        vector = self.embedder.embed(problem_text(problem))
+        with self._lock:
+            if self._db is None:
+                self._added += 1
+                self._put(vector, {"id": self._added, "problem": problem, "results": results})
+                return self._added
+            cursor = self._db.execute(
+                "INSERT INTO solutions (created_at, problem, results, vector) VALUES (?, ?, ?, ?)",
+                (time.time(), json.dumps(problem), json.dumps(results), vector.tobytes())
+            )
+            if cursor.lastrowid % PRUNE_EVERY == 0:
+                self._db.execute("DELETE FROM solutions WHERE id <= ?", (cursor.lastrowid - self.capacity,))
+            self._db.commit()
+            self._sync()
+            return cursor.lastrowid
+
+    def query(self, problem: Dict, k: int = 3) -> List[Tuple[float, Dict]]:
+        """The `k` most similar indexed problems as (cosine similarity, entry), best first."""
+        vector = self.embedder.embed(problem_text(problem))
+        with self._lock:
+            if self._db is not None:
+                self._sync()
+            if self._size == 0 or k <= 0:
+                return []
+            if self._lsh is not None:
+                rows = self._lsh.candidates(vector)
+                if len(rows) == 0:
+                    return []
+                scores = self._vectors[rows] @ vector
+            else:
+                rows = np.arange(self._size)
+                scores = self._vectors[:self._size] @ vector
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._entries[rows[i]]) for i in top]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def reference_solutions(matches: List[Tuple[float, Dict]], final_stage: str,
+                        max_chars: int = 1500) -> List[Dict]:
+    """Prior problems and their final answers, trimmed for use as prompt seeds."""
+    references = []
+    for score, entry in matches:
+        final = entry["results"].get(final_stage, {})
+        answer = final.get("consensus") or final.get("proposal") or ""
+        references.append({
+            "similarity": round(score, 3),
+            "problem": truncate(str(entry["problem"].get("description", "")), 300),
+            "solution": truncate(str(answer), max_chars)
+        })
+    return references
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from agents import ModelTarget
+from agents.context import estimate_tokens
+from agents.metrics import ROUTES
+from agents.providers import get_provider
+from agents.storage import connect, state_path
+from .policies import is_skipped, verification_score
+
+TIERS = ("fast", "strong")
+COMPLEXITIES = ("simple", "moderate", "complex")
+
+# Cheaper model on the same provider, used as a role's fast tier by default
+FAST_MODELS = {
+    "openai": "gpt-3.5-turbo",
+    "anthropic": "claude-3-haiku-20240307",
+    "groq": "llama3-8b-8192",
+    "cohere": "command-light"
+}
+
+# Agents given the strong tier by default, per complexity, until outcomes say otherwise:
+# the proposal and the synthesis matter most, the reviews least
+STRONG_BY_DEFAULT = {
+    "simple": (),
+    "moderate": ("lead_solver", "consensus_builder"),
+    "complex": ("lead_solver", "critic", "judgment", "strategist", "data_augmentor", "consensus_builder")
+}
+
+# Wording that usually signals multi-step reasoning
+REASONING_CUES = re.compile(
+    r"\b(prove|proof|derive|optimi[sz]e|trade-?offs?|design|architect\w*|algorithm\w*|"
+    r"complexity|step[- ]by[- ]step|multi-?step|formal\w*|theorem|constraints?)\b",
+    re.IGNORECASE
+)
+
+
+def classify(problem: Dict) -> float:
+    """
+    Complexity of a problem from 0 (trivial) to 1, from cheap local signals:
+    description length, number of constraints, reasoning cue words and
+    whether a domain is named at all.
+    """
+    description = str(problem.get("description", ""))
+    constraints = problem.get("constraints") or {}
+    length = min(1.0, estimate_tokens(description) / 400)
+    count = min(1.0, len(constraints) / 6)
+    cues = min(1.0, len(REASONING_CUES.findall(description)) / 4)
+    domain = 1.0 if problem.get("domain") else 0.0
+    return round(0.4 * length + 0.25 * count + 0.25 * cues + 0.1 * domain, 4)
+
+
+def complexity_band(score: float) -> str:
+    if score < 0.3:
+        return "simple"
+    if score < 0.6:
+        return "moderate"
+    return "complex"
+
+
+def run_quality(run) -> Optional[float]:
+    """
+    Outcome quality of a finished run, 0 to 1: the mean of the consensus
+    harmony score and the Judgment verification score, whichever exist.
+    """
+    final = run.final or {}
+    scores = [
+        (final.get("agreement_metrics") or {}).get("harmony_score"),
+        verification_score(None if is_skipped(run.results.get("verification")) else run.results.get("verification"))
+    ]
+    scores = [score for score in scores if score is not None]
+    return sum(scores) / len(scores) if scores else None
+
+
+class ModelRouter:
+    """
+    Picks a fast or strong model per agent for each problem.
+
+    Problems are classified locally into a complexity band; each agent then
+    starts from STRONG_BY_DEFAULT for that band. Every finished run records
+    the quality it reached and each stage's latency against the tiers used,
+    as moving averages per (agent, band, tier) kept in SQLite (shared by
+    workers and kept across restarts with a path). Once both tiers have
+    `min_samples` outcomes in a band, the agent gets whichever scores
+    better on quality minus `latency_weight` per second, with the fast tier
+    winning ties within `tolerance`. A small `explore` share of calls tries
+    the other tier so both keep being measured. SQLite is only read and
+    written from executor threads, never on the event loop.
+    """
+
+    def __init__(self, tiers: Dict[str, Dict[str, ModelTarget]], path: Optional[str] = None,
+                 classifier: Callable[[Dict], float] = classify, min_samples: int = 20,
+                 tolerance: float = 0.02, latency_weight: float = 0.005, explore: float = 0.05,
+                 smoothing: float = 0.1, refresh: float = 5.0, seed: Optional[int] = None):
+        self.tiers = tiers
+        self.classifier = classifier
+        self.min_samples = min_samples
+        self.tolerance = tolerance
+        self.latency_weight = latency_weight
+        self.explore = explore
+        self.smoothing = smoothing
+        self.refresh = refresh
+        self._rng = random.Random(seed)
+        self._db = connect(path or ":memory:")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS routing_outcomes ("
+            "agent TEXT NOT NULL, complexity TEXT NOT NULL, tier TEXT NOT NULL, "
+            "samples INTEGER NOT NULL, quality REAL, latency REAL, "
+            "PRIMARY KEY (agent, complexity, tier))"
+        )
+        self._db.commit()
+        self._stats: Dict[Tuple[str, str, str], Tuple[int, Optional[float], Optional[float]]] = {}
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, agents: Dict[str, object]) -> Optional["ModelRouter"]:
+        """
+        Router configured by SIRIUS_ROUTING, or None when it is unset.
+
+        "1" gives every agent its current model as the strong tier and the
+        provider's FAST_MODELS entry as the fast one; a JSON object keyed by
+        agent name sets tiers explicitly, e.g.
+        {"critic": {"fast": "groq/llama3-8b-8192", "strong": "anthropic/claude-3-opus-20240229"}}.
+        Outcomes are kept at SIRIUS_ROUTING_PATH (or SIRIUS_STATE_DIR).
+        """
+        raw = os.getenv("SIRIUS_ROUTING")
+        if not raw or raw.lower() in ("0", "false", "no"):
+            return None
+        if raw.lower() in ("1", "true", "yes"):
+            tiers = default_tiers(agents)
+        else:
+            tiers = {
+                name: {tier: ModelTarget.parse(value) for tier, value in config.items()}
+                for name, config in json.loads(raw).items()
+            }
+        return cls(tiers, path=state_path("SIRIUS_ROUTING_PATH", "routing.db"),
+                   min_samples=int(os.getenv("SIRIUS_ROUTING_MIN_SAMPLES", "20")),
+                   explore=float(os.getenv("SIRIUS_ROUTING_EXPLORE", "0.05")))
+
+    def check(self, agents: Dict[str, object]):
+        """Reject tiers for unknown agents or tiers, or on unknown providers."""
+        for name, config in self.tiers.items():
+            if name not in agents:
+                raise ValueError(f"Routing configured for unknown agent '{name}'")
+            for tier, target in config.items():
+                if tier not in TIERS:
+                    raise ValueError(f"Unknown tier {tier!r} for '{name}'; use one of: {', '.join(TIERS)}")
+                get_provider(target.provider)
+
+    def _read(self) -> Dict[Tuple[str, str, str], Tuple[int, Optional[float], Optional[float]]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT agent, complexity, tier, samples, quality, latency FROM routing_outcomes"
+            ).fetchall()
+        return {(row[0], row[1], row[2]): row[3:] for row in rows}
+
+    async def reload(self, force: bool = False):
+        """Reload the recorded outcomes once they are `refresh` seconds old."""
+        if not force and time.monotonic() - self._loaded < self.refresh:
+            return
+        # Marked first, so concurrent routes do not all reload
+        self._loaded = time.monotonic()
+        self._stats = await asyncio.get_running_loop().run_in_executor(None, self._read)
+
+    def _utility(self, agent: str, band: str, tier: str) -> Optional[float]:
+        samples, quality, latency = self._stats.get((agent, band, tier), (0, None, None))
+        if samples < self.min_samples or quality is None:
+            return None
+        return quality - self.latency_weight * (latency or 0.0)
+
+    def choose(self, agent: str, band: str) -> str:
+        fast, strong = self._utility(agent, band, "fast"), self._utility(agent, band, "strong")
+        if fast is not None and strong is not None:
+            tier = "fast" if fast >= strong - self.tolerance else "strong"
+        else:
+            tier = "strong" if agent in STRONG_BY_DEFAULT[band] else "fast"
+        if self._rng.random() < self.explore:
+            tier = "strong" if tier == "fast" else "fast"
+        return tier
+
+    async def route(self, problem: Dict) -> Dict:
+        """
+        The complexity and per-agent tier and model for one problem, as
+        {"complexity": band, "score": ..., "tiers": {agent: tier}, "targets": {agent: ModelTarget}}.
+        """
+        await self.reload()
+        score = self.classifier(problem)
+        band = complexity_band(score)
+        tiers, targets = {}, {}
+        for agent, config in self.tiers.items():
+            tier = self.choose(agent, band)
+            if tier not in config:
+                continue
+            tiers[agent], targets[agent] = tier, config[tier]
+            ROUTES.inc(agent=agent, complexity=band, tier=tier)
+        return {"complexity": band, "score": score, "tiers": tiers, "targets": targets}
+
+    async def observe(self, run, route: Dict):
+        """Fold a finished run's quality and stage latencies into the routed tiers' averages."""
+        quality = None if run.deadline_exceeded else run_quality(run)
+        failed = getattr(run.error, "stage", None)
+        outcomes = []
+        for stage in run.pipeline.stages:
+            tier = route["tiers"].get(stage.agent)
+            if tier is None or stage.name not in run.timings:
+                continue
+            # A stage that failed outright counts as the worst outcome for its tier
+            outcome = 0.0 if stage.name == failed and not run.deadline_exceeded else quality
+            outcomes.append((stage.agent, route["complexity"], tier, int(outcome is not None), outcome,
+                             run.timings[stage.name]["duration"], self.smoothing, self.smoothing))
+        if outcomes:
+            await asyncio.get_running_loop().run_in_executor(None, self._record, outcomes)
+
+    def _record(self, outcomes: List[tuple]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO routing_outcomes (agent, complexity, tier, samples, quality, latency) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (agent, complexity, tier) DO UPDATE SET "
+                "samples = samples + excluded.samples, "
+                "quality = CASE WHEN excluded.quality IS NULL THEN quality WHEN quality IS NULL "
+                "THEN excluded.quality ELSE quality + ? * (excluded.quality - quality) END, "
+                "latency = CASE WHEN latency IS NULL THEN excluded.latency "
+                "ELSE latency + ? * (excluded.latency - latency) END",
+                outcomes
+            )
+            self._db.commit()
+
+    async def snapshot(self) -> Dict[str, Dict]:
+        """Recorded outcomes as {agent: {band: {tier: {samples, quality, latency}}}}."""
+        await self.reload(force=True)
+        snapshot: Dict[str, Dict] = {}
+        for (agent, band, tier), (samples, quality, latency) in sorted(self._stats.items()):
+            snapshot.setdefault(agent, {}).setdefault(band, {})[tier] = {
+                "samples": samples,
+                "quality": None if quality is None else round(quality, 4),
+                "latency": None if latency is None else round(latency, 4)
+            }
+        return snapshot
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def default_tiers(agents: Dict[str, object]) -> Dict[str, Dict[str, ModelTarget]]:
+    """Each agent's current model as its strong tier, and its provider's cheaper model as the fast one."""
+    tiers = {}
+    for name, agent in agents.items():
+        target = getattr(agent, "target", None)
+        if target is None or target.provider not in FAST_MODELS:
+            continue
+        tiers[name] = {"fast": ModelTarget(target.provider, FAST_MODELS[target.provider]), "strong": target}
+    return tiers
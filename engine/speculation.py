@@ -0,0 +1,120 @@
+import json
+import os
+import re
+from typing import Dict, Optional, Sequence
+from agents.context import estimate_tokens
+from agents.metrics import SPECULATIONS
+
+# Where a streamed text can be cut without splitting a sentence or a line
+_BOUNDARY = re.compile(r"(?:[.!?:]\s|\n)")
+
+
+def stable_prefix(text: str) -> str:
+    """`text` up to its last complete sentence or line; empty if there is none yet."""
+    end = 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end()
+    return text[:end]
+
+
+class Draft:
+    """
+    The streamed output of one upstream stage while it is being generated.
+
+    feed() returns a prefix to start downstream stages on once at least
+    `min_tokens` have arrived and the text is most of the way to its
+    `expected` length (halfway between `coverage` and the end), and again
+    each time the prefix last handed out falls below `coverage` of the
+    text so far (at most `max_restarts` times): a speculative review of
+    too short a prefix would be rejected.
+    """
+
+    def __init__(self, min_tokens: int, coverage: float, max_restarts: int, expected: Optional[float] = None):
+        self.min_tokens = min_tokens
+        self.coverage = coverage
+        self.max_restarts = max_restarts
+        self.start_at = (1 + coverage) / 2 * expected if expected else 0.0
+        self.text = ""
+        self.prefix: Optional[str] = None
+        self.restarts = 0
+
+    def reset(self):
+        """Start over on a retried call's text; runs already started are reconciled as usual."""
+        self.text = ""
+        self.prefix = None
+
+    def feed(self, delta: str) -> Optional[str]:
+        self.text += delta
+        if self.prefix is not None:
+            if self.restarts >= self.max_restarts or len(self.prefix) >= self.coverage * len(self.text):
+                return None
+        if estimate_tokens(self.text) < self.min_tokens or len(self.text) < self.start_at:
+            return None
+        prefix = stable_prefix(self.text)
+        if not prefix or (self.prefix is not None and len(prefix) <= len(self.prefix)):
+            return None
+        if self.prefix is not None:
+            self.restarts += 1
+        self.prefix = prefix
+        return prefix
+
+
+class Speculation:
+    """
+    Starts the stages that depend only on a streaming stage (the reviews of
+    the LeadSolver's proposal) on a stable prefix of its output, before it
+    has finished.
+
+    When the upstream stage completes, a speculative result is kept if its
+    prefix is the start of the final text and covers at least `coverage` of
+    it (a win); otherwise it is discarded and the stage runs again on the
+    full output (a loss). How far into the stream to start is learned from
+    the lengths the upstream stage's outputs have had so far. Only upstream agents that can build a provisional
+    result from partial text (a `draft(text)` method) are speculated on,
+    and stages a skipping policy governs never start early.
+    """
+
+    def __init__(self, stages: Sequence[str] = ("initial_solution",), min_tokens: int = 150,
+                 coverage: float = 0.8, max_restarts: int = 2):
+        self.stages = tuple(stages)
+        self.min_tokens = min_tokens
+        self.coverage = coverage
+        self.max_restarts = max_restarts
+        self.stats: Dict[str, int] = {"win": 0, "loss": 0, "restart": 0}
+        # Moving average of each upstream stage's output length, in characters
+        self.lengths: Dict[str, float] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional["Speculation"]:
+        """
+        Speculation configured by SIRIUS_SPECULATION, or None when unset:
+        "1" for the defaults or a JSON object of settings, e.g.
+        {"stages": ["initial_solution"], "min_tokens": 200, "coverage": 0.85}.
+        """
+        raw = os.getenv("SIRIUS_SPECULATION")
+        if not raw or raw.lower() in ("0", "false", "no"):
+            return None
+        if raw.lower() in ("1", "true", "yes"):
+            return cls()
+        return cls(**json.loads(raw))
+
+    def draft(self, stage: str) -> Draft:
+        return Draft(self.min_tokens, self.coverage, self.max_restarts, self.lengths.get(stage))
+
+    def observe(self, stage: str, text: str):
+        """Note the length of an upstream stage's finished output."""
+        previous = self.lengths.get(stage)
+        self.lengths[stage] = len(text) if previous is None else previous + 0.2 * (len(text) - previous)
+
+    def accepts(self, prefix: str, text: str) -> bool:
+        """Whether a result computed on `prefix` stands for the final `text`."""
+        prefix, text = prefix.strip(), text.strip()
+        return bool(text) and text.startswith(prefix) and len(prefix) >= self.coverage * len(text)
+
+    def record(self, stage: str, outcome: str, count: int = 1):
+        self.stats[outcome] += count
+        SPECULATIONS.inc(count, stage=stage, outcome=outcome)
+
+    def snapshot(self) -> Dict[str, float]:
+        decided = self.stats["win"] + self.stats["loss"]
+        return dict(self.stats, win_rate=round(self.stats["win"] / decided, 4) if decided else None)
@@ -0,0 +1,257 @@
+import asyncio
+import glob
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Dict, IO, Iterator, List, Optional
+from agents.metrics import TRAJECTORIES
+
+SHARD_SUFFIX = ".jsonl.gz"
+# Shards being written carry this extra suffix until they are rotated out
+OPEN_SUFFIX = ".part"
+
+# Context fields besides the problem that shape what the first stage sees
+CONTEXT_FIELDS = ("reference_solutions",)
+
+
+def trajectory(run) -> Dict:
+    """Serializable record of a SolveRun: every stage's output, timing, completions and score."""
+    final = run.final or {}
+    outputs = dict(run.results)
+    if run.refinement is not None:
+        # Refinement replaces the final result; the stage itself produced the initial one
+        outputs[run.final_stage] = run.refinement["initial"]
+    stages = {}
+    for stage in run.pipeline.stages:
+        if stage.name in outputs:
+            stages[stage.name] = {
+                "agent": stage.agent,
+                "depends_on": list(stage.depends_on),
+                "output": outputs[stage.name],
+                "timing": run.timings.get(stage.name),
+                "calls": run.calls.get(stage.name, [])
+            }
+    record = {
+        "problem_id": run.problem_id,
+        "timestamp": run.timestamp,
+        "problem": run.problem,
+        "context": {k: v for k, v in (run.context or {}).items() if k in CONTEXT_FIELDS},
+        "status": "ok" if run.error is None else "error",
+        "duration": round(run.duration, 4),
+        "score": final.get("agreement_metrics", {}).get("harmony_score"),
+        "stages": stages
+    }
+    if run.error is not None:
+        record["error"] = str(run.error)
+    if run.refinement is not None:
+        record["refinement"] = {
+            "stopped": run.refinement["stopped"],
+            "rounds": run.refinement["rounds"]
+        }
+    return record
+
+
+def shard_pid(path: str) -> Optional[int]:
+    """The id of the process that wrote a shard, from its name."""
+    parts = os.path.basename(path).split("-")
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class TrajectoryRecorder:
+    """
+    Appends every pipeline run to gzip-compressed JSONL shards.
+
+    record() only enqueues the run; a background task serializes and
+    compresses queued runs in a worker thread, so recording adds nothing
+    to request latency. Shards rotate once they hold `max_records` runs or
+    `max_bytes` of uncompressed JSON. When the queue is full, runs are
+    dropped (and counted) rather than applying backpressure to requests.
+    """
+
+    def __init__(self, directory: str, max_records: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, max_queue: int = 1000):
+        self.directory = directory
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._file: Optional[IO[bytes]] = None
+        self._path: Optional[str] = None
+        self._records = 0
+        self._bytes = 0
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    @classmethod
+    def from_env(cls) -> Optional["TrajectoryRecorder"]:
+        """Recorder writing to SIRIUS_TRAJECTORY_DIR, or None when it is not set."""
+        directory = os.getenv("SIRIUS_TRAJECTORY_DIR")
+        if not directory:
+            return None
+        return cls(directory, max_records=int(os.getenv("SIRIUS_TRAJECTORY_SHARD_RECORDS", "10000")))
+
+    def _recover(self):
+        # A shard left open by a crash is still a valid gzip stream up to its last flush;
+        # shards of processes still running (other workers sharing the directory) are theirs
+        for path in glob.glob(os.path.join(self.directory, "*" + SHARD_SUFFIX + OPEN_SUFFIX)):
+            pid = shard_pid(path)
+            if pid is not None and process_alive(pid):
+                continue
+            os.replace(path, path[:-len(OPEN_SUFFIX)])
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._drain())
+
+    def record(self, run):
+        """Queue a run for writing; never blocks."""
+        self.start()
+        try:
+            self._queue.put_nowait(run)
+        except asyncio.QueueFull:
+            TRAJECTORIES.inc(outcome="dropped")
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stop = None in batch
+            runs = [run for run in batch if run is not None]
+            if runs:
+                await loop.run_in_executor(None, self._write, runs)
+            if stop:
+                return
+
+    def _open(self):
+        self._sequence += 1
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        name = f"trajectories-{stamp}-{os.getpid()}-{self._sequence:04d}{SHARD_SUFFIX}"
+        self._path = os.path.join(self.directory, name)
+        self._file = gzip.open(self._path + OPEN_SUFFIX, "wb")
+        self._records = 0
+        self._bytes = 0
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            os.replace(self._path + OPEN_SUFFIX, self._path)
+            self._file = None
+
+    def _write(self, runs: List):
+        for run in runs:
+            try:
+                line = (json.dumps(trajectory(run), separators=(",", ":"), default=str) + "\n").encode("utf-8")
+            except Exception:
+                TRAJECTORIES.inc(outcome="failed")
+                continue
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._records += 1
+            self._bytes += len(line)
+            TRAJECTORIES.inc(outcome="recorded")
+            if self._records >= self.max_records or self._bytes >= self.max_bytes:
+                self._rotate()
+        if self._file is not None:
+            # A sync flush keeps everything written so far readable after a crash
+            self._file.flush()
+
+    async def close(self):
+        """Write out everything queued, then seal the open shard."""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(None, self._rotate)
+
+
+def read_trajectories(directory: str) -> Iterator[Dict]:
+    """Records from every sealed shard in `directory`, oldest shard first."""
+    for path in sorted(glob.glob(os.path.join(directory, "*" + SHARD_SUFFIX))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            except (EOFError, json.JSONDecodeError):
+                # Truncated by a crash; keep what was readable
+                continue
+
+
+def training_examples(record: Dict) -> Iterator[Dict]:
+    """
+    (agent, system, prompt, completion) examples from one trajectory: every
+    completion its stages and refinement rounds made, with the model and
+    the messages exactly as they were sent. Calls that sent no chat
+    messages (a prediction endpoint) leave nothing to export.
+    """
+    for name, stage in record["stages"].items():
+        for call in stage.get("calls", []):
+            yield dict(call, agent=stage["agent"], stage=name)
+
+    for round_record in (record.get("refinement") or {}).get("rounds", []):
+        for call in round_record.get("calls", []):
+            example = {key: value for key, value in call.items() if key != "step"}
+            yield dict(example, stage=f"refinement_{call['step']}")
+
+
+def build_datasets(source: str, destination: str, min_score: float = 0.3) -> Dict[str, int]:
+    """
+    Turn recorded trajectories into per-agent fine-tuning datasets.
+
+    Only successful runs scoring at least `min_score` are used, and each
+    problem contributes once (its latest run). Writes one JSONL file of
+    {"model", "system", "prompt", "completion"} examples per agent to
+    `destination` and returns the number of examples written per agent.
+    """
+    latest: Dict[str, Dict] = {}
+    for record in read_trajectories(source):
+        if record.get("status") != "ok" or (record.get("score") or 0.0) < min_score:
+            continue
+        latest[record["problem_id"]] = record
+
+    os.makedirs(destination, exist_ok=True)
+    files: Dict[str, IO[str]] = {}
+    counts: Dict[str, int] = {}
+    try:
+        for record in latest.values():
+            for example in training_examples(record):
+                agent = example["agent"]
+                if not example["completion"]:
+                    continue
+                if agent not in files:
+                    files[agent] = open(os.path.join(destination, f"{agent}.jsonl"), "w", encoding="utf-8")
+                    counts[agent] = 0
+                files[agent].write(json.dumps({
+                    "model": example["model"],
+                    "system": example["system"],
+                    "prompt": example["prompt"],
+                    "completion": example["completion"],
+                    "stage": example["stage"],
+                    "problem_id": record["problem_id"],
+                    "score": record.get("score")
+                }) + "\n")
+                counts[agent] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return counts
@@ -1,24 +1,31 @@
+import argparse
 import asyncio
-from typing import Dict, List
-from agents import (
-    LeadSolver,
-    CriticAgent,
-    JudgmentAgent,
-    StrategistAgent,
-    DataAugmentorAgent,
-    ConsensusBuilderAgent
-)
+from typing import AsyncIterator, Dict, List, Optional
+from agents import MicroBatcher, parse_duration
+from engine import Orchestrator, Pipeline, build_datasets, run_jsonl
+
+STAGE_LABELS = {
+    "initial_solution": "Initial Solution",
+    "critique": "Critique",
+    "verification": "Verification",
+    "strategic_analysis": "Strategic Analysis",
+    "augmented_solution": "Augmented Solution",
+    "consensus": "Final Consensus",
+    "refinement": "Refinement Round"
+}
 
 class MultiAgentSystem:
-    def __init__(self):
-        self.agents = {
-            'lead_solver': LeadSolver(),
-            'critic': CriticAgent(),
-            'judgment': JudgmentAgent(),
-            'strategist': StrategistAgent(),
-            'data_augmentor': DataAugmentorAgent(),
-            'consensus_builder': ConsensusBuilderAgent()
-        }
+    def __init__(self, pipeline: Optional[Pipeline] = None):
+        # The orchestrator owns the agents, the pooled transport and the pipeline
+        self.orchestrator = Orchestrator(pipeline=pipeline)
+
+    @property
+    def agents(self) -> Dict:
+        return self.orchestrator.agents
+
+    async def close(self):
+        """Release shared resources held by the orchestrator."""
+        await self.orchestrator.close()
         
     async def solve_problem(self, problem: Dict) -> Dict:
         """
@@ -30,54 +37,77 @@ class MultiAgentSystem:
         Returns:
             Dict containing the final solution and reasoning process
         """
-        context = {
-            "problem": problem,
-            "agent_responses": []
-        }
-        
-        try:
-            # Step 1: Generate initial solution
-            initial_solution = await self.agents['lead_solver'].process(context)
-            context["agent_responses"].append(initial_solution)
-            print("\nInitial Solution:", initial_solution)
+        def report(stage: str, result: Dict):
+            print(f"\n{STAGE_LABELS.get(stage, stage)}:", result)
 
-            # Step 2: Get critique
-            critique = await self.agents['critic'].process(context)
-            context["agent_responses"].append(critique)
-            print("\nCritique:", critique)
-
-            # Step 3: Verify facts and logic
-            verification = await self.agents['judgment'].process(context)
-            context["agent_responses"].append(verification)
-            print("\nVerification:", verification)
+        run = await self.orchestrator.solve(problem, on_result=report)
+        if run.error is not None:
+            print(f"Error: {str(run.error)}")
+            return {
+                "error": str(run.error),
+                "reasoning_process": run.reasoning_process()
+            }
 
-            # Step 4: Analyze strategic implications
-            strategic_analysis = await self.agents['strategist'].process(context)
-            context["agent_responses"].append(strategic_analysis)
-            print("\nStrategic Analysis:", strategic_analysis)
+        return {
+            "final_solution": run.final,
+            "reasoning_process": run.reasoning_process()
+        }
 
-            # Step 5: Augment with learned patterns
-            augmented_solution = await self.agents['data_augmentor'].process(context)
-            context["agent_responses"].append(augmented_solution)
-            print("\nAugmented Solution:", augmented_solution)
+    def stream_problem(self, problem: Dict, tokens: bool = False) -> AsyncIterator[Dict]:
+        """Async generator of stage (and optionally token) events for a problem."""
+        return self.orchestrator.stream(problem, tokens=tokens)
 
-            # Step 6: Build consensus
-            consensus = await self.agents['consensus_builder'].process(context)
-            print("\nFinal Consensus:", consensus)
+async def run_batch(args):
+    """Solve every problem in a JSONL file, resuming from an existing output file."""
+    async with Orchestrator() as orchestrator:
+        if args.batch_window:
+            # Offline runs trade a little latency per call for fewer, fuller provider requests
+            orchestrator.transport.batcher = MicroBatcher(parse_duration(args.batch_window), args.batch_max_size)
+        counts = await run_jsonl(
+            orchestrator,
+            args.batch,
+            args.output,
+            concurrency=args.concurrency,
+            use_cache=not args.no_cache
+        )
+    print(f"Solved {counts['solved']}, failed {counts['failed']}, skipped {counts['skipped']} already completed")
 
-            return {
-                "final_solution": consensus,
-                "reasoning_process": context["agent_responses"]
-            }
+def run_build_datasets(args):
+    """Build per-agent fine-tuning datasets from recorded trajectories."""
+    counts = build_datasets(args.build_datasets, args.dataset_dir, min_score=args.min_score)
+    for agent, count in sorted(counts.items()):
+        print(f"{agent}: {count} examples")
+    print(f"Wrote {sum(counts.values())} examples to {args.dataset_dir}")
 
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            return {
-                "error": str(e),
-                "reasoning_process": context["agent_responses"]
-            }
+def parse_args():
+    parser = argparse.ArgumentParser(description="Self-improving multi-agent problem solver")
+    parser.add_argument("--batch", metavar="INPUT", help="JSONL file with one problem per line")
+    parser.add_argument("--output", metavar="OUTPUT", default="results.jsonl",
+                        help="JSONL file results are appended to (default: results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Problems solved in parallel in batch mode (default: 4)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache")
+    parser.add_argument("--batch-window", metavar="DURATION",
+                        help="Micro-batch provider calls made within this window in batch mode, e.g. 50ms")
+    parser.add_argument("--batch-max-size", type=int, default=16,
+                        help="Most provider calls sent in one micro-batch (default: 16)")
+    parser.add_argument("--build-datasets", metavar="TRAJECTORY_DIR",
+                        help="Build per-agent fine-tuning datasets from recorded trajectories")
+    parser.add_argument("--dataset-dir", default="datasets",
+                        help="Directory datasets are written to (default: datasets)")
+    parser.add_argument("--min-score", type=float, default=0.3,
+                        help="Minimum run score for a trajectory to be used (default: 0.3)")
+    return parser.parse_args()
 
 async def main():
+    args = parse_args()
+    if args.build_datasets:
+        run_build_datasets(args)
+        return
+    if args.batch:
+        await run_batch(args)
+        return
+
     system = MultiAgentSystem()
     problem = {
         "description": "How can we optimize a machine learning model for real-time prediction?",
@@ -86,8 +116,11 @@ async def main():
             "max_latency": "100ms"
         }
     }
-    solution = await system.solve_problem(problem)
-    print("\nSolution:", solution)
+    try:
+        solution = await system.solve_problem(problem)
+        print("\nSolution:", solution)
+    finally:
+        await system.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
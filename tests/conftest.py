@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def mock_providers(monkeypatch, tmp_path):
+    """Answer every provider call locally and keep all state out of the working tree."""
+    monkeypatch.setenv("SIRIUS_MOCK_PROVIDERS", "1")
+    monkeypatch.setenv("SIRIUS_MOCK_TIME_SCALE", "0.001")
+    monkeypatch.setenv("SIRIUS_REFINE_ROUNDS", "0")
+    for name in ("SIRIUS_STATE_DIR", "SIRIUS_DEADLINE", "SIRIUS_POLICIES", "SIRIUS_ROUTING",
+                 "SIRIUS_SPECULATION", "SIRIUS_BATCH_WINDOW", "SIRIUS_TRAJECTORY_DIR", "SIRIUS_REUSE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
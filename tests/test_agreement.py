@@ -0,0 +1,37 @@
+import asyncio
+from agents import ExperienceStore, MockTransport
+from agents.agreement import agreement_metrics, text_profile
+from agents.data_augmentor import DataAugmentorAgent
+
+
+def test_agreement_of_identical_and_unrelated_responses():
+    same = [{"proposal": "Merge sorted halves recursively"}] * 3
+    assert agreement_metrics(same)["harmony_score"] == 1.0
+
+    unrelated = [{"proposal": "Merge sorted halves recursively"}, {"proposal": "Paint fences green"}]
+    metrics = agreement_metrics(unrelated, consensus="Merge sorted halves recursively")
+    assert metrics["harmony_score"] == 0.0
+    assert metrics["coverage"] == 0.5
+    assert metrics["resolution_quality"] == 0.5
+
+
+def test_profiles_are_cached_per_text():
+    text_profile.cache_clear()
+    responses = [{"proposal": "Binary search halves the interval"}, {"critique": "Check the interval bounds"}]
+    first = agreement_metrics(responses, consensus="Binary search with checked bounds")
+    hits = text_profile.cache_info().hits
+    assert agreement_metrics(responses, consensus="Binary search with checked bounds") == first
+    assert text_profile.cache_info().hits == hits + 3
+
+
+def test_learning_metrics_are_measured():
+    async def run(description):
+        agent = DataAugmentorAgent(transport=MockTransport(time_scale=0.001), memory=ExperienceStore())
+        context = {"problem": {"description": description},
+                   "agent_responses": [{"role": "Lead Solver", "proposal": f"Plan for {description}"}]}
+        return [(await agent.process(context))["learning_metrics"] for _ in range(3)]
+
+    metrics = asyncio.run(run("schedule exams without clashes"))
+    # Agreement needs at least two similar past interactions
+    assert [m["pattern_confidence"] is None for m in metrics] == [True, True, False]
+    assert all(0.0 <= m["knowledge_coverage"] <= 1.0 for m in metrics)
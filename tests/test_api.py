@@ -0,0 +1,16 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+import api
+
+
+def test_metrics_use_the_prometheus_text_format():
+    async def run():
+        async with TestClient(TestServer(api.init_app())) as client:
+            response = await client.get("/metrics")
+            return response.status, response.headers, await response.text()
+
+    status, headers, text = asyncio.run(run())
+    assert status == 200
+    assert headers["Content-Type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "X-Prometheus-Format" not in headers
+    assert "# TYPE" in text
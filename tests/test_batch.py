@@ -0,0 +1,66 @@
+import asyncio
+import gc
+import json
+import weakref
+from engine import Orchestrator, run_jsonl, solve_batch
+
+
+def test_bad_item_fails_alone(tmp_path):
+    problems = [
+        {"id": "good-1", "description": "first problem"},
+        {"id": "bad", "description": "bad deadline", "deadline": "soon"},
+        {"id": "null", "description": "null deadline", "deadline": None},
+        {"id": "good-2", "description": "second problem"},
+    ]
+
+    async def run():
+        async with Orchestrator() as orchestrator:
+            return await solve_batch(orchestrator, [(p["id"], p) for p in problems], concurrency=4)
+
+    runs = asyncio.run(run())
+    assert set(runs) == {"good-1", "bad", "null", "good-2"}
+    assert isinstance(runs["bad"].error, ValueError)
+    assert all(runs[name].error is None for name in ("good-1", "null", "good-2"))
+
+
+def test_run_jsonl_records_every_line_and_resumes(tmp_path):
+    source, output = tmp_path / "problems.jsonl", tmp_path / "results.jsonl"
+    source.write_text("\n".join([
+        json.dumps({"id": "a", "description": "first problem"}),
+        json.dumps({"id": "b", "description": "bad deadline", "deadline": "soon"}),
+        json.dumps({"id": "c", "description": "second problem"}),
+    ]) + "\n")
+
+    async def run():
+        async with Orchestrator() as orchestrator:
+            return await run_jsonl(orchestrator, str(source), str(output), concurrency=3)
+
+    counts = asyncio.run(run())
+    assert counts == {"skipped": 0, "solved": 2, "failed": 1}
+    records = {r["id"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert "response" in records["a"] and "response" in records["c"]
+    assert "Invalid duration" in records["b"]["error"]
+
+    # Only the failed problem is attempted again
+    counts = asyncio.run(run())
+    assert counts == {"skipped": 2, "solved": 0, "failed": 1}
+
+
+def test_streamed_batches_keep_no_runs():
+    finished = []
+    alive = []
+
+    def on_complete(item_id, run):
+        finished.append((item_id, run.error is None))
+        alive.append(weakref.ref(run))
+
+    async def run():
+        async with Orchestrator() as orchestrator:
+            problems = ((str(i), {"description": f"problem {i}"}) for i in range(6))
+            return await solve_batch(orchestrator, problems, concurrency=2, on_complete=on_complete)
+
+    runs = asyncio.run(run())
+    gc.collect()
+    assert runs == {}
+    assert sorted(finished) == [(str(i), True) for i in range(6)]
+    assert all(ref() is None for ref in alive)
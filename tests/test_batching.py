@@ -0,0 +1,40 @@
+import asyncio
+from agents import MockTransport
+from agents.batching import MicroBatcher
+
+
+class RefusingTransport:
+    async def reserve(self, provider, payloads):
+        raise RuntimeError("limiter closed")
+
+    async def send_json(self, provider, url, headers, payload, reserved=False):
+        raise AssertionError("nothing may be sent without a reservation")
+
+
+def test_failed_reservation_fails_every_call():
+    async def run():
+        batcher = MicroBatcher(window=0.01)
+        transport = RefusingTransport()
+        calls = [
+            batcher.submit(transport, "openai", "http://provider", {}, {"messages": [{"content": str(i)}]})
+            for i in range(3)
+        ]
+        return await asyncio.wait_for(asyncio.gather(*calls, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert len(results) == 3
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_mock_transport_close_flushes_its_batcher():
+    async def run():
+        transport = MockTransport(time_scale=0.001)
+        transport.batcher = MicroBatcher(window=60)
+        call = asyncio.ensure_future(transport.post_json("openai", "http://provider", {}, {
+            "model": "gpt-4", "messages": [{"role": "user", "content": "hello"}]
+        }))
+        await asyncio.sleep(0.01)
+        await transport.close()
+        return await asyncio.wait_for(call, 1)
+
+    assert asyncio.run(run())
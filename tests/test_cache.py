@@ -0,0 +1,56 @@
+import asyncio
+from agents import ResponseCache
+
+PAYLOAD = {"model": "gpt-4", "messages": [{"role": "user", "content": "Sort  the list"}], "temperature": 0.2}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.snapshot() == {"hits": 3, "disk_hits": 0, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_expired_entries_are_misses():
+    cache = ResponseCache()
+    cache.set("a", {"v": 1}, ttl=-1)
+    assert cache.get("a") is None
+    assert cache.snapshot()["size"] == 0
+
+
+def test_entries_reload_from_sqlite(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(path=path)
+    asyncio.run(first.store("a", {"v": 1}))
+    first.set("stale", {"v": 0}, ttl=-1)
+    first.close()
+
+    second = ResponseCache(path=path)
+    assert asyncio.run(second.fetch("a")) == {"v": 1}
+    assert second.get("stale") is None
+    # Loaded once from disk, then answered from memory
+    assert second.get("a") == {"v": 1}
+    assert second.stats == {"hits": 1, "disk_hits": 1, "misses": 1, "evictions": 0}
+    second.close()
+
+
+def test_disk_tier_keeps_the_newest_entries(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.db"), max_disk_entries=10)
+    for i in range(100):
+        cache.set(f"k{i}", {"v": i})
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 10
+    cache.close()
+
+
+def test_keys_ignore_whitespace_and_key_order_but_not_the_request():
+    key = ResponseCache.make_key("Critic", "openai", "url", PAYLOAD)
+    reordered = {"temperature": 0.2, "messages": [{"content": "Sort the list ", "role": "user"}], "model": "gpt-4"}
+    assert ResponseCache.make_key("Critic", "openai", "url", reordered) == key
+    assert ResponseCache.make_key("Judgment", "openai", "url", PAYLOAD) != key
+    assert ResponseCache.make_key("Critic", "groq", "url", PAYLOAD) != key
+    assert ResponseCache.make_key("Critic", "openai", "url", dict(PAYLOAD, temperature=0.7)) != key
+    assert ResponseCache.make_key("Critic", "openai", "url", dict(PAYLOAD, model="gpt-3.5-turbo")) != key
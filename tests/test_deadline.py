@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from agents import DeadlineExceeded, deadline_after, parse_duration
+from agents.deadline import bounded, remaining
+from engine import Orchestrator
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (None, None),
+    (30, 30.0),
+    (1.5, 1.5),
+    ("45", 45.0),
+    ("45s", 45.0),
+    ("500ms", 0.5),
+    ("2m", 120.0),
+    (" 10 S ", 10.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["soon", "", "10h", "-5", 0, -1, True])
+def test_parse_duration_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+def test_nested_deadline_keeps_the_earlier_one():
+    with deadline_after(10):
+        with deadline_after(60):
+            assert remaining() <= 10
+        with deadline_after(None):
+            assert remaining() <= 10
+    assert remaining() is None
+
+
+def test_bounded_raises_deadline_exceeded():
+    async def run():
+        with deadline_after(0.01):
+            await bounded(asyncio.sleep(1))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+
+def test_solve_accepts_a_null_deadline():
+    async def run():
+        async with Orchestrator() as orchestrator:
+            return await orchestrator.solve({"description": "null deadline", "deadline": None})
+
+    run = asyncio.run(run())
+    assert run.error is None
+    assert "deadline" not in run.problem
+
+
+def test_solve_rejects_an_invalid_deadline():
+    async def run():
+        async with Orchestrator() as orchestrator:
+            await orchestrator.solve({"description": "bad deadline", "deadline": "soon"})
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from engine import JobQueue, Orchestrator
+
+
+def test_jobs_run_by_priority_and_finish(tmp_path):
+    async def run():
+        async with Orchestrator() as orchestrator:
+            jobs = JobQueue(orchestrator, path=str(tmp_path / "jobs.db"), workers=2, poll_interval=0.01)
+            submitted = [await jobs.submit({"description": f"problem {i}"}, priority=i) for i in range(4)]
+            assert [job["queue_position"] for job in submitted] == [0, 0, 0, 0]
+            assert (await jobs.get(submitted[0]["id"]))["queue_position"] == 3
+            jobs.start()
+            for _ in range(500):
+                if (await jobs.snapshot()).get("succeeded") == 4:
+                    break
+                await asyncio.sleep(0.01)
+            finished = [await jobs.get(job["id"]) for job in submitted]
+            await jobs.close()
+            return finished
+
+    finished = asyncio.run(run())
+    assert all(job["status"] == "succeeded" and "response" in job for job in finished)
+    # Higher priorities were claimed first
+    starts = [job["started_at"] for job in finished]
+    assert starts[3] <= starts[2] <= starts[1] <= starts[0]
+
+
+def test_close_requeues_claimed_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    async def run():
+        async with Orchestrator() as orchestrator:
+            jobs = JobQueue(orchestrator, path=path, workers=1, poll_interval=0.01)
+            job = await jobs.submit({"description": "interrupted"})
+            jobs.start()
+            while (await jobs.get(job["id"]))["status"] != "running":
+                await asyncio.sleep(0.001)
+            await jobs.close()
+            jobs = JobQueue(orchestrator, path=path, workers=0)
+            job = await jobs.get(job["id"])
+            await jobs.close()
+            return job
+
+    job = asyncio.run(run())
+    assert job["status"] == "queued" and job["attempts"] == 0
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http://127.0.0.1:8080/hook",
+    "http://localhost/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://[::1]/hook",
+])
+def test_webhooks_to_internal_addresses_are_refused(url):
+    async def run():
+        async with Orchestrator() as orchestrator:
+            jobs = JobQueue(orchestrator, path=":memory:")
+            try:
+                await jobs.check_webhook(url)
+            finally:
+                await jobs.close()
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_webhook_allowlist(monkeypatch):
+    monkeypatch.setenv("SIRIUS_WEBHOOK_HOSTS", "127.0.0.1, hooks.internal")
+
+    async def run():
+        async with Orchestrator() as orchestrator:
+            jobs = JobQueue.from_env(orchestrator)
+            try:
+                await jobs.check_webhook("http://127.0.0.1:8080/hook")
+                await jobs.check_webhook("https://HOOKS.internal/done")
+                with pytest.raises(ValueError):
+                    await jobs.check_webhook("https://example.com/hook")
+            finally:
+                await jobs.close()
+
+    asyncio.run(run())
+
+
+def test_default_queue_is_durable_under_the_state_dir(monkeypatch, tmp_path, caplog):
+    async def open_queue():
+        async with Orchestrator() as orchestrator:
+            jobs = JobQueue(orchestrator)
+            await jobs.close()
+
+    asyncio.run(open_queue())
+    assert "in memory" in caplog.text
+    caplog.clear()
+    monkeypatch.setenv("SIRIUS_STATE_DIR", str(tmp_path / "state"))
+    asyncio.run(open_queue())
+    assert "in memory" not in caplog.text
+    assert (tmp_path / "state" / "jobs.db").exists()
@@ -0,0 +1,46 @@
+from agents import ExperienceStore
+
+TOPICS = ["sorting numbers", "graph coloring", "exam scheduling", "matrix inversion", "string matching"]
+
+
+def context(topic):
+    return {"problem": {"description": f"A problem about {topic}", "domain": "algorithms"},
+            "agent_responses": [{"role": "Lead Solver", "proposal": f"Solve {topic} step by step"}]}
+
+
+def test_oldest_records_are_overwritten_at_capacity():
+    store = ExperienceStore(capacity=3)
+    for topic in TOPICS:
+        store.add(context(topic))
+    assert len(store) == 3
+    assert [r["problem"] for r in store.records()] == [f"A problem about {t}" for t in TOPICS[2:]]
+    assert all("sorting" not in r["problem"] for r in store.search("sorting numbers", k=3))
+
+
+def test_search_ranks_the_most_similar_record_first():
+    store = ExperienceStore()
+    for topic in TOPICS:
+        store.add(context(topic))
+    found = store.search("schedule the exams", k=2)
+    assert len(found) == 2
+    assert found[0]["problem"] == "A problem about exam scheduling"
+    assert found[0]["similarity"] >= found[1]["similarity"]
+
+
+def test_records_reload_from_sqlite_and_are_shared(tmp_path):
+    path = str(tmp_path / "memory.db")
+    first = ExperienceStore(capacity=3, path=path)
+    other = ExperienceStore(capacity=3, path=path)
+    for topic in TOPICS[:2]:
+        first.add(context(topic))
+    # Another process's writes are picked up before reading
+    other.add(context(TOPICS[2]))
+    assert len(first) == 3
+    first.add(context(TOPICS[3]))
+    first.close()
+    other.close()
+
+    reloaded = ExperienceStore(capacity=3, path=path)
+    assert [r["problem"] for r in reloaded.records()] == [f"A problem about {t}" for t in TOPICS[1:4]]
+    assert reloaded.search("matrix inversion", k=1)[0]["problem"] == "A problem about matrix inversion"
+    reloaded.close()
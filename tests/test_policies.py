@@ -0,0 +1,22 @@
+import asyncio
+from agents import MockTransport, ResponseCache
+from engine import DirectAnswer, Orchestrator, RefinementLoop, SolutionIndex
+
+
+def test_skipped_runs_are_not_refined():
+    async def run():
+        transport = MockTransport(time_scale=0.001)
+        orchestrator = Orchestrator(
+            transport=transport, cache=ResponseCache(max_entries=0), index=SolutionIndex(),
+            refinement=RefinementLoop(max_rounds=2), policies=[DirectAnswer(confidence=0.0)]
+        )
+        async with orchestrator:
+            run = await orchestrator.solve({"description": "an easy problem"})
+        return run, sum(transport.calls.values())
+
+    run, calls = asyncio.run(run())
+    assert run.error is None
+    assert set(run.skipped) == {"critique", "verification", "strategic_analysis", "augmented_solution"}
+    assert run.refinement is None
+    # The proposal and the consensus only
+    assert calls == 2
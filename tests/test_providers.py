@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from agents import HTTPTransport, ProviderError, RateLimitError, ResiliencePolicy
+from agents.lead_solver import LeadSolver
+from agents.providers import get_provider
+
+
+@pytest.mark.parametrize("provider, body, status", [
+    ("openai", {"error": {"message": "Invalid API key", "type": "invalid_request_error"}}, 400),
+    ("openai", {"error": {"message": "Slow down", "type": "requests", "code": "rate_limit_exceeded"}}, 429),
+    ("groq", {"error": {"message": "boom", "type": "server_error"}}, 500),
+    ("anthropic", {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}, 529),
+    ("anthropic", {"type": "error", "error": {"type": "authentication_error", "message": "bad key"}}, 401),
+    ("cohere", {"message": "invalid api token"}, 502),
+    ("vertex", {"error": {"code": 403, "message": "Permission denied", "status": "PERMISSION_DENIED"}}, 403),
+    ("openai", {"choices": []}, 502),
+])
+def test_error_payloads_raise_provider_errors(provider, body, status):
+    with pytest.raises(ProviderError) as caught:
+        get_provider(provider).parse(body)
+    assert caught.value.provider == provider
+    assert caught.value.status == status
+    assert isinstance(caught.value, RateLimitError) == (status == 429)
+
+
+def test_replies_still_parse():
+    assert get_provider("openai").parse({"choices": [{"message": {"content": "hi"}}]}) == "hi"
+    assert get_provider("anthropic").parse({"content": [{"type": "text", "text": "hi"}]}) == "hi"
+    assert get_provider("cohere").parse({"generations": [{"text": "hi"}]}) == "hi"
+    assert get_provider("vertex").parse({"predictions": ["hi"]}) == "hi"
+
+
+def test_transient_error_payloads_are_retried():
+    replies = [
+        {"error": {"message": "boom", "type": "server_error"}},
+        {"choices": [{"message": {"content": "recovered"}}]}
+    ]
+
+    async def handler(request):
+        return web.json_response(replies.pop(0))
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/", handler)
+        async with TestServer(app) as server, HTTPTransport() as transport:
+            agent = LeadSolver(transport=transport)
+            agent.resilience = ResiliencePolicy(max_attempts=2, base_delay=0, fallbacks={})
+            payload = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]}
+            result = await agent._post("openai", str(server.make_url("/")), {}, payload)
+            return get_provider("openai").parse(result), agent.resilience.stats["retries"]
+
+    assert asyncio.run(run()) == ("recovered", 1)
@@ -0,0 +1,35 @@
+import asyncio
+import time
+from agents.ratelimit import SharedTokenBucket
+
+
+def test_shared_pause_withholds_tokens_for_its_duration(tmp_path):
+    bucket = SharedTokenBucket(str(tmp_path / "limits.db"), "test:requests", per_minute=60)
+    try:
+        bucket._db.execute("UPDATE buckets SET updated = ? WHERE key = ?", (time.time() - 30, bucket.key))
+        bucket._db.commit()
+        bucket.pause(2)
+        # Time before the pause must not count towards its refill
+        assert 2.5 < bucket._take(1) < 3.5
+    finally:
+        bucket.close()
+
+
+def test_shared_pause_inside_the_event_loop_reaches_other_workers(tmp_path):
+    path = str(tmp_path / "limits.db")
+
+    async def run():
+        bucket = SharedTokenBucket(path, "test:requests", per_minute=60)
+        other = SharedTokenBucket(path, "test:requests", per_minute=60)
+        try:
+            bucket.pause(2)
+            for _ in range(100):
+                wait = await asyncio.get_running_loop().run_in_executor(None, other._take, 0)
+                if wait > 0:
+                    return wait
+                await asyncio.sleep(0.01)
+        finally:
+            bucket.close()
+            other.close()
+
+    assert asyncio.run(run()) > 1.5
@@ -0,0 +1,32 @@
+import asyncio
+from agents import MockTransport, ResponseCache
+from engine import Orchestrator, RefinementLoop, SolutionIndex
+
+
+def solve(transport, **settings):
+    async def run():
+        orchestrator = Orchestrator(transport=transport, cache=ResponseCache(max_entries=0),
+                                    index=SolutionIndex(), **settings)
+        async with orchestrator:
+            return await orchestrator.solve({"description": "refine me"})
+
+    return asyncio.run(run())
+
+
+def test_refinement_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("SIRIUS_REFINE_ROUNDS", raising=False)
+    assert not RefinementLoop.from_env().enabled
+    transport = MockTransport(time_scale=0.001)
+    run = solve(transport)
+    assert run.error is None and run.refinement is None
+    # One call per pipeline stage, none for refinement
+    assert sum(transport.calls.values()) == len(run.pipeline.stages)
+
+
+def test_enabled_refinement_runs_bounded_rounds(monkeypatch):
+    monkeypatch.setenv("SIRIUS_REFINE_ROUNDS", "1")
+    transport = MockTransport(time_scale=0.001)
+    run = solve(transport)
+    assert run.error is None
+    assert len(run.refinement["rounds"]) <= 1
+    assert run.refinement["stopped"] in ("max_rounds", "converged")
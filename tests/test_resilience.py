@@ -0,0 +1,150 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from agents import DeadlineExceeded, ProviderError, RateLimitError, ResiliencePolicy, deadline_after
+from agents.lead_solver import LeadSolver
+from agents.resilience import is_transient
+from agents.streaming import stream_tokens
+
+
+def policy(**settings):
+    return ResiliencePolicy(**dict({"base_delay": 0, "fallbacks": {}}, **settings))
+
+
+@pytest.mark.parametrize("error, transient", [
+    (RateLimitError("openai", 429), True),
+    (ProviderError("openai", 500), True),
+    (ProviderError("openai", 529), True),
+    (ProviderError("openai", 400), False),
+    (ProviderError("openai", 401), False),
+    (asyncio.TimeoutError(), True),
+    (DeadlineExceeded(), False),
+    (ValueError("bad reply"), False),
+])
+def test_retry_classification(error, transient):
+    assert is_transient(error) == transient
+
+
+def failing(errors, result=None):
+    """A call raising `errors` in turn, then returning `result`; counts its calls."""
+    calls = []
+
+    async def call():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return call, calls
+
+
+def test_transient_errors_are_retried_until_attempts_run_out():
+    call, calls = failing([ProviderError("openai", 500)] * 2, {"ok": True})
+    resilience = policy(max_attempts=3)
+    assert asyncio.run(resilience.call("k", "openai", call)) == {"ok": True}
+    assert len(calls) == 3 and resilience.stats["retries"] == 2
+
+    call, calls = failing([ProviderError("openai", 500)] * 3)
+    with pytest.raises(ProviderError):
+        asyncio.run(policy(max_attempts=3).call("k", "openai", call))
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    call, calls = failing([ProviderError("openai", 401)], {"ok": True})
+    with pytest.raises(ProviderError):
+        asyncio.run(policy(max_attempts=3).call("k", "openai", call))
+    assert len(calls) == 1
+
+
+def test_no_retry_once_the_deadline_budget_is_spent():
+    call, calls = failing([RateLimitError("openai", 429, retry_after=5)], {"ok": True})
+    resilience = policy(max_attempts=3)
+
+    async def run():
+        with deadline_after(1):
+            await resilience.call("k", "openai", call)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(run())
+    assert len(calls) == 1 and resilience.stats["retries"] == 0
+
+
+def test_fallbacks_are_tried_in_order_and_reshaped():
+    sent = []
+
+    async def send(provider, url, headers, payload):
+        sent.append(provider)
+        if provider != "groq":
+            raise ProviderError(provider, 503)
+        return {"choices": [{"message": {"content": "from groq"}}]}
+
+    agent = SimpleNamespace(role="Critic", openai_key="o", groq_key="g")
+    resilience = policy(max_attempts=2, fallbacks={"Critic": ["openai", "groq"]})
+    payload = {"model": "claude", "system": "s", "messages": [{"role": "user", "content": "hi"}]}
+    result = asyncio.run(resilience.execute(agent, "anthropic", "url", {}, payload, send))
+    assert sent == ["anthropic", "anthropic", "openai", "openai", "groq"]
+    assert result == {"content": [{"type": "text", "text": "from groq"}]}
+    assert resilience.stats["fallbacks"] == 1
+
+
+def test_non_transient_errors_skip_fallbacks():
+    sent = []
+
+    async def send(provider, url, headers, payload):
+        sent.append(provider)
+        raise ProviderError(provider, 400)
+
+    agent = SimpleNamespace(role="Critic", openai_key="o", groq_key="g")
+    resilience = policy(fallbacks={"Critic": ["openai", "groq"]})
+    with pytest.raises(ProviderError):
+        asyncio.run(resilience.execute(agent, "anthropic", "url", {}, {"messages": []}, send))
+    assert sent == ["anthropic"]
+
+
+def test_slow_calls_are_hedged():
+    resilience = policy(hedge_percentile=0.5, hedge_min_samples=1)
+    resilience.latency.record("k", 0.01)
+    delays = [1.0, 0.0]
+
+    async def call():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return {"delay": delay}
+
+    assert asyncio.run(resilience.call("k", "openai", call)) == {"delay": 0.0}
+    assert resilience.stats["hedges"] == 1 and resilience.stats["hedge_wins"] == 1
+
+
+class FlakyStream:
+    """Streams part of a reply and fails, then streams the whole reply."""
+
+    def __init__(self):
+        self.attempts = 0
+
+    async def stream_events(self, provider, url, headers, payload):
+        self.attempts += 1
+        if self.attempts == 1:
+            yield '{"choices": [{"delta": {"content": "Hel"}}]}'
+            raise ProviderError(provider, 502)
+        for delta in ("Hello", " world"):
+            yield '{"choices": [{"delta": {"content": "%s"}}]}' % delta
+
+
+def test_retried_streams_withdraw_their_partial_text():
+    transport = FlakyStream()
+    agent = LeadSolver(transport=transport)
+    agent.resilience = policy(max_attempts=2)
+    events = []
+
+    async def run():
+        with stream_tokens(events.append):
+            return await agent._post("openai", "url", {}, {"messages": []}, stream=True)
+
+    result = asyncio.run(run())
+    assert result["choices"][0]["message"]["content"] == "Hello world"
+    assert events == ["Hel", None, "Hello", " world"]
+    # What a client rebuilds from the events is the final text
+    text = ""
+    for event in events:
+        text = "" if event is None else text + event
+    assert text == "Hello world"
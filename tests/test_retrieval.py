@@ -0,0 +1,40 @@
+import asyncio
+from engine import Orchestrator, SolutionIndex
+
+
+def test_index_evicts_oldest_entries_first():
+    index = SolutionIndex(capacity=3)
+    for i in range(5):
+        index.add({"description": f"problem number {i}"}, {"consensus": {"consensus": str(i)}})
+    assert len(index) == 3
+    found = {entry["problem"]["description"] for _, entry in index.query({"description": "problem number"}, k=5)}
+    assert found == {"problem number 2", "problem number 3", "problem number 4"}
+
+
+def test_index_reloads_the_newest_entries_from_sqlite(tmp_path):
+    path = str(tmp_path / "index.db")
+    index = SolutionIndex(path=path, capacity=3)
+    for i in range(5):
+        index.add({"description": f"problem number {i}", "extra": "x" * 100}, {"consensus": {"consensus": str(i)}})
+    index.close()
+
+    reloaded = SolutionIndex(path=path, capacity=3)
+    matches = reloaded.query({"description": "problem number 4"}, k=1)
+    reloaded.close()
+    assert len(reloaded) == 3
+    score, entry = matches[0]
+    assert score > 0.99
+    assert entry["problem"] == {"description": "problem number 4"}
+
+
+def test_solves_index_only_the_final_answer():
+    index = SolutionIndex()
+
+    async def run():
+        async with Orchestrator(index=index) as orchestrator:
+            return await orchestrator.solve({"description": "index me"})
+
+    run = asyncio.run(run())
+    _, entry = index.query({"description": "index me"}, k=1)[0]
+    assert list(entry["results"]) == [run.pipeline.stages[-1].name]
+    assert entry["results"][run.final_stage] == run.final
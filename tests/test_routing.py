@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+from agents import ModelTarget
+from engine.pipeline import Stage
+from engine.routing import ModelRouter, classify, complexity_band
+
+TIERS = {
+    "lead_solver": {"fast": ModelTarget("openai", "gpt-3.5-turbo"), "strong": ModelTarget("openai", "gpt-4")},
+    "critic": {"fast": ModelTarget("groq", "llama3-8b-8192"), "strong": ModelTarget("anthropic", "claude-3-opus")},
+}
+SIMPLE = {"description": "What is 2 + 2?"}
+MODERATE = {"description": "Design an algorithm to schedule exams with room constraints", "domain": "planning"}
+COMPLEX = {
+    "description": "Prove the algorithm is optimal, derive its complexity and design a step-by-step "
+                   "formal proof of the trade-offs under these constraints. " * 6,
+    "domain": "algorithms",
+    "constraints": {f"c{i}": True for i in range(6)},
+}
+
+
+def router(**settings):
+    return ModelRouter(TIERS, **dict({"explore": 0.0, "refresh": 0.0, "seed": 0}, **settings))
+
+
+def run_with(quality, latency=1.0):
+    """A finished run whose consensus reached `quality`, each stage taking `latency` seconds."""
+    stages = (Stage("initial_solution", "lead_solver"), Stage("critique", "critic", ("initial_solution",)))
+    return SimpleNamespace(
+        deadline_exceeded=False, error=None, results={},
+        final={"agreement_metrics": {"harmony_score": quality}},
+        pipeline=SimpleNamespace(stages=stages),
+        timings={stage.name: {"duration": latency} for stage in stages},
+    )
+
+
+def test_problems_are_classified_into_bands():
+    assert complexity_band(classify(SIMPLE)) == "simple"
+    assert complexity_band(classify(MODERATE)) == "moderate"
+    assert complexity_band(classify(COMPLEX)) == "complex"
+
+
+def test_default_tiers_follow_the_band():
+    async def run():
+        routing = router()
+        return [await routing.route(problem) for problem in (SIMPLE, MODERATE, COMPLEX)]
+
+    simple, moderate, complex_ = asyncio.run(run())
+    assert simple["tiers"] == {"lead_solver": "fast", "critic": "fast"}
+    assert moderate["tiers"] == {"lead_solver": "strong", "critic": "fast"}
+    assert complex_["tiers"] == {"lead_solver": "strong", "critic": "strong"}
+    assert complex_["targets"]["critic"] == ModelTarget("anthropic", "claude-3-opus")
+
+
+def test_learned_outcomes_override_the_defaults():
+    async def run(fast_quality):
+        routing = router(min_samples=3)
+        for _ in range(3):
+            await routing.observe(run_with(0.8), {"complexity": "complex", "tiers": {"lead_solver": "strong"}})
+            await routing.observe(run_with(fast_quality, latency=0.2),
+                                  {"complexity": "complex", "tiers": {"lead_solver": "fast"}})
+        return (await routing.route(COMPLEX))["tiers"]
+
+    # The fast tier is as good here, and quicker
+    assert asyncio.run(run(0.79))["lead_solver"] == "fast"
+    # Here it is clearly worse
+    assert asyncio.run(run(0.5))["lead_solver"] == "strong"
+
+
+def test_outcomes_persist_in_sqlite(tmp_path):
+    path = str(tmp_path / "routing.db")
+
+    async def record():
+        routing = router(path=path)
+        await routing.observe(run_with(0.9, latency=2.0), {"complexity": "simple", "tiers": {"critic": "fast"}})
+        await routing.observe(run_with(0.7, latency=4.0), {"complexity": "simple", "tiers": {"critic": "fast"}})
+        routing.close()
+
+    async def reload():
+        routing = router(path=path)
+        try:
+            return await routing.snapshot()
+        finally:
+            routing.close()
+
+    asyncio.run(record())
+    assert asyncio.run(reload()) == {
+        "critic": {"simple": {"fast": {"samples": 2, "quality": 0.88, "latency": 2.2}}}
+    }
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from agents.singleflight import SingleFlight
+
+
+def counted(result=None, error=None, delay=0.02):
+    """A call that sleeps, then returns `result` or raises `error`; counts how often it started."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return call, calls
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight("test")
+    call, calls = counted({"answer": 42})
+
+    async def run():
+        results = await asyncio.gather(*(flights.run("key", call) for _ in range(5)))
+        other = await flights.run("other", call)
+        return results, other
+
+    results, other = asyncio.run(run())
+    assert results == [{"answer": 42}] * 5 and other == {"answer": 42}
+    assert len(calls) == 2
+    assert len(flights) == 0
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight("test")
+    call, calls = counted(error=ValueError("provider down"))
+
+    async def run():
+        return await asyncio.gather(*(flights.run("key", call) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+
+
+def test_one_caller_going_away_does_not_cancel_the_call():
+    flights = SingleFlight("test")
+    call, calls = counted("done", delay=0.05)
+
+    async def run():
+        leaving = asyncio.ensure_future(flights.run("key", call))
+        staying = asyncio.ensure_future(flights.run("key", call))
+        await asyncio.sleep(0.01)
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(run()) == "done"
+    assert len(calls) == 1
+
+
+def test_call_is_cancelled_once_every_caller_has_gone():
+    flights = SingleFlight("test")
+    cancelled = []
+
+    async def call():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        callers = [asyncio.ensure_future(flights.run("key", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
+    assert "key" not in flights
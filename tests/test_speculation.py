@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from agents.streaming import token_sink
+from engine.pipeline import Pipeline, PipelineError, Stage
+from engine.speculation import Draft, Speculation, stable_prefix
+
+STAGES = (Stage("initial_solution", "solver"), Stage("critique", "critic", ("initial_solution",)))
+
+
+class Solver:
+    """Streams `deltas`, then answers with `final` (their concatenation by default)."""
+
+    def __init__(self, deltas, final=None, error=None):
+        self.deltas = deltas
+        self.final = final if final is not None else "".join(deltas)
+        self.error = error
+
+    def draft(self, text):
+        return {"proposal": text}
+
+    async def process(self, context):
+        sink = token_sink.get()
+        for delta in self.deltas:
+            sink(delta)
+            # Let speculative runs start between deltas
+            await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return {"proposal": self.final}
+
+
+class Critic:
+    """Reviews whatever proposal it is given, recording each run and how it ended."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.runs = []
+
+    async def process(self, context):
+        proposal = context["agent_responses"][0]["proposal"]
+        run = {"proposal": proposal, "outcome": "running"}
+        self.runs.append(run)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            run["outcome"] = "cancelled"
+            raise
+        run["outcome"] = "done"
+        return {"feedback": f"review of {proposal!r}"}
+
+
+def run_pipeline(solver, critic, speculation):
+    agents = {"solver": solver, "critic": critic}
+    return asyncio.run(Pipeline(STAGES).run(agents, {}, speculation=speculation))
+
+
+def test_stable_prefix_ends_at_a_sentence_or_line():
+    assert stable_prefix("One. Two") == "One. "
+    assert stable_prefix("One\nTwo") == "One\n"
+    assert stable_prefix("no boundary yet") == ""
+
+
+def test_matching_draft_is_kept():
+    speculation = Speculation(min_tokens=1, coverage=0.5, max_restarts=0)
+    critic = Critic()
+    results = run_pipeline(Solver(["The answer is 4. ", "Done"]), critic, speculation)
+
+    assert critic.runs == [{"proposal": "The answer is 4. ", "outcome": "done"}]
+    assert results["critique"] == {"feedback": "review of 'The answer is 4. '"}
+    assert speculation.stats == {"win": 1, "loss": 0, "restart": 0}
+
+
+def test_mismatching_draft_is_rerun_on_the_full_text():
+    speculation = Speculation(min_tokens=1, coverage=0.5, max_restarts=0)
+    critic = Critic(delay=0.05)
+    solver = Solver(["The answer is 4. ", "Done"], final="The answer is 5. Done")
+    results = run_pipeline(solver, critic, speculation)
+
+    assert critic.runs == [
+        {"proposal": "The answer is 4. ", "outcome": "cancelled"},
+        {"proposal": "The answer is 5. Done", "outcome": "done"},
+    ]
+    assert results["critique"] == {"feedback": "review of 'The answer is 5. Done'"}
+    assert speculation.stats == {"win": 0, "loss": 1, "restart": 0}
+
+
+def test_short_prefix_is_restarted_on_a_longer_one():
+    speculation = Speculation(min_tokens=1, coverage=0.8, max_restarts=1)
+    critic = Critic(delay=0.05)
+    deltas = ["Yes. ", "Because the two sides are equal. "]
+    results = run_pipeline(Solver(deltas), critic, speculation)
+
+    assert [run["outcome"] for run in critic.runs] == ["cancelled", "done"]
+    assert critic.runs[1]["proposal"] == "".join(deltas)
+    assert results["critique"] == {"feedback": f"review of {''.join(deltas)!r}"}
+    assert speculation.stats == {"win": 1, "loss": 0, "restart": 1}
+
+
+def test_speculative_runs_are_cancelled_when_the_upstream_stage_fails():
+    speculation = Speculation(min_tokens=1, coverage=0.5, max_restarts=0)
+    critic = Critic(delay=5)
+    solver = Solver(["The answer is 4. ", "Do"], error=ValueError("stream broke"))
+    with pytest.raises(PipelineError) as error:
+        run_pipeline(solver, critic, speculation)
+
+    assert error.value.stage == "initial_solution"
+    assert critic.runs == [{"proposal": "The answer is 4. ", "outcome": "cancelled"}]
+
+
+def test_draft_reset_starts_over_without_forgetting_restarts():
+    draft = Draft(min_tokens=1, coverage=0.8, max_restarts=2)
+    assert draft.feed("One. ") == "One. "
+    assert draft.feed("Two three four five six. ") == "One. Two three four five six. "
+    assert draft.restarts == 1
+    draft.reset()
+    assert draft.text == "" and draft.prefix is None
+    assert draft.feed("Again. ") == "Again. "
+    assert draft.restarts == 1
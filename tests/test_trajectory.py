@@ -0,0 +1,67 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from agents import MockTransport, ResponseCache
+from engine import Orchestrator, RefinementLoop, SolutionIndex, TrajectoryRecorder
+from engine.trajectory import OPEN_SUFFIX, SHARD_SUFFIX, trajectory, training_examples
+
+
+def test_recover_seals_only_shards_of_dead_processes(tmp_path):
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    live = tmp_path / f"trajectories-20240101T000000-{os.getpid()}-0001{SHARD_SUFFIX}{OPEN_SUFFIX}"
+    dead = tmp_path / f"trajectories-20240101T000000-{finished.pid}-0001{SHARD_SUFFIX}{OPEN_SUFFIX}"
+    live.write_bytes(b"")
+    dead.write_bytes(b"")
+
+    TrajectoryRecorder(str(tmp_path))
+
+    assert live.exists()
+    assert not dead.exists()
+    assert (tmp_path / dead.name[:-len(OPEN_SUFFIX)]).exists()
+
+
+class RecordingTransport(MockTransport):
+    """Mock providers that keep every payload sent to them."""
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self.payloads = []
+
+    async def send_json(self, provider, url, headers, payload, reserved=False):
+        self.payloads.append(payload)
+        return await super().send_json(provider, url, headers, payload, reserved)
+
+    async def stream_events(self, provider, url, headers, payload):
+        self.payloads.append(payload)
+        async for event in super().stream_events(provider, url, headers, payload):
+            yield event
+
+
+def test_training_examples_are_the_messages_sent():
+    transport = RecordingTransport(time_scale=0.001)
+
+    async def run():
+        orchestrator = Orchestrator(
+            transport=transport, cache=ResponseCache(max_entries=0), index=SolutionIndex(),
+            refinement=RefinementLoop(max_rounds=1, convergence=2.0)
+        )
+        async with orchestrator:
+            return await orchestrator.solve({"description": "Plan a three-day conference", "domain": "events"})
+
+    solved = asyncio.run(run())
+    assert solved.error is None
+    examples = list(training_examples(json.loads(json.dumps(trajectory(solved)))))
+    sent = [json.dumps(payload) for payload in transport.payloads]
+
+    # The Data Augmentor's prediction endpoint takes no chat messages
+    assert {example["stage"] for example in examples} == {
+        "initial_solution", "critique", "verification", "strategic_analysis", "consensus",
+        "refinement_critique", "refinement_revision", "refinement_consensus"
+    }
+    for example in examples:
+        assert example["system"] and example["prompt"] and example["completion"]
+        assert any(json.dumps(example["system"])[1:-1] in payload and json.dumps(example["prompt"])[1:-1] in payload
+                   for payload in sent)
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from agents import HTTPTransport, ProviderError, ResponseCache
+from agents.lead_solver import LeadSolver
+from agents.streaming import stream_tokens
+
+
+async def unauthorized(request):
+    return web.json_response({"error": {"message": "Invalid API key"}}, status=401)
+
+
+async def empty(request):
+    return web.json_response({"choices": [{"message": {"content": ""}}]})
+
+
+async def streamed(request):
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for delta in ("Hello", " world"):
+        event = {"choices": [{"delta": {"content": delta}}]}
+        await response.write(f"data: {json.dumps(event)}\n\n".encode())
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+async def post(path, stream=False):
+    app = web.Application()
+    app.router.add_post("/unauthorized", unauthorized)
+    app.router.add_post("/empty", empty)
+    app.router.add_post("/streamed", streamed)
+    async with TestServer(app) as server, HTTPTransport() as transport:
+        agent = LeadSolver(transport=transport)
+        agent.cache = ResponseCache()
+        deltas = []
+        payload = {"model": "gpt-4", "messages": [{"role": "user", "content": path}]}
+        try:
+            with stream_tokens(deltas.append if stream else None):
+                result = await agent._post("openai", str(server.make_url(path)), {}, payload, stream=stream)
+        except ProviderError as e:
+            return e, deltas, len(agent.cache._memory)
+        return result, deltas, len(agent.cache._memory)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_client_errors_raise_and_are_not_cached(stream):
+    error, deltas, cached = asyncio.run(post("/unauthorized", stream))
+    assert isinstance(error, ProviderError)
+    assert error.status == 401 and "Invalid API key" in str(error)
+    assert deltas == [] and cached == 0
+
+
+def test_empty_replies_are_not_cached():
+    result, _, cached = asyncio.run(post("/empty"))
+    assert result["choices"][0]["message"]["content"] == ""
+    assert cached == 0
+
+
+def test_streamed_replies_are_cached():
+    result, deltas, cached = asyncio.run(post("/streamed", stream=True))
+    assert result["choices"][0]["message"]["content"] == "Hello world"
+    assert deltas == ["Hello", " world"]
+    assert cached == 1